@@ -0,0 +1,4 @@
+"""
+性能基准测试模块
+在项目根目录下使用 python -m benchmarks.<脚本名> 运行
+"""
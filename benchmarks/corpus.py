@@ -0,0 +1,79 @@
+"""
+测试语料生成
+生成中文医疗问答形式的测试记录，可调整记录长度和中文比例
+
+也可以直接生成数据文件:
+    python -m benchmarks.corpus data.jsonl --records 100000 --answer-chars 800 --cjk-ratio 0.7
+"""
+
+import argparse
+import json
+import random
+
+from core.data_loader import is_jsonl_path
+
+WORDS = ["患者", "头痛", "发热", "三天", "建议", "多喝水", "注意休息", "复查", "血常规", "医生"]
+ASCII_WORDS = ["patient", "fever", "CT", "mg", "twice daily", "follow-up", "WBC 12.5", "ECG", "BP 130/85"]
+
+
+def _text(rng, words, cjk_ratio):
+    """拼接 words 个词，cjk_ratio 为中文词所占比例"""
+    if cjk_ratio >= 1:
+        return "".join(rng.choice(WORDS) for _ in range(words))
+    parts = []
+    for _ in range(words):
+        if rng.random() < cjk_ratio:
+            parts.append(rng.choice(WORDS))
+        else:
+            parts.append(f" {rng.choice(ASCII_WORDS)} ")
+    return " ".join("".join(parts).split())
+
+
+def make_records(count, seed=0, answer_chars=None, cjk_ratio=1.0):
+    """
+    生成问答形式的测试记录
+    Args:
+        count: 记录数
+        seed: 随机种子，相同参数生成相同的数据
+        answer_chars: 回答的平均字符数，None 表示每条回答1~4段、每段20~80个词
+        cjk_ratio: 中文词所占比例，0~1
+    """
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        question = _text(rng, rng.randint(10, 40), cjk_ratio)
+        if answer_chars is None:
+            paragraphs = [_text(rng, rng.randint(20, 80), cjk_ratio) for _ in range(rng.randint(1, 4))]
+        else:
+            # 中文词平均约3个字符，按目标长度在 50%~150% 之间随机
+            words = max(1, int(answer_chars * rng.uniform(0.5, 1.5) / 3))
+            paragraphs = [_text(rng, min(n, 80), cjk_ratio) for n in range(words, 0, -80)]
+        records.append({"id": i, "question": question, "answer": "\n".join(paragraphs)})
+    return records
+
+
+def write_records(records, path):
+    """按扩展名写出测试文件：.jsonl 每行一条，其余写为JSON数组"""
+    with open(path, 'w', encoding='utf-8') as f:
+        if is_jsonl_path(path):
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成问答形式的测试数据文件")
+    parser.add_argument("output", help="输出文件路径，扩展名为 .jsonl 时输出JSONL，否则输出JSON数组")
+    parser.add_argument("--records", type=int, default=10000, help="记录数 (默认: 10000)")
+    parser.add_argument("--answer-chars", type=int, help="回答的平均字符数 (默认: 每条1~4段)")
+    parser.add_argument("--cjk-ratio", type=float, default=1.0, help="中文词所占比例 (默认: 1.0)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认: 0)")
+    args = parser.parse_args()
+
+    write_records(make_records(args.records, args.seed, args.answer_chars, args.cjk_ratio), args.output)
+    print(f"已生成 {args.records} 条记录: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+HTML构建基准测试
+对比旧路径（拼接Markdown后整篇经过markdown2）与直接构建HTML的耗时
+
+用法:
+    python -m benchmarks.html_build --records 10000 --repeat 3
+"""
+
+import argparse
+import time
+
+import markdown2
+
+from core.pdf_generator import convert_chunk_to_markdown, convert_chunk_to_html
+from .corpus import make_records
+
+
+def old_path(records, fields, tag):
+    """旧路径：拼接Markdown后整篇交给markdown2"""
+    markdown_content = convert_chunk_to_markdown(records, fields, tag)
+    return markdown2.markdown(markdown_content, extras=["fenced-code-blocks"])
+
+
+def new_path(records, fields, tag):
+    """新路径：一次遍历直接构建HTML"""
+    return convert_chunk_to_html(records, fields, tag)
+
+
+def best_time(func, repeat, *args):
+    """多次运行取最短耗时"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比Markdown路径与直接HTML路径的构建耗时")
+    parser.add_argument("--records", type=int, default=10000, help="测试记录数 (默认: 10000)")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数 (默认: 3)")
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    fields = ["question", "answer"]
+    tag = "----"
+
+    old = best_time(old_path, args.repeat, records, fields, tag)
+    new = best_time(new_path, args.repeat, records, fields, tag)
+
+    print(f"记录数: {args.records}")
+    print(f"markdown2 路径: {old:.3f}s")
+    print(f"直接HTML路径:   {new:.3f}s")
+    print(f"加速比: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+启动耗时检查
+在新的子进程中执行各个入口的导入路径，测量耗时并检查重量级依赖没有被提前导入；
+超过阈值或导入了不该导入的模块时以非零状态退出，可用于CI中防止启动变慢
+
+用法:
+    python -m benchmarks.import_time --repeat 5 --max-seconds 1.5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 启动时不应导入的重量级模块
+HEAVY_MODULES = ("weasyprint", "markdown2", "gradio")
+
+# 名称 -> (要执行的代码, 允许导入的重量级模块)
+CASES = {
+    "import core": ("import core", ()),
+    "core 修复/分批入口": ("import core; core.fix_json_file; core.process_in_batches", ()),
+    "import web": ("import web", ()),
+    "web.handlers": ("import web.handlers", ()),
+    "cli.py --help": (
+        "import sys; sys.argv = ['cli.py', '--help']\n"
+        "try:\n"
+        "    import runpy; runpy.run_path('cli.py', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass",
+        (),
+    ),
+}
+
+_REPORT = (
+    "\nimport json, sys\n"
+    "print(json.dumps([m for m in {modules!r} if m in sys.modules]), file=sys.stderr)\n"
+)
+
+
+def run_case(code, repeat):
+    """
+    在子进程中多次执行代码
+    Returns:
+        tuple: (最短耗时（秒）, 被导入的重量级模块列表)
+    """
+    best = float("inf")
+    loaded = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", code + _REPORT.format(modules=HEAVY_MODULES)],
+            cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        best = min(best, time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip())
+        loaded = json.loads(result.stderr.strip().splitlines()[-1])
+    return best, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查CLI和Web入口的启动耗时")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最短耗时 (默认: 5)")
+    parser.add_argument("--max-seconds", type=float, default=1.5,
+                        help="单个入口允许的最长启动耗时（秒），超过时返回非零状态 (默认: 1.5)")
+    args = parser.parse_args()
+
+    baseline, _ = run_case("pass", args.repeat)
+    print(f"{'Python 解释器':<20} {baseline:.3f}s")
+
+    failed = False
+    for name, (code, allowed) in CASES.items():
+        try:
+            elapsed, loaded = run_case(code, args.repeat)
+        except RuntimeError as e:
+            print(f"{name:<20} ❌ 执行失败: {e}")
+            failed = True
+            continue
+        unexpected = [m for m in loaded if m not in allowed]
+        status = "✅"
+        if unexpected:
+            status = f"❌ 提前导入了 {', '.join(unexpected)}"
+            failed = True
+        elif elapsed > args.max_seconds:
+            status = f"❌ 超过 {args.max_seconds:.2f}s"
+            failed = True
+        print(f"{name:<20} {elapsed:.3f}s (+{elapsed - baseline:.3f}s)  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+JSON后端基准测试
+在中文医疗问答语料上对比各个已安装后端的逐行解析和序列化耗时
+
+用法:
+    python -m benchmarks.json_backends --records 100000 --repeat 3
+"""
+
+import argparse
+import json
+import time
+
+from core import json_backend
+from .corpus import make_records
+
+
+def best_time(func, repeat):
+    """多次运行取最短耗时"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比各JSON后端的解析和序列化耗时")
+    parser.add_argument("--records", type=int, default=100000, help="测试记录数 (默认: 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数 (默认: 3)")
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    lines = [json.dumps(r, ensure_ascii=False).encode("utf-8") for r in records]
+    size_mb = sum(len(line) for line in lines) / (1024 * 1024)
+    print(f"记录数: {args.records}，数据量: {size_mb:.1f}MB")
+
+    results = {}
+    for name in ("json", "orjson", "ujson", "simdjson"):
+        if json_backend.set_backend(name) != name:
+            print(f"{name:<9} 未安装，跳过")
+            continue
+        loads, dumps = json_backend.loads, json_backend.dumps
+        parsed = [loads(line) for line in lines]
+        assert parsed == records, f"{name} 解析结果与标准库不一致"
+        parse = best_time(lambda: [loads(line) for line in lines], args.repeat)
+        serialize = best_time(lambda: [dumps(r) for r in records], args.repeat)
+        results[name] = parse
+        print(f"{name:<9} 解析: {parse:.3f}s ({size_mb / parse:.1f}MB/s)  序列化: {serialize:.3f}s")
+
+    baseline = results.get("json")
+    for name, parse in results.items():
+        if name != "json":
+            print(f"{name} 解析加速比: {baseline / parse:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
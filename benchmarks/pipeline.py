@@ -0,0 +1,193 @@
+"""
+端到端流水线基准测试
+生成指定规模的问答数据，分别测量 加载 → 修复 → Markdown转换 → PDF渲染 → 批量处理 各阶段的
+耗时、吞吐量（记录/秒、页/秒）和峰值内存，结果写入JSON文件以便对比不同版本
+
+每个阶段在独立的子进程中运行，峰值内存互不影响；并行渲染时包含工作进程的峰值
+
+用法:
+    python -m benchmarks.pipeline --records 5000 --answer-chars 400 --cjk-ratio 0.9 -o bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from core import get_json_backend, profiling
+from .corpus import make_records, write_records
+
+FIELDS = ["question", "answer"]
+TAG = "----"
+
+
+def peak_rss_mb():
+    """当前进程及其已结束子进程中的最大峰值内存（MB）"""
+    peak = profiling.peak_rss_mb()
+    if peak is None:
+        return None
+    import resource
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(peak, children / (1024 * 1024) if sys.platform == "darwin" else children / 1024)
+
+
+def stage_load(path):
+    from core import load_data_file
+
+    return {"records": len(load_data_file(path))}
+
+
+def stage_fix(path, work_dir):
+    from core import fix_json_file
+
+    output_path = os.path.join(work_dir, "fixed.json")
+    fix_json_file(path, output_path)
+    with open(output_path, 'rb') as f:
+        records = len(json.load(f))
+    os.remove(output_path)
+    return {"records": records}
+
+
+def stage_markdown(path, batch_size):
+    from core import convert_chunk_to_markdown, iter_chunks, iter_records
+
+    records = 0
+    for chunk in iter_chunks(iter_records(path), batch_size):
+        convert_chunk_to_markdown(chunk, FIELDS, TAG)
+        records += len(chunk)
+    return {"records": records}
+
+
+def stage_markdown_to_pdf(path, batch_size, work_dir):
+    from core import convert_chunk_to_markdown, iter_chunks, iter_records, markdown_to_pdf
+
+    chunk = next(iter_chunks(iter_records(path), batch_size))
+    pages = markdown_to_pdf(convert_chunk_to_markdown(chunk, FIELDS, TAG),
+                            os.path.join(work_dir, "single.pdf"))
+    return {"records": len(chunk), "pages": pages}
+
+
+def stage_process(path, batch_size, workers, work_dir):
+    from core import process_in_batches
+
+    output_dir = os.path.join(work_dir, "pdfs")
+    totals = {"records": 0, "pages": 0}
+
+    def on_progress(info):
+        totals["records"] = info["records"]
+        totals["pages"] += info["pages"] or 0
+
+    process_in_batches(path, output_dir, FIELDS, batch_size, TAG, workers=workers,
+                       progress_callback=on_progress)
+    totals["output_mb"] = sum(
+        os.path.getsize(os.path.join(output_dir, name))
+        for name in os.listdir(output_dir) if name.endswith(".pdf")
+    ) / (1024 * 1024)
+    shutil.rmtree(output_dir)
+    return totals
+
+
+def _measure(func, args):
+    """在子进程中执行阶段函数，返回耗时、记录数、页数和峰值内存"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+    result["seconds"] = seconds
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_stage(func, *args):
+    """每个阶段使用新的子进程（spawn），使峰值内存只反映该阶段"""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        result = executor.submit(_measure, func, args).result()
+    result["records_per_sec"] = result["records"] / result["seconds"] if result["seconds"] else None
+    if "pages" in result:
+        result["pages_per_sec"] = result["pages"] / result["seconds"] if result["seconds"] else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量 加载 → Markdown → PDF 流水线各阶段的性能")
+    parser.add_argument("--records", type=int, default=5000, help="测试记录数 (默认: 5000)")
+    parser.add_argument("--answer-chars", type=int, help="回答的平均字符数 (默认: 每条1~4段)")
+    parser.add_argument("--cjk-ratio", type=float, default=1.0, help="中文词所占比例 (默认: 1.0)")
+    parser.add_argument("-b", "--batch-size", type=int, default=500, help="每个PDF的记录数 (默认: 500)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="批量处理阶段的渲染进程数 (默认: 1)")
+    parser.add_argument("--format", choices=("jsonl", "json"), default="jsonl", help="测试文件格式 (默认: jsonl)")
+    parser.add_argument("--skip-render", action="store_true", help="跳过需要WeasyPrint的渲染阶段")
+    parser.add_argument("-o", "--output", default="benchmark_results.json",
+                        help="结果JSON文件路径 (默认: benchmark_results.json)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="json2pdf-bench-")
+    try:
+        data_path = os.path.join(work_dir, f"corpus.{args.format}")
+        write_records(make_records(args.records, answer_chars=args.answer_chars, cjk_ratio=args.cjk_ratio),
+                      data_path)
+        size_mb = os.path.getsize(data_path) / (1024 * 1024)
+        print(f"记录数: {args.records}，文件大小: {size_mb:.1f}MB，格式: {args.format}")
+
+        stages = [
+            ("load_data_file", stage_load, (data_path,)),
+            ("fix_json_file", stage_fix, (data_path, work_dir)),
+            ("convert_chunk_to_markdown", stage_markdown, (data_path, args.batch_size)),
+        ]
+        if not args.skip_render:
+            stages += [
+                ("markdown_to_pdf", stage_markdown_to_pdf, (data_path, args.batch_size, work_dir)),
+                ("process_in_batches", stage_process, (data_path, args.batch_size, args.jobs, work_dir)),
+            ]
+
+        results = {}
+        for name, func, stage_args in stages:
+            result = run_stage(func, *stage_args)
+            results[name] = result
+            line = f"{name:<26} {result['seconds']:8.3f}s  {result['records_per_sec']:10.1f} 条/秒"
+            if "pages" in result:
+                line += f"  {result['pages_per_sec']:8.1f} 页/秒"
+            if "output_mb" in result:
+                line += f"  输出 {result['output_mb']:.1f}MB"
+            if result["peak_rss_mb"] is not None:
+                line += f"  峰值内存 {result['peak_rss_mb']:.0f}MB"
+            print(line)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "json_backend": get_json_backend(),
+        },
+        "params": {
+            "records": args.records,
+            "answer_chars": args.answer_chars,
+            "cjk_ratio": args.cjk_ratio,
+            "batch_size": args.batch_size,
+            "jobs": args.jobs,
+            "format": args.format,
+            "file_size_mb": size_mb,
+        },
+        "stages": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,41 @@ import argparse
 import sys
 from pathlib import Path
 
-from core import process_in_batches, fix_json_file
+import core
+from core.json_backend import BACKEND_CHOICES
+
+
+def parse_batch_range(text):
+    """解析批次范围：120、120-140 或 120-（到最后）"""
+    first, sep, last = text.partition("-")
+    try:
+        if not sep:
+            return int(first), int(first)
+        return int(first), int(last) if last else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的批次范围: {text}") from None
+
+
+def format_batch_numbers(numbers):
+    """把批次号列表压缩为范围表示，如 [3, 4, 5, 9] 表示为 3-5, 9"""
+    ranges = []
+    for number in sorted(numbers):
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ", ".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+
+def merge_existing(output_dir, merge_path, split_pages=None):
+    """只合并输出目录中已生成的批次PDF，不重新渲染"""
+    print(f"📚 合并已生成的批次: {output_dir}")
+    try:
+        merged = core.merge_batches(output_dir, merge_path, split_pages)
+    except Exception as e:
+        print(f"❌ 合并失败: {e}")
+        sys.exit(1)
+    print(f"📚 已合并为 {len(merged)} 个文件: {', '.join(merged)}")
 
 
 def main():
@@ -19,7 +53,8 @@ def main():
     
     parser.add_argument(
         "input_file",
-        help="输入的JSON或JSONL文件路径"
+        nargs="?",
+        help="输入的JSON或JSONL文件路径（--merge-only 时不需要）"
     )
     
     parser.add_argument(
@@ -31,8 +66,7 @@ def main():
     parser.add_argument(
         "-f", "--fields",
         nargs="+",
-        required=True,
-        help="要提取的字段名 (可指定多个)"
+        help="要提取的字段名 (可指定多个，--merge-only 时不需要)"
     )
     
     parser.add_argument(
@@ -42,12 +76,166 @@ def main():
         help="每个PDF文件包含的记录数量 (默认: 1500)"
     )
     
+    parser.add_argument(
+        "--batch-chars",
+        type=int,
+        help="按估算的渲染字符数分批，每批的字符数不超过此值，此时 --batch-size 作为每批记录数的上限"
+    )
+    
+    parser.add_argument(
+        "--where",
+        action="append",
+        default=[],
+        help="筛选条件，可多次指定（同时满足），如 \"department == 内科\"、\"score >= 3\"、\"answer ~ 发热\""
+    )
+    
+    parser.add_argument(
+        "--limit",
+        type=int,
+        help="最多处理的记录数（在筛选之后计算）"
+    )
+    
+    parser.add_argument(
+        "--offset",
+        type=int,
+        default=0,
+        help="跳过前 N 条符合条件的记录 (默认: 0)"
+    )
+    
+    parser.add_argument(
+        "--batches",
+        type=parse_batch_range,
+        metavar="FIRST[-LAST]",
+        help="只生成指定的批次，如 120、120-140 或 120-（到最后），批次号与完整运行时一致；在完整运行的输出目录中执行时沿用其文件名，只替换这些批次"
+    )
+    
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="使用JSONL偏移索引（输入文件旁的 .idx 文件，没有或已过期时先建立），直接定位到 --batches/--offset 对应的记录"
+    )
+    
+    parser.add_argument(
+        "--index-key",
+        help="建立索引时同时保存的键字段，用于按键查找记录"
+    )
+    
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="按提取字段的内容去除重复记录，重复的记录不再渲染"
+    )
+    
     parser.add_argument(
         "-t", "--tag",
         default="----",
         help="记录分隔符 (默认: ----)"
     )
     
+    parser.add_argument(
+        "--markdown-fields",
+        nargs="+",
+        default=[],
+        help="需要按Markdown渲染的字段名，其余字段按纯文本输出"
+    )
+    
+    parser.add_argument(
+        "--engine",
+        choices=("html", "text"),
+        default="html",
+        help="渲染引擎 (默认: html，经WeasyPrint排版；text 直接绘制纯文本，速度快但不支持Markdown字段，需要安装reportlab)"
+    )
+    
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="并行渲染PDF的进程数 (默认: 1，即顺序渲染)"
+    )
+    
+    parser.add_argument(
+        "--parse-jobs",
+        type=int,
+        default=1,
+        help="并行解析JSONL文件的进程数 (默认: 1，仅对JSONL文件生效)"
+    )
+    
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=0,
+        help="在单独的线程中预先读取的批次数，读取解析与渲染同时进行 (默认: 0，按需读取)"
+    )
+    
+    parser.add_argument(
+        "--build-jobs",
+        type=int,
+        default=0,
+        help="在主进程中构建HTML/文本文档的线程数，渲染进程只做排版和写出 (默认: 0，由渲染进程构建)"
+    )
+    
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        metavar="MB",
+        help="每个批次的内存预算，单位MB；渲染进程的内存增长超过预算时把该批次对半拆分后重试 (默认: 不限制)"
+    )
+    
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="根据输出目录中的运行清单续跑，跳过已完成的批次"
+    )
+    
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="增量处理只追加写入的JSONL文件：只渲染上次运行之后新增的记录，批次号接着上次继续编号"
+    )
+    
+    parser.add_argument(
+        "--cache-dir",
+        help="渲染缓存目录，内容未变化的批次直接复用缓存的PDF"
+    )
+    
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=2048,
+        help="渲染缓存大小上限，单位MB (默认: 2048)，超过后淘汰最久未使用的条目"
+    )
+    
+    parser.add_argument(
+        "--merge",
+        metavar="PDF",
+        help="生成完成后把输出目录中的全部批次PDF合并为一个文件（每个批次一个书签），不重新排版，需要安装pypdf"
+    )
+    
+    parser.add_argument(
+        "--split-pages",
+        type=int,
+        metavar="N",
+        help="与 --merge 一起使用，按每 N 页切分为多个文件 (<名称>_part1.pdf ...)"
+    )
+    
+    parser.add_argument(
+        "--merge-only",
+        action="store_true",
+        help="与 --merge 一起使用，只合并 -o 输出目录中已生成的批次PDF，不读取输入文件也不重新渲染"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        metavar="REPORT",
+        help="记录每个批次各阶段的耗时和内存，写出性能分析报告 (扩展名为 .csv 时输出CSV，否则输出JSON)"
+    )
+    
+    parser.add_argument(
+        "--json-backend",
+        choices=BACKEND_CHOICES,
+        help="JSON解析后端 (默认: 环境变量 JSON_PROCESSOR_JSON_BACKEND 或 auto，自动选择已安装的最快后端)"
+    )
+    
     parser.add_argument(
         "--fix",
         action="store_true",
@@ -60,6 +248,17 @@ def main():
     )
     
     args = parser.parse_args()
+    if args.split_pages is not None and not args.merge:
+        parser.error("--split-pages 需要与 --merge 一起使用")
+    if args.merge_only:
+        if not args.merge:
+            parser.error("--merge-only 需要与 --merge 一起使用")
+        merge_existing(args.output, args.merge, args.split_pages)
+        return
+    if not args.input_file:
+        parser.error("需要指定输入文件")
+    if not args.fields:
+        parser.error("需要通过 -f/--fields 指定要提取的字段")
     
     # 检查输入文件是否存在
     input_path = Path(args.input_file)
@@ -67,13 +266,16 @@ def main():
         print(f"❌ 错误: 文件不存在 - {input_path}")
         sys.exit(1)
     
+    if args.json_backend:
+        core.set_json_backend(args.json_backend)
+    
     try:
         json_data_or_path = str(input_path)
         
         # 如果需要修复JSON文件
         if args.fix:
             print("🔧 修复JSON文件...")
-            is_file_output, result, status = fix_json_file(
+            is_file_output, result, status = core.fix_json_file(
                 str(input_path), 
                 args.fix_output
             )
@@ -90,16 +292,74 @@ def main():
         print(f"📂 输出目录: {args.output}")
         print(f"🎯 提取字段: {', '.join(args.fields)}")
         print(f"📊 批次大小: {args.batch_size}")
+        if args.batch_chars:
+            print(f"⚖️  批次字符上限: {args.batch_chars}")
+        for condition in args.where:
+            print(f"🔍 筛选条件: {condition}")
+        if args.offset or args.limit is not None:
+            print(f"✂️  记录范围: 跳过 {args.offset} 条，最多 {args.limit if args.limit is not None else '不限'} 条")
+        if args.batches:
+            first, last = args.batches
+            print(f"🔢 批次范围: {first}-{last if last is not None else '最后'}")
+        if args.dedup:
+            print("🧹 去除重复记录: 是")
         print(f"🏷️  分隔符号: {args.tag}")
+        print(f"🖨️  渲染引擎: {args.engine}")
+        print(f"⚙️  并行进程: {args.jobs}")
+        if args.memory_budget:
+            print(f"🛡️  批次内存预算: {args.memory_budget:g}MB")
+        if args.incremental:
+            print("📈 增量处理: 是")
         
-        batches = process_in_batches(
+        profiler = core.Profiler() if args.profile else None
+        failed_batches = []
+
+        def on_progress(progress):
+            if progress["status"] == "failed":
+                failed_batches.append(progress["batch"])
+
+        query = core.Query(args.where, limit=args.limit, offset=args.offset)
+        batches = core.process_in_batches(
             json_path_or_data=json_data_or_path,
             output_dir=args.output,
             fields=args.fields,
             batch_size=args.batch_size,
-            tag=args.tag
+            tag=args.tag,
+            workers=args.jobs,
+            markdown_fields=args.markdown_fields,
+            parse_workers=args.parse_jobs,
+            resume=args.resume,
+            cache_dir=args.cache_dir,
+            cache_size_mb=args.cache_size,
+            batch_weight=args.batch_chars,
+            profiler=profiler,
+            engine=args.engine,
+            query=query,
+            dedup=args.dedup,
+            prefetch=args.prefetch,
+            build_workers=args.build_jobs,
+            batch_range=args.batches,
+            index=args.index or args.index_key is not None,
+            index_key=args.index_key,
+            memory_budget_mb=args.memory_budget,
+            incremental=args.incremental,
+            progress_callback=on_progress
         )
         
+        if profiler is not None:
+            print(profiler.format_summary())
+            profiler.write_report(args.profile)
+            print(f"📈 性能分析报告: {args.profile}")
+        
+        if failed_batches:
+            print(f"\n❌ 处理未全部完成：{len(failed_batches)} 个批次生成失败（批次 {format_batch_numbers(failed_batches)}），"
+                  f"已完成 {batches} 个批次；可使用 --resume 重新生成失败的批次")
+            sys.exit(1)
+        
+        if args.merge:
+            merged = core.merge_batches(args.output, args.merge, args.split_pages)
+            print(f"📚 已合并为 {len(merged)} 个文件: {', '.join(merged)}")
+        
         print(f"\n🎉 处理完成！共生成 {batches} 个PDF文件")
         
     except Exception as e:
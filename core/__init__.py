@@ -1,18 +1,48 @@
 """
 JSON数据处理核心模块
+
+导出的名称在首次访问时才导入对应的子模块，
+只使用修复、加载等功能时不会加载WeasyPrint等重量级依赖
 """
 
-from .data_loader import load_json, load_jsonl, load_data_file
-from .json_repair import fix_json_file
-from .pdf_generator import convert_chunk_to_markdown, markdown_to_pdf
-from .processor import process_in_batches
-
-__all__ = [
-    'load_json',
-    'load_jsonl', 
-    'load_data_file',
-    'fix_json_file',
-    'convert_chunk_to_markdown',
-    'markdown_to_pdf',
-    'process_in_batches'
-]
+import importlib
+
+# 导出名称 -> (子模块, 子模块中的名称)
+_LAZY_ATTRS = {
+    'load_json': ('.data_loader', 'load_json'),
+    'load_jsonl': ('.data_loader', 'load_jsonl'),
+    'load_data_file': ('.data_loader', 'load_data_file'),
+    'iter_records': ('.data_loader', 'iter_records'),
+    'iter_chunks': ('.data_loader', 'iter_chunks'),
+    'iter_weighted_chunks': ('.data_loader', 'iter_weighted_chunks'),
+    'fix_json_file': ('.json_repair', 'fix_json_file'),
+    'convert_chunk_to_markdown': ('.pdf_generator', 'convert_chunk_to_markdown'),
+    'convert_chunk_to_html': ('.pdf_generator', 'convert_chunk_to_html'),
+    'markdown_to_pdf': ('.pdf_generator', 'markdown_to_pdf'),
+    'PDFRenderer': ('.pdf_generator', 'PDFRenderer'),
+    'get_renderer': ('.pdf_generator', 'get_renderer'),
+    'process_in_batches': ('.processor', 'process_in_batches'),
+    'merge_pdfs': ('.pdf_merge', 'merge_pdfs'),
+    'merge_batches': ('.pdf_merge', 'merge_batches'),
+    'probe_schema': ('.schema_probe', 'probe_schema'),
+    'JsonlIndex': ('.jsonl_index', 'JsonlIndex'),
+    'Profiler': ('.profiling', 'Profiler'),
+    'Query': ('.query', 'Query'),
+    'set_json_backend': ('.json_backend', 'set_backend'),
+    'get_json_backend': ('.json_backend', 'get_backend_name'),
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY_ATTRS[name]
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
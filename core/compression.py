@@ -0,0 +1,146 @@
+"""
+压缩输入模块
+按扩展名或文件头识别 gzip / bz2 / xz / zstd 压缩的数据文件，并以二进制流的方式边读边解压，
+不需要先解压到磁盘
+
+zstd 优先调用 zstd 命令行程序，解压在独立进程中与解析并行进行；未安装时使用 zstandard 模块。
+gzip 在安装了 pigz 时同样交给独立进程解压（pigz 另用线程读取和校验），否则使用标准库
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import shutil
+import subprocess
+import tempfile
+
+# 扩展名 -> 压缩格式
+COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zst": "zstd",
+}
+
+# 文件头 -> 压缩格式
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+
+# 使用外部程序解压时的命令，按顺序选择第一个已安装的程序
+_EXTERNAL_DECOMPRESSORS = {
+    # --long=31 允许解压使用大窗口压缩的文件
+    "zstd": (("zstd", "-d", "-c", "-q", "--long=31"),),
+    "gzip": (("pigz", "-d", "-c"),),
+}
+
+
+def strip_compression_suffix(file_path):
+    """去掉压缩扩展名，如 data.jsonl.gz -> data.jsonl"""
+    lower = file_path.lower()
+    for suffix in COMPRESSION_SUFFIXES:
+        if lower.endswith(suffix):
+            return file_path[:-len(suffix)]
+    return file_path
+
+
+def detect_compression(file_path):
+    """
+    识别文件的压缩格式，先看扩展名，再看文件头
+    Returns:
+        str: gzip / bz2 / xz / zstd，未压缩时返回None
+    """
+    lower = file_path.lower()
+    for suffix, name in COMPRESSION_SUFFIXES.items():
+        if lower.endswith(suffix):
+            return name
+    with open(file_path, 'rb') as f:
+        head = f.read(6)
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+class _ProcessReader:
+    """读取外部解压程序的标准输出，读到结尾时检查程序是否正常退出"""
+
+    def __init__(self, command, file_path):
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            list(command) + [file_path],
+            stdout=subprocess.PIPE, stderr=self._stderr, stdin=subprocess.DEVNULL
+        )
+        self._stdout = self._process.stdout
+
+    def read(self, size=-1):
+        data = self._stdout.read(size)
+        if not data or size is None or size < 0:
+            self._check()
+        return data
+
+    def readline(self):
+        line = self._stdout.readline()
+        if not line:
+            self._check()
+        return line
+
+    def __iter__(self):
+        yield from self._stdout
+        self._check()
+
+    def _check(self):
+        if self._process.wait() != 0:
+            self._stderr.seek(0)
+            message = self._stderr.read().decode('utf-8', errors='replace').strip()
+            raise OSError(f"解压失败: {message or self._process.returncode}")
+
+    def close(self):
+        if self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        self._stdout.close()
+        self._stderr.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_zstd(file_path):
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("读取 .zst 文件需要安装 zstd 命令行程序或 zstandard 模块") from None
+    decompressor = zstandard.ZstdDecompressor(max_window_size=2 ** 31)
+    reader = decompressor.stream_reader(open(file_path, 'rb'), read_across_frames=True)
+    return io.BufferedReader(reader)
+
+
+_OPENERS = {
+    "gzip": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+    "zstd": _open_zstd,
+}
+
+
+def open_input(file_path):
+    """
+    以二进制方式打开数据文件，压缩文件边读边解压
+    Returns:
+        二进制文件对象，支持 read / readline / 逐行迭代和 with 语句
+    """
+    compression = detect_compression(file_path)
+    if compression is None:
+        return open(file_path, 'rb')
+    for command in _EXTERNAL_DECOMPRESSORS.get(compression, ()):
+        if shutil.which(command[0]):
+            return _ProcessReader(command, file_path)
+    return _OPENERS[compression](file_path)
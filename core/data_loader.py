@@ -1,35 +1,441 @@
 """
 数据加载模块
-负责处理 JSON 和 JSONL 文件的加载
+负责处理 JSON 和 JSONL 文件的加载，gzip/bz2/xz/zstd 压缩的文件会边读边解压
 """
 
+import codecs
 import json
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from . import json_backend
+from .compression import open_input, detect_compression, strip_compression_suffix
+from .pipeline import pool_context
+
+# 流式解析JSON数组时每次读取的字节数
+READ_CHUNK_SIZE = 1024 * 1024
+# 并行解析JSONL时每个字节区间的大小
+PARSE_RANGE_SIZE = 16 * 1024 * 1024
+# JSON数字中可能出现的字符，用于判断数字是否被读取边界截断
+_NUMBER_CHARS = "0123456789+-.eE"
+# 解析错误距缓冲区末尾不超过这么多字符时，认为元素可能被读取边界截断（最长的是 "-Infinity"、"\uXXXX"）
+_TRUNCATION_MARGIN = 16
+# 流式解析JSON数组时单个元素的字符数上限，防止格式错误的文件让解析器一直向后读取
+MAX_ELEMENT_SIZE = 64 * 1024 * 1024
+
+
+class JsonArrayError(ValueError):
+    """
+    JSON数组中的元素或分隔符格式错误
+    Attributes:
+        index: 出错元素的序号（从0开始，等于此前已解析的元素个数）
+        offset: 出错位置的字节偏移
+        valid_end: 最后一个已解析元素（没有时为 '['）之后的字节偏移
+    """
+
+    def __init__(self, message, index, offset, valid_end):
+        super().__init__(message)
+        self.index = index
+        self.offset = offset
+        self.valid_end = valid_end
 
 
 def load_json(json_path):
     """加载标准JSON文件"""
-    with open(json_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    with open_input(json_path) as f:
+        return json_backend.loads(f.read())
+
+
+def load_jsonl(jsonl_path, parse_workers=1):
+    """
+    加载JSONL文件
+    Args:
+        jsonl_path: JSONL文件路径
+        parse_workers: 并行解析的进程数，大于1时按字节区间多进程解析；压缩文件只能顺序解析
+    """
+    if parse_workers > 1 and detect_compression(jsonl_path) is None:
+        return list(iter_jsonl_parallel(jsonl_path, parse_workers))
+    return list(iter_jsonl(jsonl_path))
+
+
+def load_data_file(file_path, parse_workers=1, query=None):
+    """
+    根据文件扩展名自动选择加载方式
+    Args:
+        file_path: JSON或JSONL文件路径
+        parse_workers: JSONL文件并行解析的进程数，JSON文件忽略此参数
+        query: core.query.Query，只加载符合条件的记录及需要的字段
+    """
+    if query is not None:
+        return list(iter_records(file_path, parse_workers, query))
+    if is_jsonl_path(file_path):
+        return load_jsonl(file_path, parse_workers)
+    else:
+        return load_json(file_path)
+
+
+def is_jsonl_path(file_path):
+    """根据扩展名判断是否为JSONL文件，忽略压缩扩展名（如 .jsonl.gz）"""
+    return strip_compression_suffix(file_path).lower().endswith('.jsonl')
+
 
+def count_lines(file_path, chunk_size=READ_CHUNK_SIZE):
+    """
+    快速统计文件行数，不解析JSON，可用于估算JSONL文件的记录数
+    空行和无效行同样会被计入，因此结果是记录数的上限
+    """
+    count = 0
+    last = b'\n'
+    with open_input(file_path) as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            count += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        count += 1
+    return count
 
-def load_jsonl(jsonl_path):
-    """加载JSONL文件"""
-    data = []
-    with open(jsonl_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
+
+def iter_jsonl(jsonl_path, query=None):
+    """
+    逐行流式读取JSONL文件，每次产出一条记录，无效行会被跳过
+    Args:
+        jsonl_path: JSONL文件路径
+        query: core.query.Query；offset 按有效记录计数，无效行不计入，
+            需要直接定位时使用 core.jsonl_index.JsonlIndex
+    """
+    with open_input(jsonl_path) as f:
+        if query is None:
+            yield from _iter_jsonl_stream(f)
+        else:
+            yield from query.apply(_iter_jsonl_stream(f))
+
+
+def iter_jsonl_range(jsonl_path, start=0, end=None):
+    """
+    逐行读取JSONL文件中 [start, end) 字节区间内的记录，start 必须位于行首
+    Args:
+        end: 区间结束位置，None 表示读到文件末尾
+    """
+    with open(jsonl_path, 'rb') as f:
+        f.seek(start)
+        yield from _iter_jsonl_stream(_read_lines(f, start, end))
+
+
+def _read_lines(f, pos, end):
+    """从 pos 开始逐行读取，读到 end 为止"""
+    while end is None or pos < end:
+        raw = f.readline()
+        if not raw:
+            return
+        pos += len(raw)
+        yield raw
+
+
+def _iter_jsonl_stream(f):
+    """从二进制流中逐行解析JSON记录"""
+    for raw in f:
+        line = raw.strip()
+        if line:
+            try:
+                yield json_backend.loads(line)
+            except json.JSONDecodeError as e:
+                text = line.decode('utf-8', errors='replace')
+                print(f"警告: 跳过无效的JSON行: {text[:50]}... 错误: {e}")
+                continue
+
+
+def split_line_ranges(file_path, range_size=PARSE_RANGE_SIZE, start=0, end=None):
+    """
+    将文件（或文件中从行首开始的 [start, end) 区间）切分为按换行符对齐的字节区间
+    Returns:
+        list: [(起始偏移, 结束偏移), ...]，每个区间都以完整的行结束
+    """
+    size = os.path.getsize(file_path) if end is None else end
+    ranges = []
+    with open(file_path, 'rb') as f:
+        while start < size:
+            end = min(start + range_size, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_line_range(file_path, start, end, query=None):
+    """
+    解析文件中 [start, end) 区间内的JSONL记录（可在子进程中执行）
+    Args:
+        query: core.query.Query，只返回符合条件的记录并只保留需要的字段，offset/limit 由调用方处理
+    Returns:
+        list: 区间内的有效记录
+    """
+    records = []
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = start
+        while pos < end:
+            newline = mm.find(b'\n', pos, end)
+            if newline == -1:
+                newline = end
+            line = mm[pos:newline].strip()
+            pos = newline + 1
             if line:
                 try:
-                    data.append(json.loads(line))
+                    record = json_backend.loads(line)
                 except json.JSONDecodeError as e:
-                    print(f"警告: 跳过无效的JSON行: {line[:50]}... 错误: {e}")
+                    text = line.decode('utf-8', errors='replace')
+                    print(f"警告: 跳过无效的JSON行: {text[:50]}... 错误: {e}")
                     continue
-    return data
+                if query is None:
+                    records.append(record)
+                elif query.matches(record):
+                    records.append(query.project(record))
+    return records
 
 
-def load_data_file(file_path):
-    """根据文件扩展名自动选择加载方式"""
-    if file_path.lower().endswith('.jsonl'):
-        return load_jsonl(file_path)
-    else:
-        return load_json(file_path)
+def iter_jsonl_parallel(jsonl_path, workers, range_size=PARSE_RANGE_SIZE, query=None, ranges=None):
+    """
+    多进程并行解析JSONL文件，按文件顺序逐条产出记录
+    文件被切分为按换行符对齐的字节区间，子进程通过mmap解析各自的区间；
+    前面的区间解析完成后即可产出，后面的区间仍在后台解析，
+    同时在途的区间数限制为 workers 的两倍，内存占用与文件大小无关
+    Args:
+        jsonl_path: JSONL文件路径
+        workers: 解析进程数
+        range_size: 每个字节区间的大小
+        query: core.query.Query，筛选和字段投影在子进程中完成，只把需要的数据传回主进程；
+            offset/limit 由调用方处理
+        ranges: 要解析的字节区间，None 表示整个文件
+    """
+    if ranges is None:
+        ranges = split_line_ranges(jsonl_path, range_size)
+    if not ranges:
+        return
+    remaining = iter(ranges)
+    pending = []
+    # 启用流水线时在读取线程中创建进程池
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as executor:
+
+        def submit_next():
+            line_range = next(remaining, None)
+            if line_range is not None:
+                pending.append(executor.submit(parse_line_range, jsonl_path, *line_range, query))
+
+        try:
+            for _ in range(workers * 2):
+                submit_next()
+            while pending:
+                records = pending.pop(0).result()
+                submit_next()
+                yield from records
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def iter_json_array(json_path):
+    """增量解析顶层为数组的JSON文件，每次产出一个数组元素"""
+    with open_input(json_path) as f:
+        yield from _iter_json_array_stream(f)
+
+
+def _iter_json_array_stream(f, chunk_size=READ_CHUNK_SIZE, max_element_size=MAX_ELEMENT_SIZE):
+    """
+    从二进制流中增量解析JSON数组
+    只在缓冲区中保留尚未解析的部分，内存占用与单个元素大小相关，而不是整个文件
+    快速JSON后端都不支持从任意位置开始的增量解析，这里始终使用标准库的 raw_decode
+    Args:
+        max_element_size: 单个元素最多读取的字符数，超过时按格式错误处理
+    Raises:
+        JsonArrayError: 数组元素或分隔符格式错误，附带出错元素的序号和字节偏移
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+    buf = ''
+    pos = 0
+    eof = False
+    read_size = chunk_size
+    # 已读取的字节数；上一个元素结束位置（缓冲区下标，被丢弃后换算为字节偏移）
+    raw_total = 0
+    last_end = None
+    last_end_offset = 0
+
+    def offset_of(index):
+        """缓冲区下标对应的字节偏移（解码器中尚未解码的字节不计入）"""
+        return raw_total - len(utf8.getstate()[0]) - len(buf[index:].encode('utf-8'))
+
+    def fill():
+        nonlocal buf, pos, eof, raw_total, last_end, last_end_offset
+        if last_end is not None:
+            last_end_offset = offset_of(last_end)
+            last_end = None
+        raw = f.read(read_size)
+        eof = not raw
+        raw_total += len(raw)
+        buf = buf[pos:] + utf8.decode(raw, final=eof)
+        pos = 0
+
+    def next_char():
+        """跳过空白并返回下一个非空白字符，文件结束时返回空字符串"""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf) or eof:
+                return buf[pos:pos + 1]
+            fill()
+
+    def error(message, at):
+        valid_end = last_end_offset if last_end is None else offset_of(last_end)
+        offset = offset_of(at)
+        return JsonArrayError(f"{message}（元素 #{index}，字节偏移 {offset}）", index, offset, valid_end)
+
+    def read_more():
+        """元素可能被缓冲区末尾截断时继续读取，单个元素超过上限时不再读取"""
+        nonlocal read_size
+        if len(buf) - pos >= max_element_size:
+            raise error(f"JSON数组元素超过 {max_element_size} 个字符仍未结束", pos)
+        read_size *= 2
+        fill()
+
+    if next_char() != '[':
+        raise ValueError("JSON文件顶层必须是数组")
+    pos += 1
+    last_end = pos
+
+    index = 0
+    expect_value = True
+    while True:
+        char = next_char()
+        if not char:
+            raise error("JSON数组不完整：缺少结尾的 ']'", pos)
+        if char == ']' and (index == 0 or not expect_value):
+            pos += 1
+            if next_char():
+                raise ValueError("JSON数组结束后存在多余内容")
+            return
+        if not expect_value:
+            if char != ',':
+                raise error(f"JSON数组格式错误：出现意外字符 {char!r}", pos)
+            pos += 1
+            expect_value = True
+            continue
+
+        # 元素可能被读取边界截断：错误出现在缓冲区末尾附近，或后面还没有出现 ',' / ']' 时继续读取后重试；
+        # 数字被截断时（如 "3." 或 "1.5e"）raw_decode 会成功返回前半部分，不能据此判断元素已完整。
+        # 错误出现在缓冲区中间时不再读取，避免一个格式错误的元素让后面的整个文件进入内存
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if eof or not _may_be_truncated(buf, e):
+                    raise error(f"JSON数组元素解析失败: {e.msg}", pos) from e
+                read_more()
+                continue
+            if not eof and _may_continue(buf, end):
+                read_more()
+                continue
+            break
+
+        read_size = chunk_size
+        pos = last_end = end
+        index += 1
+        expect_value = False
+        yield item
+
+
+def _may_be_truncated(buf, err):
+    """
+    解析错误是否可能只是因为元素被缓冲区末尾截断：
+    字符串一直到缓冲区末尾都没有结束，或错误位置紧挨着缓冲区末尾（如 "tru"、"\\u00"）
+    """
+    return err.pos >= len(buf) - _TRUNCATION_MARGIN or err.msg.startswith("Unterminated string")
+
+
+def _may_continue(buf, end):
+    """
+    raw_decode 在 end 处结束的元素是否可能被缓冲区末尾截断：
+    之后只有空白，或只剩数字的后续部分（小数点、指数等）时，需要读取更多内容才能确定
+    """
+    rest = buf[end:]
+    return not rest.strip() or not rest.strip(_NUMBER_CHARS)
+
+
+def iter_stream_records(stream, jsonl):
+    """
+    从已打开的二进制流中逐条读取记录
+    Args:
+        stream: 二进制文件对象
+        jsonl: 是否按JSONL格式解析，否则按JSON数组增量解析
+    """
+    if jsonl:
+        return _iter_jsonl_stream(stream)
+    return _iter_json_array_stream(stream)
+
+
+def iter_records(file_path, parse_workers=1, query=None, index=None):
+    """
+    流式读取数据文件，每次产出一条记录
+    Args:
+        file_path: JSON或JSONL文件路径，JSON文件的顶层必须是数组
+        parse_workers: JSONL文件并行解析的进程数，大于1时启用按字节区间的多进程解析，压缩文件只能顺序解析
+        query: core.query.Query，按条件筛选、按 offset/limit 截取并只保留需要的字段
+        index: core.jsonl_index.JsonlIndex；没有筛选条件时按 offset/limit 直接定位，不解析前面的记录
+    """
+    if index is not None and (query is None or not query.conditions):
+        if query is None:
+            return index.iter_records(parse_workers=parse_workers)
+        stop = None if query.limit is None else query.offset + query.limit
+        return index.iter_records(query.offset, stop, query, parse_workers)
+    if is_jsonl_path(file_path):
+        if parse_workers > 1 and detect_compression(file_path) is None:
+            records = iter_jsonl_parallel(file_path, parse_workers, query=query)
+            return query.slice(records) if query is not None else records
+        return iter_jsonl(file_path, query)
+    records = iter_json_array(file_path)
+    return query.apply(records) if query is not None else records
+
+
+def iter_chunks(records, chunk_size):
+    """
+    将记录迭代器切分为固定大小的数据块
+    Args:
+        records: 记录的可迭代对象
+        chunk_size: 每个数据块包含的记录数
+    """
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_weighted_chunks(records, weight_of, max_weight, max_records=None):
+    """
+    按估算的权重打包记录，使每个数据块的总权重大致相同
+    单条记录超过 max_weight 时单独成块
+    Args:
+        records: 记录的可迭代对象
+        weight_of: 计算单条记录权重的函数
+        max_weight: 每个数据块的权重上限
+        max_records: 每个数据块的记录数上限，None 表示不限制
+    """
+    chunk = []
+    weight = 0
+    for record in records:
+        record_weight = weight_of(record)
+        if chunk and (weight + record_weight > max_weight
+                      or (max_records and len(chunk) >= max_records)):
+            yield chunk
+            chunk = []
+            weight = 0
+        chunk.append(record)
+        weight += record_weight
+    if chunk:
+        yield chunk
@@ -0,0 +1,116 @@
+"""
+去重模块
+按所选字段内容的哈希流式去除重复记录；已见过的哈希先保存在内存中，
+超过上限后转存到临时的SQLite数据库，内存占用有上限且结果精确
+
+启用流水线时记录在读取线程中过滤，而关闭和统计可能在主线程中进行，
+转存数据库的连接允许跨线程使用，并用锁保证同一时间只有一个线程访问
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+from .fields import get_field, MISSING
+
+# 内存中最多保存的哈希数，每个约100字节，超过后转存到磁盘
+DEDUP_MEMORY_KEYS = 1000000
+
+
+def record_key(record, fields):
+    """
+    计算记录在所选字段上的哈希
+    缺失的字段与值为 null 的字段区分开；嵌套对象按键排序后序列化，键的顺序不影响结果
+    """
+    values = []
+    for field in fields:
+        value = get_field(record, field)
+        values.append([0] if value is MISSING else [1, value])
+    text = json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+class Deduplicator:
+    """
+    流式去重器
+    """
+
+    def __init__(self, fields, max_memory_keys=DEDUP_MEMORY_KEYS, spill_dir=None):
+        """
+        Args:
+            fields: 参与去重的字段
+            max_memory_keys: 内存中最多保存的哈希数
+            spill_dir: 转存数据库所在目录，默认为系统临时目录
+        """
+        self.fields = list(fields)
+        self.max_memory_keys = max_memory_keys
+        self.spill_dir = spill_dir
+        self.records = 0
+        self.duplicates = 0
+        # 是否曾经转存到磁盘
+        self.spilled = False
+        self._keys = set()
+        self._db = None
+        self._db_path = None
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, record):
+        """判断记录是否重复，首次出现的记录会被记住"""
+        key = record_key(record, self.fields)
+        with self._lock:
+            self.records += 1
+            if key in self._keys or (self._db is not None and self._in_db(key)):
+                self.duplicates += 1
+                return True
+            self._keys.add(key)
+            if len(self._keys) >= self.max_memory_keys:
+                self._spill()
+            return False
+
+    def filter(self, records):
+        """只产出首次出现的记录，迭代结束或被关闭时删除转存数据库"""
+        try:
+            for record in records:
+                if not self.is_duplicate(record):
+                    yield record
+        finally:
+            self.close()
+
+    def _in_db(self, key):
+        return self._db.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone() is not None
+
+    def _spill(self):
+        """把内存中的哈希写入磁盘数据库并清空内存"""
+        if self._db is None:
+            fd, self._db_path = tempfile.mkstemp(prefix="dedup-", suffix=".sqlite", dir=self.spill_dir)
+            os.close(fd)
+            self._db = sqlite3.connect(self._db_path, check_same_thread=False)
+            # 临时数据，不需要崩溃保护
+            self._db.execute("PRAGMA journal_mode = OFF")
+            self._db.execute("PRAGMA synchronous = OFF")
+            self._db.execute("CREATE TABLE seen (key BLOB PRIMARY KEY) WITHOUT ROWID")
+        self.spilled = True
+        self._db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((key,) for key in self._keys))
+        self._db.commit()
+        self._keys.clear()
+
+    def close(self):
+        """关闭并删除转存数据库，可以在任意线程中调用"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+                os.remove(self._db_path)
+
+    def stats(self):
+        """去重统计"""
+        with self._lock:
+            return {
+                "records": self.records,
+                "unique": self.records - self.duplicates,
+                "duplicates": self.duplicates,
+                "spilled": self.spilled,
+            }
@@ -0,0 +1,40 @@
+"""
+字段访问模块
+支持用点号路径（如 "meta.source"）访问嵌套字段
+"""
+
+# 字段不存在时的标记值，与值为 None 的字段区分开
+MISSING = object()
+
+
+def get_field(item, field, default=MISSING):
+    """
+    读取记录中的字段，优先匹配完整的键名，再按点号路径逐级查找
+    Args:
+        item: 记录（字典）
+        field: 字段名或点号路径
+        default: 字段不存在时的返回值
+    """
+    if not isinstance(item, dict):
+        return default
+    if field in item:
+        return item[field]
+    value = item
+    for key in field.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return default
+        value = value[key]
+    return value
+
+
+def iter_field_paths(item, prefix=""):
+    """
+    遍历记录中的所有字段路径，嵌套对象会同时产出自身路径和子字段的点号路径
+    Yields:
+        tuple: (字段路径, 字段值)
+    """
+    for key, value in item.items():
+        path = f"{prefix}{key}"
+        yield path, value
+        if isinstance(value, dict):
+            yield from iter_field_paths(value, f"{path}.")
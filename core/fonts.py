@@ -0,0 +1,143 @@
+"""
+字体解析模块
+把CSS中的字体族名解析为实际的字体文件，每个进程只查询一次 fontconfig；
+并把写出PDF时字体子集化和嵌入的耗时单独记为 subset 阶段
+"""
+
+import functools
+import os
+import shutil
+import subprocess
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+# 默认的中文字体族，与 DEFAULT_CSS 一致
+DEFAULT_FONT_FAMILY = "Microsoft YaHei"
+
+# fc-match 的输出格式：文件路径、在字体集合（TTC）中的序号、字体格式、支持的语言（以 | 分隔）
+_FC_FORMAT = "%{file}\t%{index}\t%{fontformat}\t%{lang}"
+
+# 解析出的字体：文件路径和在TTC字体集合中的序号（单个字体文件为0）
+FontMatch = namedtuple("FontMatch", ["path", "index"])
+
+# 渲染引擎中负责字体子集化和嵌入的函数：(模块, 属性所在的对象名, 属性名)，对象名为空表示模块级函数
+#   html: WeasyPrint 在 write_pdf 中为每种字体生成子集并写入字体字典
+#   text: reportlab 在保存PDF时为每个 TrueType 字体生成子集和字体对象
+_SUBSET_HOOKS = {
+    "html": ("weasyprint.pdf", None, "build_fonts_dictionary"),
+    "text": ("reportlab.pdfbase.ttfonts", "TTFont", "addObjects"),
+}
+
+# 当前线程正在写出的PDF对应的计时器，由 subset_timing 设置
+_subset_state = threading.local()
+
+
+def _run_fontconfig(*args):
+    """执行 fontconfig 命令行工具，返回标准输出；命令不存在或执行失败时返回None"""
+    executable = shutil.which(args[0])
+    if executable is None:
+        return None
+    try:
+        result = subprocess.run([executable, *args[1:]], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _parse_match(line, lang, fontformat=None):
+    """解析一行 _FC_FORMAT 输出，字体文件不存在、不覆盖 lang 或格式不符时返回None"""
+    fields = line.strip("\n").split("\t")
+    if len(fields) != 4 or not os.path.isfile(fields[0]):
+        return None
+    path, index, font_format, langs = fields
+    if lang not in langs.split("|") or (fontformat is not None and font_format != fontformat):
+        return None
+    try:
+        return FontMatch(path, int(index or 0))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def resolve_font(family=DEFAULT_FONT_FAMILY, lang="zh-cn", fontformat=None):
+    """
+    通过 fc-match 查找最匹配的字体，未安装该字体时 fontconfig 会返回替代字体
+    系统中没有覆盖 lang 的字体时，fc-match 仍会返回 DejaVu 等西文字体，因此要检查返回的字体确实覆盖 lang
+    Args:
+        fontformat: 只接受该格式的字体（fontconfig 的 fontformat，如 "TrueType" 表示 glyf 轮廓，
+            "CFF" 表示PostScript轮廓）；最佳匹配的格式不符时，从覆盖 lang 的该格式字体中选择
+    Returns:
+        FontMatch: 字体文件路径和在TTC字体集合中的序号；
+            系统没有 fontconfig 或找不到符合条件的字体时返回None
+    """
+    pattern = f"{family}:lang={lang}" + (f":fontformat={fontformat}" if fontformat else "")
+    output = _run_fontconfig("fc-match", "-f", _FC_FORMAT, pattern)
+    match = _parse_match(output, lang, fontformat) if output else None
+    if match is not None or fontformat is None:
+        return match
+    # fc-match 只按优先级排序，不保证格式相符；fc-list 严格按条件筛选，排序后结果稳定
+    output = _run_fontconfig("fc-list", "-f", _FC_FORMAT + "\n", f":lang={lang}:fontformat={fontformat}")
+    for line in sorted((output or "").splitlines()):
+        match = _parse_match(line, lang, fontformat)
+        if match is not None:
+            return match
+    return None
+
+
+def font_face_css(family, path):
+    """
+    生成把字体族绑定到本地字体文件的 @font-face 规则
+    @font-face 不能指定TTC字体集合中的序号，只应用于单个字体文件或集合中的第一个字体
+    """
+    url = Path(path).resolve().as_uri()
+    return f'@font-face {{\n    font-family: "{family}";\n    src: url("{url}");\n}}\n'
+
+
+def _timed_subset(func):
+    """包装字体子集化函数，把耗时记入当前线程的 subset 阶段，未在 subset_timing 中调用时不计时"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timer = getattr(_subset_state, "timer", None)
+        if timer is None:
+            return func(*args, **kwargs)
+        with timer.stage("subset"):
+            return func(*args, **kwargs)
+    wrapper.subset_timed = True
+    return wrapper
+
+
+def install_subset_timing(engine):
+    """
+    为渲染引擎的字体子集化函数安装计时钩子，每个进程只安装一次
+    Returns:
+        bool: 是否可以单独计时；引擎版本中没有对应的函数时返回False，子集化的耗时仍计入 write 阶段
+    """
+    import importlib
+
+    module_name, owner_name, attr = _SUBSET_HOOKS[engine]
+    try:
+        owner = importlib.import_module(module_name)
+    except ImportError:
+        return False
+    if owner_name:
+        owner = getattr(owner, owner_name, None)
+    func = getattr(owner, attr, None)
+    if func is None:
+        return False
+    if not getattr(func, "subset_timed", False):
+        setattr(owner, attr, _timed_subset(func))
+    return True
+
+
+@contextmanager
+def subset_timing(timer):
+    """在此范围内把当前线程中字体子集化的耗时记入 timer 的 subset 阶段（嵌套在 write 阶段中，write 不再包含这部分）"""
+    previous = getattr(_subset_state, "timer", None)
+    _subset_state.timer = timer
+    try:
+        yield
+    finally:
+        _subset_state.timer = previous
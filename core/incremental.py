@@ -0,0 +1,176 @@
+"""
+增量处理模块
+JSONL输入只追加写入时，每次运行只读取上次运行之后追加的记录。输出目录中的检查点记录：
+已处理部分的字节偏移、记录数、该部分内容的哈希、下一个批次号以及运行参数。
+输入文件被截断、已处理部分被改写或参数变化时检查点失效，回退为完整运行
+"""
+
+import hashlib
+import json
+import os
+
+from .data_loader import iter_jsonl_range
+
+CHECKPOINT_NAME = "checkpoint.json"
+CHECKPOINT_VERSION = 1
+# 计算前缀哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def complete_lines_end(jsonl_path):
+    """
+    文件中最后一个完整行的结束位置，正在写入、还没有换行符的最后一行不计入
+    """
+    size = os.path.getsize(jsonl_path)
+    with open(jsonl_path, 'rb') as f:
+        pos = size
+        while pos > 0:
+            start = max(0, pos - HASH_CHUNK_SIZE)
+            f.seek(start)
+            block = f.read(pos - start)
+            newline = block.rfind(b'\n')
+            if newline != -1:
+                return start + newline + 1
+            pos = start
+    return 0
+
+
+def _prefix_digests(jsonl_path, offset, end):
+    """
+    一次读取计算 [0, offset) 和 [0, end) 两个前缀的 SHA-256
+    Returns:
+        tuple: (前 offset 字节的哈希, 前 end 字节的哈希)，offset 为None或超过 end 时前者为None
+    """
+    digest = hashlib.sha256()
+    offset_digest = None
+    with open(jsonl_path, 'rb') as f:
+        if offset is not None and offset <= end:
+            _hash_bytes(digest, f, offset)
+            offset_digest = digest.hexdigest()
+            _hash_bytes(digest, f, end - offset)
+        else:
+            _hash_bytes(digest, f, end)
+    return offset_digest, digest.hexdigest()
+
+
+def _hash_bytes(digest, f, count):
+    """从 f 的当前位置读取 count 个字节计入哈希"""
+    while count > 0:
+        block = f.read(min(HASH_CHUNK_SIZE, count))
+        if not block:
+            return
+        digest.update(block)
+        count -= len(block)
+
+
+class Checkpoint:
+    """
+    增量处理的检查点，以JSON格式保存在输出目录中
+    """
+
+    def __init__(self, params, offset=0, records=0, prefix_sha256=None, next_batch=1):
+        """
+        Args:
+            params: 运行参数，与本次运行不一致时检查点失效
+            offset: 已处理部分的结束位置（字节）
+            records: 已处理部分的有效记录数
+            prefix_sha256: 已处理部分 [0, offset) 的 SHA-256
+            next_batch: 下一个批次号
+        """
+        self.params = params
+        self.offset = offset
+        self.records = records
+        self.prefix_sha256 = prefix_sha256
+        self.next_batch = next_batch
+
+    @classmethod
+    def load(cls, output_dir):
+        """读取输出目录中的检查点，不存在或无法解析时返回None"""
+        path = os.path.join(output_dir, CHECKPOINT_NAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != CHECKPOINT_VERSION:
+                return None
+            return cls(data["params"], data["offset"], data["records"], data["prefix_sha256"], data["next_batch"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, output_dir):
+        """写入检查点，先写临时文件再替换"""
+        path = os.path.join(output_dir, CHECKPOINT_NAME)
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "params": self.params,
+            "offset": self.offset,
+            "records": self.records,
+            "prefix_sha256": self.prefix_sha256,
+            "next_batch": self.next_batch,
+        }
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(path + ".tmp", path)
+
+
+class IncrementalRun:
+    """
+    一次增量运行：根据检查点确定要读取的字节区间 [start, end) 和起始批次号
+    end 在开始时确定为最后一个完整行的结束位置，运行期间继续追加的记录留给下一次运行
+    """
+
+    def __init__(self, output_dir, jsonl_path, params):
+        """
+        Args:
+            output_dir: 输出目录，检查点保存在其中
+            jsonl_path: JSONL输入文件
+            params: 运行参数（字段、批次大小、筛选条件等）
+        """
+        self.output_dir = output_dir
+        self.jsonl_path = jsonl_path
+        self.params = params
+        self.end = complete_lines_end(jsonl_path)
+        self.records_read = 0
+
+        previous = Checkpoint.load(output_dir)
+        offset = previous.offset if previous is not None else None
+        offset_sha256, self.end_sha256 = _prefix_digests(jsonl_path, offset, self.end)
+
+        # 回退为完整运行的原因，None 表示可以增量处理
+        self.reason = None
+        if previous is None:
+            self.reason = "没有找到增量检查点"
+        elif previous.params != params:
+            self.reason = "运行参数与增量检查点不一致"
+        elif previous.offset > self.end:
+            self.reason = "输入文件被截断"
+        elif offset_sha256 != previous.prefix_sha256:
+            self.reason = "输入文件的已处理部分被改写"
+
+        if self.reason is None:
+            self.start = previous.offset
+            self.records_before = previous.records
+            self.next_batch = previous.next_batch
+        else:
+            self.start = 0
+            self.records_before = 0
+            self.next_batch = 1
+
+    @property
+    def full(self):
+        """是否为完整运行"""
+        return self.reason is not None
+
+    def iter_records(self):
+        """读取本次新增的记录，同时统计记录数"""
+        for record in iter_jsonl_range(self.jsonl_path, self.start, self.end):
+            self.records_read += 1
+            yield record
+
+    def commit(self, next_batch):
+        """
+        运行成功后保存新的检查点
+        Args:
+            next_batch: 下一次运行的起始批次号
+        """
+        Checkpoint(self.params, self.end, self.records_before + self.records_read, self.end_sha256,
+                   next_batch).save(self.output_dir)
@@ -0,0 +1,205 @@
+"""
+JSON后端模块
+在安装了 orjson / ujson / simdjson 时使用更快的解析器，否则回退到标准库 json
+
+选择方式（优先级从高到低）：
+    1. 调用 set_backend(name)，例如命令行参数 --json-backend
+    2. 环境变量 JSON_PROCESSOR_JSON_BACKEND
+    3. auto：按 orjson、ujson、simdjson 的顺序选择第一个可用的后端
+"""
+
+import json
+import math
+import os
+import re
+
+BACKEND_ENV = "JSON_PROCESSOR_JSON_BACKEND"
+BACKEND_CHOICES = ("auto", "orjson", "ujson", "simdjson", "json")
+_AUTO_ORDER = ("orjson", "ujson", "simdjson")
+# 19位及以上的数字串可能超出64位整数范围，ujson / simdjson 可能静默转换为浮点数而不是报错，
+# 解析后也无法区分，含有这样的数字串的输入直接交给标准库解析（字符串中的长数字串也会命中，只影响速度）
+_LONG_DIGITS = re.compile(r"\d{19,}")
+_LONG_DIGITS_BYTES = re.compile(rb"\d{19,}")
+# 超出64位的整数被转换为浮点数后，绝对值不小于 2**63
+_INT64_LIMIT = float(2 ** 63)
+
+
+def _stdlib_loads(s):
+    return json.loads(s)
+
+
+def _stdlib_dumps(obj, indent=None):
+    return json.dumps(obj, ensure_ascii=False, indent=indent)
+
+
+def _with_fallback(fast_loads):
+    """
+    快速解析失败时交给标准库解析
+    这样各后端接受与拒绝的输入与标准库保持一致（例如 NaN），
+    无效行抛出的也都是标准库的 json.JSONDecodeError，错误信息相同
+    """
+    def loads(s):
+        try:
+            return fast_loads(s)
+        except ValueError:
+            return json.loads(s)
+    return loads
+
+
+def _with_long_digits_guard(fast_loads):
+    """解析前检查输入，含有可能超出64位的整数时交给标准库解析，用于无法在解析后发现精度损失的后端"""
+    def loads(s):
+        pattern = _LONG_DIGITS_BYTES if isinstance(s, (bytes, bytearray, memoryview)) else _LONG_DIGITS
+        if pattern.search(s):
+            return json.loads(s)
+        return fast_loads(s)
+    return loads
+
+
+def _has_non_finite(obj):
+    """对象中是否含有 NaN 或无穷大的浮点数"""
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(value) for value in obj)
+    return False
+
+
+def _has_int64_overflow(obj):
+    """对象中是否含有绝对值不小于 2**63 的浮点数（可能是被转换为浮点数的大整数）"""
+    if isinstance(obj, float):
+        return abs(obj) >= _INT64_LIMIT
+    if isinstance(obj, dict):
+        return any(_has_int64_overflow(value) for value in obj.values())
+    if isinstance(obj, list):
+        return any(_has_int64_overflow(value) for value in obj)
+    return False
+
+
+def _load_orjson():
+    import orjson
+
+    def dumps(obj, indent=None):
+        if indent not in (None, 2):
+            return _stdlib_dumps(obj, indent)
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            data = orjson.dumps(obj, option=option)
+        except TypeError:
+            # orjson.JSONEncodeError 是 TypeError 的子类，如超出64位的整数
+            return _stdlib_dumps(obj, indent)
+        # orjson 把 NaN 和无穷大写为 null，标准库写为 NaN / Infinity；
+        # 只有输出中出现 null 时才需要检查
+        if b"null" in data and _has_non_finite(obj):
+            return _stdlib_dumps(obj, indent)
+        return data.decode('utf-8')
+
+    def loads(s):
+        # orjson 把超出64位的整数解析为浮点数，先解析再检查，只有结果中出现很大的浮点数时才用标准库重新解析，
+        # 不需要在每次解析前扫描输入
+        obj = orjson.loads(s)
+        if _has_int64_overflow(obj):
+            return json.loads(s)
+        return obj
+
+    return _with_fallback(loads), dumps
+
+
+def _load_ujson():
+    import ujson
+
+    def dumps(obj, indent=None):
+        try:
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False, indent=indent or 0)
+        except (TypeError, ValueError, OverflowError):
+            # 超出64位的整数、NaN 等 ujson 不支持的值
+            return _stdlib_dumps(obj, indent)
+
+    return _with_fallback(_with_long_digits_guard(ujson.loads)), dumps
+
+
+def _load_simdjson():
+    import simdjson
+
+    # simdjson 只提供解析，序列化使用标准库
+    return _with_fallback(_with_long_digits_guard(simdjson.loads)), _stdlib_dumps
+
+
+_LOADERS = {
+    "orjson": _load_orjson,
+    "ujson": _load_ujson,
+    "simdjson": _load_simdjson,
+    "json": lambda: (_stdlib_loads, _stdlib_dumps),
+}
+
+_backend_name = None
+_loads = _stdlib_loads
+_dumps = _stdlib_dumps
+
+
+def set_backend(name="auto"):
+    """
+    选择JSON后端，同时写入环境变量，使之后启动的子进程使用相同的后端
+    Args:
+        name: auto / orjson / ujson / simdjson / json
+    Returns:
+        str: 实际使用的后端名称
+    """
+    global _backend_name, _loads, _dumps
+    name = (name or "auto").lower()
+    if name not in BACKEND_CHOICES:
+        raise ValueError(f"未知的JSON后端: {name}，可选: {', '.join(BACKEND_CHOICES)}")
+
+    candidates = _AUTO_ORDER if name == "auto" else (name,)
+    for candidate in candidates:
+        try:
+            _loads, _dumps = _LOADERS[candidate]()
+            _backend_name = candidate
+            break
+        except ImportError:
+            if name != "auto":
+                print(f"警告: JSON后端 {candidate} 未安装，使用标准库 json")
+    else:
+        _loads, _dumps = _stdlib_loads, _stdlib_dumps
+        _backend_name = "json"
+
+    os.environ[BACKEND_ENV] = name
+    return _backend_name
+
+
+def get_backend_name():
+    """获取当前使用的JSON后端名称"""
+    if _backend_name is None:
+        set_backend(os.environ.get(BACKEND_ENV, "auto"))
+    return _backend_name
+
+
+def loads(s):
+    """
+    解析JSON文本
+    Args:
+        s: str 或 UTF-8 编码的 bytes
+    Raises:
+        json.JSONDecodeError: 输入不是有效的JSON
+    """
+    if _backend_name is None:
+        get_backend_name()
+    return _loads(s)
+
+
+def dumps(obj, indent=None):
+    """
+    序列化为JSON文本，不转义非ASCII字符（中文保持原样）
+    Args:
+        obj: 要序列化的对象
+        indent: 缩进空格数，None 表示紧凑输出
+    Returns:
+        str: JSON文本
+    """
+    if _backend_name is None:
+        get_backend_name()
+    return _dumps(obj, indent)
@@ -5,54 +5,278 @@ JSON文件修复模块
 
 import json
 import os
-from .data_loader import load_data_file
+from . import json_backend
+from .compression import open_input
+from .data_loader import MAX_ELEMENT_SIZE, READ_CHUNK_SIZE, JsonArrayError, load_data_file, is_jsonl_path, \
+    iter_stream_records
 
+# 逐行修复时单行的字节数上限，更长的行（如写在一行中的整个数组的剩余部分）记为错误并跳过，不读入内存
+MAX_LINE_SIZE = MAX_ELEMENT_SIZE
 
-def fix_json_file(input_path, output_path=None, size_threshold_mb=10):
+
+class _TeeReader:
+    """读取源文件的同时把读到的字节原样写入目标文件，用于边校验边复制"""
+
+    def __init__(self, src, dst):
+        self.src = src
+        self.dst = dst
+
+    def read(self, size=-1):
+        data = self.src.read(size)
+        self.dst.write(data)
+        return data
+
+
+class _RecordWriter:
+    """
+    按输出文件的扩展名逐条写出记录：.jsonl 每行一条，其余写为JSON数组
+    Args:
+        count: 输出中已有的记录数；大于0或 started 为True时接着已写出的数组继续写，不再写 '['
+    """
+
+    def __init__(self, f, jsonl, count=0, started=False):
+        self.f = f
+        self.jsonl = jsonl
+        self.count = count
+        if not jsonl and not (count or started):
+            f.write(b'[')
+
+    def write(self, obj, raw_line=None):
+        """写出一条记录，JSONL输出时优先直接写入原始行，避免重新序列化"""
+        if self.jsonl:
+            if raw_line is None:
+                raw_line = json_backend.dumps(obj).encode('utf-8')
+            self.f.write(raw_line + b'\n')
+        else:
+            # 与 json.dump(..., indent=2) 的数组格式保持一致
+            text = json_backend.dumps(obj, indent=2).replace('\n', '\n  ')
+            self.f.write((',\n  ' if self.count else '\n  ').encode('utf-8') + text.encode('utf-8'))
+        self.count += 1
+
+    def close(self):
+        if not self.jsonl:
+            self.f.write(b'\n]' if self.count else b']')
+
+
+class _ErrorReport:
+    """逐行错误报告，首次出现错误时才创建报告文件"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._f = None
+        if os.path.exists(path):
+            os.remove(path)
+
+    def add(self, line_no, error, content):
+        if self._f is None:
+            self._f = open(self.path, 'w', encoding='utf-8')
+        entry = {"line": line_no, "error": str(error), "content": content[:200]}
+        self._f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.count += 1
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+
+
+def _first_byte(input_path):
+    """返回文件中第一个非空白字节（跳过UTF-8 BOM）"""
+    with open_input(input_path) as f:
+        while True:
+            block = f.read(4096)
+            if not block:
+                return b''
+            block = block.lstrip(b'\xef\xbb\xbf \t\r\n')
+            if block:
+                return block[:1]
+
+
+def _copy_json_array(input_path, dst):
+    """
+    校验JSON数组的同时按块原样复制到目标文件
+    Returns:
+        int: 数组元素个数
+    """
+    count = 0
+    with open_input(input_path) as src:
+        for _ in iter_stream_records(_TeeReader(src, dst), jsonl=False):
+            count += 1
+    return count
+
+
+def _skip_bytes(f, size):
+    """跳过流中的 size 个字节（压缩文件也可以使用），返回跳过部分的换行符个数"""
+    newlines = 0
+    while size > 0:
+        block = f.read(min(size, READ_CHUNK_SIZE))
+        if not block:
+            break
+        newlines += block.count(b'\n')
+        size -= len(block)
+    return newlines
+
+
+def _iter_bounded_lines(f, limit):
+    """逐行读取，产出 (行, 是否超长)；超过 limit 字节的行只保留开头部分，其余内容按块跳过"""
+    while True:
+        raw = f.readline(limit)
+        if not raw:
+            return
+        if len(raw) < limit or raw.endswith(b'\n'):
+            yield raw, False
+            continue
+        rest = f.readline(limit)
+        if not rest:
+            yield raw, False
+            return
+        while rest and not rest.endswith(b'\n'):
+            rest = f.readline(limit)
+        yield raw, True
+
+
+def _strip_array_punctuation(line):
+    """去掉JSON数组中元素行末尾的 ','，以及最后一行末尾的 ']'"""
+    line = line.rstrip(b',').rstrip()
+    if line.endswith(b']') and not line.startswith(b'['):
+        line = line[:-1].rstrip()
+    return line
+
+
+def _repair_lines(input_path, writer, report, start=0, array_tail=False):
+    """
+    逐行修复：有效的行直接写出，无效的行记录到错误报告中
+    Args:
+        start: 从这个字节偏移开始修复，之前的部分只跳过不解析
+        array_tail: 从JSON数组的中间开始修复，每行去掉元素之间的 ',' 和结尾的 ']'
+    """
+    with open_input(input_path) as f:
+        first_line = _skip_bytes(f, start) + 1
+        for line_no, (raw, too_long) in enumerate(_iter_bounded_lines(f, MAX_LINE_SIZE), first_line):
+            line = raw.strip()
+            if too_long:
+                report.add(line_no, f"行长度超过 {MAX_LINE_SIZE} 字节，已跳过", line.decode('utf-8', errors='replace'))
+                continue
+            if array_tail:
+                line = _strip_array_punctuation(line)
+            if not line:
+                continue
+            try:
+                obj = json_backend.loads(line)
+            except ValueError as e:
+                report.add(line_no, e, line.decode('utf-8', errors='replace'))
+                continue
+            writer.write(obj, raw_line=line)
+
+
+def repair_json_stream(input_path, output_path, error_report_path=None):
+    """
+    单次遍历的流式修复，内存占用与文件大小无关
+    - 输入为合法的JSON数组且输出为 .json 时，边校验边按块复制
+    - 输入为JSON数组且输出为 .jsonl 时，逐个元素转换为一行
+    - JSON数组中出现格式错误的元素时，保留已写出的元素，从出错元素所在的位置开始逐行修复，
+      每行去掉元素之间的 ',' 和结尾的 ']'，不会重新读取或缓存前面的内容
+    - 其余情况逐行解析，有效记录直接写出，无效行写入错误报告而不是中断
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径，扩展名为 .jsonl 时输出JSONL，否则输出JSON数组
+        error_report_path: 错误报告路径，默认为 输出路径 + ".errors.jsonl"
+    Returns:
+        dict: {"records": 有效记录数, "errors": 无效行数, "report": 错误报告路径或None}
+    """
+    if os.path.abspath(input_path) == os.path.abspath(output_path):
+        raise ValueError("输出路径不能与输入文件相同")
+
+    report = _ErrorReport(error_report_path or output_path + '.errors.jsonl')
+    output_jsonl = is_jsonl_path(output_path)
+    try:
+        with open(output_path, 'wb') as dst:
+            count = None
+            if _first_byte(input_path) == b'[':
+                writer = _RecordWriter(dst, jsonl=True) if output_jsonl else None
+                try:
+                    if output_jsonl:
+                        with open_input(input_path) as src:
+                            for obj in iter_stream_records(src, jsonl=False):
+                                writer.write(obj)
+                        count = writer.count
+                    else:
+                        count = _copy_json_array(input_path, dst)
+                except JsonArrayError as e:
+                    # 数组中的元素格式错误：保留之前的元素，从出错的位置开始逐行修复
+                    if not output_jsonl:
+                        # 按块复制时可能已经写出了出错位置之后的内容
+                        dst.seek(e.valid_end)
+                        dst.truncate()
+                        writer = _RecordWriter(dst, jsonl=False, count=e.index, started=True)
+                    _repair_lines(input_path, writer, report, start=e.offset, array_tail=True)
+                    writer.close()
+                    count = writer.count
+                except ValueError:
+                    # 不是合法的JSON数组，退回逐行修复
+                    dst.seek(0)
+                    dst.truncate()
+                    count = None
+
+            if count is None:
+                writer = _RecordWriter(dst, output_jsonl)
+                _repair_lines(input_path, writer, report)
+                writer.close()
+                count = writer.count
+    finally:
+        report.close()
+
+    if not count:
+        os.remove(output_path)
+        raise ValueError("没有找到有效的JSON数据")
+
+    return {
+        "records": count,
+        "errors": report.count,
+        "report": report.path if report.count else None,
+    }
+
+
+def fix_json_file(input_path, output_path=None, size_threshold_mb=10, error_report_path=None):
     """
     修复JSON/JSONL文件格式，将每行的JSON对象组合成一个数组
     Args:
         input_path: 输入文件路径
-        output_path: 输出文件路径，如果为None且文件小于阈值，则返回修复后的数据
+        output_path: 输出文件路径，如果为None且文件小于阈值，则返回修复后的数据；
+            指定输出路径时使用单次遍历的流式修复，无效行写入错误报告
         size_threshold_mb: 文件大小阈值（MB），超过此大小将强制写入文件
+        error_report_path: 流式修复的错误报告路径，默认为 输出路径 + ".errors.jsonl"
     Returns:
         tuple: (是否写入文件, 文件路径或数据, 状态信息)
     """
     try:
         # 检查文件大小
         file_size_mb = os.path.getsize(input_path) / (1024 * 1024)
-        
+
+        # 指定了输出路径时直接流式修复，只读取一遍源文件
+        if output_path:
+            stats = repair_json_stream(input_path, output_path, error_report_path)
+            status = f"✅ 修复完成，输出文件为: {output_path} (有效记录: {stats['records']}, 文件大小: {file_size_mb:.2f}MB)"
+            if stats["errors"]:
+                status += f"\n⚠️ 跳过 {stats['errors']} 行无效数据，详见: {stats['report']}"
+            return True, output_path, status
+
         # 先尝试直接加载数据（支持JSON和JSONL）
         try:
             data = load_data_file(input_path)
-            
+
             # 如果成功加载，说明文件格式正确
-            if file_size_mb <= size_threshold_mb and output_path is None:
+            if file_size_mb <= size_threshold_mb:
                 return False, data, f"✅ 文件格式正确，数据已加载到内存 (文件大小: {file_size_mb:.2f}MB)"
-            
-            # 如果需要输出或文件大，复制/转换文件
-            if output_path:
-                # 检查是否需要格式转换（JSONL -> JSON）
-                if input_path.lower().endswith('.jsonl') and output_path.lower().endswith('.json'):
-                    # JSONL转JSON
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, ensure_ascii=False, indent=2)
-                    return True, output_path, f"✅ JSONL文件已转换为JSON格式: {output_path}"
-                else:
-                    # 直接复制
-                    with open(input_path, 'r', encoding='utf-8') as src, open(output_path, 'w', encoding='utf-8') as dst:
-                        dst.write(src.read())
-                    return True, output_path, f"✅ 文件已复制到: {output_path}"
-            else:
-                return False, data, f"✅ 文件格式正确，数据已加载到内存"
-                
+            return False, data, f"✅ 文件格式正确，数据已加载到内存"
+
         except Exception:
             # 如果直接加载失败，尝试修复
             pass
 
         # 尝试修复文件格式
-        with open(input_path, 'r', encoding='utf-8') as f:
-            lines = [line.strip() for line in f if line.strip()]
+        with open_input(input_path) as f:
+            lines = [line.decode('utf-8').strip() for line in f if line.strip()]
 
         if not lines:
             raise ValueError("文件为空或没有有效内容")
@@ -61,16 +285,16 @@ def fix_json_file(input_path, output_path=None, size_threshold_mb=10):
         fixed_data = []
         for i, line in enumerate(lines):
             try:
-                obj = json.loads(line)
+                obj = json_backend.loads(line)
                 fixed_data.append(obj)
             except json.JSONDecodeError:
                 # 如果不是有效的JSON行，尝试其他修复方式
                 if not (line.startswith('{') and line.endswith('}')):
                     raise ValueError(f"格式错误，第{i+1}行不是有效的JSON对象：{line[:50]}...")
-                
+
                 # 尝试在每行末尾添加逗号的方式修复
                 try:
-                    obj = json.loads(line)
+                    obj = json_backend.loads(line)
                     fixed_data.append(obj)
                 except json.JSONDecodeError:
                     raise ValueError(f"无法修复第{i+1}行的JSON格式：{line[:50]}...")
@@ -78,21 +302,11 @@ def fix_json_file(input_path, output_path=None, size_threshold_mb=10):
         if not fixed_data:
             raise ValueError("没有找到有效的JSON数据")
 
-        # 根据文件大小和是否提供输出路径决定处理方式
-        if file_size_mb <= size_threshold_mb and output_path is None:
-            # 小文件且无输出路径，返回数据
+        # 小文件返回数据，大文件必须指定输出路径
+        if file_size_mb <= size_threshold_mb:
             return False, fixed_data, f"✅ 修复完成，数据已加载到内存 (文件大小: {file_size_mb:.2f}MB)"
-        else:
-            # 大文件或指定了输出路径，写入文件
-            if not output_path:
-                raise ValueError("大文件必须指定输出路径")
-            
-            # 写入为JSON数组格式
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(fixed_data, f, ensure_ascii=False, indent=2)
-            
-            return True, output_path, f"✅ 修复完成，输出文件为: {output_path} (文件大小: {file_size_mb:.2f}MB)"
-        
+        raise ValueError("大文件必须指定输出路径")
+
     except Exception as e:
         error_msg = f"❌ 修复失败: {e}"
         print(error_msg)
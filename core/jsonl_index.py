@@ -0,0 +1,307 @@
+"""
+JSONL偏移索引模块
+记录JSONL文件中每条有效记录的起始字节偏移，保存在输入文件旁的 <文件名>.idx 中，
+之后可以直接定位到任意记录或批次，统计记录数也不需要重新解析整个文件
+
+索引文件格式：
+    第一行是JSON头：{"version", "fingerprint", "records", "key"}
+    之后是 records 个小端序 int64 偏移量
+    指定了键字段时，最后是一行JSON数组，按记录顺序保存每条记录的键值
+输入文件的大小、修改时间或头尾内容变化后索引失效，需要重新建立
+读取已保存的索引时只读取JSON头，偏移量和键值在用到时才从索引文件中读取，
+统计记录数、按批次范围定位都不需要把整个偏移量数组读入内存
+"""
+
+import json
+import os
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from . import json_backend
+from .compression import detect_compression
+from .data_loader import (is_jsonl_path, split_line_ranges, iter_jsonl_parallel, iter_jsonl_range,
+                          PARSE_RANGE_SIZE)
+from .fields import get_field, MISSING
+from .manifest import fingerprint_input
+from .pipeline import pool_context
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+# 每个偏移量占用的字节数（小端序 int64）
+OFFSET_SIZE = 8
+_OFFSET = struct.Struct('<q')
+
+
+def index_path_for(jsonl_path):
+    """索引文件路径：与输入文件同目录，文件名后加 .idx"""
+    return jsonl_path + INDEX_SUFFIX
+
+
+def _fingerprint(jsonl_path):
+    """输入文件的指纹，不包含路径，文件和索引一起移动后索引仍然有效"""
+    fingerprint = fingerprint_input(jsonl_path)
+    fingerprint.pop("path")
+    return fingerprint
+
+
+def _key_token(value):
+    """把键值转换为可哈希的查找键，1 与 "1" 视为不同的键"""
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def index_line_range(file_path, start, end, key=None):
+    """
+    扫描文件中 [start, end) 区间内的有效记录（可在子进程中执行）
+    Returns:
+        tuple: (偏移量列表, 键值列表)，未指定 key 时键值列表为空；记录缺少键字段时键值为None
+    """
+    offsets = []
+    keys = []
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            raw = f.readline()
+            if not raw:
+                break
+            line = raw.strip()
+            line_start = pos
+            pos += len(raw)
+            if not line:
+                continue
+            try:
+                record = json_backend.loads(line)
+            except json.JSONDecodeError:
+                continue
+            offsets.append(line_start)
+            if key is not None:
+                value = get_field(record, key)
+                keys.append(None if value is MISSING else value)
+    return offsets, keys
+
+
+class _OffsetTable:
+    """
+    已保存的索引文件中的偏移量数组，按位置从文件中读取，不把整个数组读入内存
+    """
+
+    def __init__(self, index_path, start, count):
+        """
+        Args:
+            index_path: 索引文件路径
+            start: 偏移量数组在索引文件中的起始位置
+            count: 偏移量个数
+        """
+        self.index_path = index_path
+        self.start = start
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self.count
+        if not 0 <= position < self.count:
+            raise IndexError("偏移量位置超出范围")
+        with open(self.index_path, 'rb') as f:
+            f.seek(self.start + position * OFFSET_SIZE)
+            return _OFFSET.unpack(f.read(OFFSET_SIZE))[0]
+
+    def copy_to(self, f, chunk_size=1024 * 1024):
+        """把偏移量数组按块原样写入另一个文件"""
+        remaining = self.count * OFFSET_SIZE
+        with open(self.index_path, 'rb') as src:
+            src.seek(self.start)
+            while remaining > 0:
+                block = src.read(min(chunk_size, remaining))
+                if not block:
+                    raise EOFError("索引文件不完整")
+                f.write(block)
+                remaining -= len(block)
+
+
+class JsonlIndex:
+    """
+    JSONL文件的记录偏移索引
+    """
+
+    def __init__(self, jsonl_path, offsets, key=None, keys=None, fingerprint=None, keys_offset=None):
+        """
+        Args:
+            jsonl_path: JSONL文件路径
+            offsets: 每条有效记录的起始字节偏移（array('q')，或从索引文件中按需读取的偏移量表）
+            key: 键字段，None 表示不保存键值
+            keys: 按记录顺序排列的键值
+            fingerprint: 建立索引时输入文件的指纹
+            keys_offset: keys 为None时，键值在索引文件中的位置，第一次按键查找时才读取
+        """
+        self.path = jsonl_path
+        self.offsets = offsets
+        self.key = key
+        self._keys = keys
+        self._keys_offset = keys_offset
+        self.fingerprint = fingerprint or _fingerprint(jsonl_path)
+        self._positions = None
+
+    @property
+    def keys(self):
+        """按记录顺序排列的键值，已保存的索引在第一次访问时才读取"""
+        if self._keys is None and self._keys_offset is not None:
+            with open(index_path_for(self.path), 'rb') as f:
+                f.seek(self._keys_offset)
+                self._keys = json.loads(f.readline())
+        return self._keys
+
+    @classmethod
+    def build(cls, jsonl_path, key=None, parse_workers=1):
+        """
+        解析整个文件建立索引，无效行不计入记录
+        Args:
+            parse_workers: 并行扫描的进程数，大于1时按字节区间多进程扫描
+        """
+        _check_indexable(jsonl_path)
+        fingerprint = _fingerprint(jsonl_path)
+        ranges = split_line_ranges(jsonl_path)
+        offsets = array('q')
+        keys = [] if key is not None else None
+        if parse_workers > 1 and len(ranges) > 1:
+            with ProcessPoolExecutor(max_workers=parse_workers, mp_context=pool_context()) as executor:
+                futures = [executor.submit(index_line_range, jsonl_path, start, end, key) for start, end in ranges]
+                for future in futures:
+                    part_offsets, part_keys = future.result()
+                    offsets.extend(part_offsets)
+                    if keys is not None:
+                        keys.extend(part_keys)
+        else:
+            for start, end in ranges:
+                part_offsets, part_keys = index_line_range(jsonl_path, start, end, key)
+                offsets.extend(part_offsets)
+                if keys is not None:
+                    keys.extend(part_keys)
+        return cls(jsonl_path, offsets, key, keys, fingerprint)
+
+    @classmethod
+    def load(cls, jsonl_path, key=None):
+        """
+        读取已保存的索引，只读取JSON头并按文件大小校验，偏移量和键值在用到时才读取
+        Args:
+            key: 需要的键字段；索引中没有该键字段时视为无效
+        Returns:
+            JsonlIndex: 索引不存在、格式不符或已过期时返回None
+        """
+        index_path = index_path_for(jsonl_path)
+        if not os.path.exists(index_path) or detect_compression(jsonl_path) is not None:
+            return None
+        try:
+            with open(index_path, 'rb') as f:
+                header = json.loads(f.readline())
+                offsets_start = f.tell()
+            if header.get("version") != INDEX_VERSION or header.get("fingerprint") != _fingerprint(jsonl_path):
+                return None
+            if key is not None and header.get("key") != key:
+                return None
+            records = header["records"]
+            keys_offset = offsets_start + records * OFFSET_SIZE
+            size = os.path.getsize(index_path)
+            # 没有键值时偏移量数组正好到文件末尾；有键值时之后还有一行键值
+            if size < keys_offset or (header.get("key") is None and size != keys_offset):
+                return None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        offsets = _OffsetTable(index_path, offsets_start, records)
+        return cls(jsonl_path, offsets, header.get("key"), fingerprint=header["fingerprint"],
+                   keys_offset=keys_offset if header.get("key") is not None else None)
+
+    @classmethod
+    def open(cls, jsonl_path, key=None, parse_workers=1):
+        """读取有效的索引，没有时建立并保存到输入文件旁；目录不可写时只在内存中使用"""
+        index = cls.load(jsonl_path, key)
+        if index is not None:
+            return index
+        index = cls.build(jsonl_path, key, parse_workers)
+        try:
+            index.save()
+        except OSError as e:
+            print(f"警告: 无法保存索引文件 {index_path_for(jsonl_path)}: {e}")
+        return index
+
+    def save(self):
+        """写入索引文件，先写临时文件再替换，中途失败不会留下不完整的索引"""
+        index_path = index_path_for(self.path)
+        header = {
+            "version": INDEX_VERSION,
+            "fingerprint": self.fingerprint,
+            "records": len(self.offsets),
+            "key": self.key,
+        }
+        offsets = self.offsets
+        if sys.byteorder != "little" and not isinstance(offsets, _OffsetTable):
+            offsets = array('q', offsets)
+            offsets.byteswap()
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(header, ensure_ascii=False).encode('utf-8') + b'\n')
+            if isinstance(offsets, _OffsetTable):
+                offsets.copy_to(f)
+            else:
+                offsets.tofile(f)
+            if self.key is not None:
+                f.write(json.dumps(self.keys, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+        os.replace(tmp_path, index_path)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def byte_range(self, start, stop=None):
+        """记录 [start, stop) 在文件中的字节区间"""
+        stop = len(self.offsets) if stop is None else min(stop, len(self.offsets))
+        if start >= stop:
+            return None
+        end = self.offsets[stop] if stop < len(self.offsets) else os.path.getsize(self.path)
+        return self.offsets[start], end
+
+    def read(self, position):
+        """读取第 position 条记录（从0开始）"""
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[position])
+            return json_backend.loads(f.readline())
+
+    def find(self, value):
+        """
+        按键值查找记录位置，需要建立索引时指定 key
+        Returns:
+            list: 键值等于 value 的记录位置，按文件顺序排列
+        """
+        if self.key is None:
+            raise ValueError("索引没有保存键字段，请在建立索引时指定 key")
+        if self._positions is None:
+            self._positions = {}
+            for position, key_value in enumerate(self.keys):
+                self._positions.setdefault(_key_token(key_value), []).append(position)
+        return list(self._positions.get(_key_token(value), []))
+
+    def iter_records(self, start=0, stop=None, query=None, parse_workers=1):
+        """
+        直接定位并读取记录 [start, stop)，不解析前面的内容
+        Args:
+            query: core.query.Query，只用于字段投影，筛选条件和 offset/limit 由调用方处理
+            parse_workers: 并行解析的进程数，大于1时把区间按字节切分后多进程解析
+        """
+        byte_range = self.byte_range(start, stop)
+        if byte_range is None:
+            return
+        begin, end = byte_range
+        if parse_workers > 1:
+            ranges = split_line_ranges(self.path, PARSE_RANGE_SIZE, begin, end)
+            yield from iter_jsonl_parallel(self.path, parse_workers, query=query, ranges=ranges)
+            return
+        for record in iter_jsonl_range(self.path, begin, end):
+            yield record if query is None else query.project(record)
+
+
+def _check_indexable(jsonl_path):
+    if not is_jsonl_path(jsonl_path) or detect_compression(jsonl_path) is not None:
+        raise ValueError(f"只能为未压缩的JSONL文件建立偏移索引: {jsonl_path}")
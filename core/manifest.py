@@ -0,0 +1,170 @@
+"""
+运行清单模块
+在输出目录中记录本次运行的输入指纹、参数以及每个已完成批次的文件名和校验和，
+中断后可以据此跳过已完成的批次继续渲染
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from . import json_backend
+
+MANIFEST_NAME = "manifest.jsonl"
+# 输入文件指纹采样的头部/尾部字节数
+FINGERPRINT_SAMPLE_BYTES = 1024 * 1024
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """计算文件的 SHA-256 校验和"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint_input(json_path_or_data):
+    """
+    计算输入数据的指纹
+    文件输入使用 大小 + 修改时间 + 头尾各1MB内容的哈希，不需要读取整个文件；
+    内存数据对每条记录的序列化结果做哈希
+    """
+    digest = hashlib.sha256()
+    if isinstance(json_path_or_data, str):
+        stat = os.stat(json_path_or_data)
+        with open(json_path_or_data, 'rb') as f:
+            digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+            if stat.st_size > FINGERPRINT_SAMPLE_BYTES:
+                f.seek(max(FINGERPRINT_SAMPLE_BYTES, stat.st_size - FINGERPRINT_SAMPLE_BYTES))
+                digest.update(f.read())
+        return {
+            "path": os.path.abspath(json_path_or_data),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest.hexdigest(),
+        }
+
+    for record in json_path_or_data:
+        digest.update(json_backend.dumps(record).encode('utf-8'))
+        digest.update(b'\n')
+    return {"records": len(json_path_or_data), "sha256": digest.hexdigest()}
+
+
+class RunManifest:
+    """
+    运行清单，以JSONL格式保存在输出目录中
+    第一行是运行参数，之后每完成一个批次追加一行，中途崩溃也只会丢失最后一行
+    """
+
+    def __init__(self, output_dir, params, timestamp, batches=None):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.params = params
+        self.timestamp = timestamp
+        self.batches = batches or {}
+
+    @classmethod
+    def open(cls, output_dir, params, resume=False, reuse=False):
+        """
+        打开运行清单
+        Args:
+            output_dir: 输出目录
+            params: 运行参数（输入指纹、字段、批次大小等），续跑时必须与已有清单一致
+            resume: 是否续跑；为False或参数不一致时开始新的运行并覆盖旧清单
+            reuse: 参数一致时沿用已有清单（时间戳和已完成的批次），不输出续跑提示；
+                用于只重新生成部分批次，文件名与原来的运行保持一致
+        """
+        if resume or reuse:
+            manifest = cls.load(output_dir)
+            if manifest is not None and manifest.params == params:
+                return manifest
+            if manifest is not None and resume:
+                print("⚠️ 输入文件或参数与已有运行清单不一致，将重新开始完整运行")
+
+        manifest = cls(output_dir, params, datetime.now().strftime("%Y%m%d%H%M%S"))
+        manifest._rewrite()
+        return manifest
+
+    @classmethod
+    def load(cls, output_dir):
+        """读取输出目录中已有的运行清单，不存在或无法解析时返回None"""
+        path = os.path.join(output_dir, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return None
+
+        batches = {}
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 最后一行可能因为中断而不完整
+                continue
+            batches[entry["batch"]] = entry
+        return cls(output_dir, header["params"], header["timestamp"], batches)
+
+    def file_name(self, batch_no):
+        """批次对应的PDF文件名，同一次运行（包括续跑）中保持不变"""
+        return f'医疗问诊_{self.timestamp}_batch{batch_no}.pdf'
+
+    def is_done(self, batch_no):
+        """批次是否已完成：清单中有记录，文件（被拆分的批次为全部子批次的文件）存在且校验和一致"""
+        entry = self.batches.get(batch_no)
+        if entry is None:
+            return False
+        return all(self._file_intact(part) for part in entry.get("parts", [entry]))
+
+    def _file_intact(self, entry):
+        pdf_path = os.path.join(self.output_dir, entry["file"])
+        return os.path.exists(pdf_path) and file_sha256(pdf_path) == entry["sha256"]
+
+    def mark_done(self, batch_no, file_name, sha256, records):
+        """记录已完成的批次并立即追加写入清单"""
+        self._append({"batch": batch_no, "file": file_name, "sha256": sha256, "records": records})
+
+    def mark_split(self, batch_no, parts):
+        """
+        记录被拆分为子批次后完成的批次
+        Args:
+            parts: 子批次列表，每项为 {"batch": 子批次号, "file", "sha256", "records"}
+        """
+        self._append({"batch": batch_no, "records": sum(part["records"] for part in parts), "parts": parts})
+
+    def discard(self, first, last=None):
+        """
+        丢弃批次号在 [first, last] 内的记录并删除对应的PDF文件，用于重新生成这些批次
+        （如按批次范围重新导出，或增量运行中途失败后下次从同一批次号重新开始）
+        Args:
+            last: 结束批次号（包含），None 表示到最后
+        """
+        stale = [n for n in self.batches
+                 if isinstance(n, int) and n >= first and (last is None or n <= last)]
+        if not stale:
+            return
+        for n in stale:
+            entry = self.batches.pop(n)
+            for part in entry.get("parts", [entry]):
+                pdf_path = os.path.join(self.output_dir, part["file"])
+                if os.path.exists(pdf_path):
+                    os.remove(pdf_path)
+        self._rewrite()
+
+    def _rewrite(self):
+        """重写清单文件：参数行以及当前记录的全部批次"""
+        header = {"params": self.params, "timestamp": self.timestamp}
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header, ensure_ascii=False) + '\n')
+            for batch_no in sorted(self.batches):
+                f.write(json.dumps(self.batches[batch_no], ensure_ascii=False) + '\n')
+
+    def _append(self, entry):
+        self.batches[entry["batch"]] = entry
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
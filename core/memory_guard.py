@@ -0,0 +1,113 @@
+"""
+内存保护模块
+渲染批次时由监视线程定期检查进程的常驻内存（RSS），批次开始后增长的内存超过预算时
+在渲染线程中抛出 MemoryBudgetExceeded，中止该批次，由调用方拆分为更小的批次重试
+
+只在Linux上读取 /proc/self/statm 获取RSS，并通过 SIGUSR1 通知渲染线程；
+其他平台上监视不生效，只能处理渲染中抛出的 MemoryError
+"""
+
+import gc
+import os
+import signal
+import threading
+
+# 监视线程检查RSS的间隔（秒）
+WATCHDOG_INTERVAL = 0.2
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """批次渲染占用的内存超过预算"""
+
+
+def current_rss_mb():
+    """当前进程的常驻内存（MB），无法获取时返回None"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def release_memory():
+    """中止批次后回收内存，并尽量把空闲的堆内存归还给操作系统（glibc）"""
+    gc.collect()
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class MemoryWatchdog:
+    """
+    内存预算监视器，在主线程中作为上下文管理器使用：
+
+        with MemoryWatchdog(2048):
+            render(...)
+
+    代码块执行期间RSS比进入时增长超过 budget_mb 时，在主线程中抛出 MemoryBudgetExceeded；
+    代码块已经结束时不再中止，超出预算的结果照常返回。
+    PDF排版主要在Python代码中进行，异常可以及时抛出；长时间停留在C扩展中时要等到返回Python后才会中止
+    """
+
+    def __init__(self, budget_mb, interval=WATCHDOG_INTERVAL):
+        """
+        Args:
+            budget_mb: 内存预算（MB），按进入时的RSS计算增量
+            interval: 检查间隔（秒）
+        """
+        self.budget_mb = budget_mb
+        self.interval = interval
+        self.baseline_mb = None
+        self.peak_mb = None
+        self.exceeded = False
+        self._armed = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._previous_handler = None
+
+    @staticmethod
+    def supported():
+        """当前平台和线程是否可以监视内存"""
+        return (hasattr(signal, "SIGUSR1") and hasattr(signal, "pthread_kill")
+                and threading.current_thread() is threading.main_thread()
+                and current_rss_mb() is not None)
+
+    def __enter__(self):
+        if not self.supported():
+            return self
+        self.baseline_mb = self.peak_mb = current_rss_mb()
+        self._previous_handler = signal.signal(signal.SIGUSR1, self._on_signal)
+        self._armed = True
+        self._thread = threading.Thread(target=self._watch, args=(threading.main_thread().ident,), daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._thread is None:
+            return False
+        self._armed = False
+        self._stop.set()
+        self._thread.join()
+        signal.signal(signal.SIGUSR1, self._previous_handler)
+        return False
+
+    def _watch(self, main_thread_id):
+        while not self._stop.wait(self.interval):
+            rss = current_rss_mb()
+            if rss is None:
+                continue
+            self.peak_mb = max(self.peak_mb, rss)
+            if rss - self.baseline_mb > self.budget_mb:
+                self.exceeded = True
+                signal.pthread_kill(main_thread_id, signal.SIGUSR1)
+                return
+
+    def _on_signal(self, signum, frame):
+        if self._armed and self.exceeded:
+            self._armed = False
+            raise MemoryBudgetExceeded(
+                f"批次内存增长 {self.peak_mb - self.baseline_mb:.0f}MB，超过预算 {self.budget_mb:.0f}MB"
+            )
@@ -1,10 +1,60 @@
 """
 PDF生成模块
-负责将数据转换为Markdown格式并生成PDF
+负责将数据转换为Markdown/HTML格式并生成PDF
 """
 
-import markdown2
-from weasyprint import HTML, CSS
+import hashlib
+from html import escape
+
+# markdown2 和 WeasyPrint（及其 Pango/cairo 依赖）导入较慢，在首次使用时才导入
+from .fields import get_field, MISSING
+from .fonts import DEFAULT_FONT_FAMILY, resolve_font, font_face_css, install_subset_timing, subset_timing
+from .profiling import NULL_TIMER
+
+# HTML模板版本，修改 convert_chunk_to_html 的输出结构时需要递增，使渲染缓存失效
+TEMPLATE_VERSION = "1"
+
+# 估算渲染权重时每条记录的固定开销（字符数），对应记录框、标题和分隔标记占用的版面
+RECORD_WEIGHT_OVERHEAD = 100
+
+# 渲染引擎：html 经 WeasyPrint 完整排版；text 由 reportlab 直接绘制纯文本，速度快但不支持Markdown和CSS
+ENGINES = ("html", "text")
+
+# PDF默认样式
+DEFAULT_CSS = """
+body {
+    font-family: "Microsoft YaHei", sans-serif;
+    line-height: 1.8;
+    font-size: 14px;
+    margin: 2cm;
+}
+h2 {
+    color: #333;
+    margin: 1em 0 0.5em;
+}
+h3 {
+    color: #555;
+    margin: 0.8em 0 0.3em;
+    font-size: 16px;
+}
+p {
+    text-align: justify;
+    margin-bottom: 1em;
+}
+hr {
+    border: none;
+    border-top: 1px solid #ccc;
+    margin: 1.5em 0;
+}
+.record {
+    page-break-inside: avoid;
+    break-inside: avoid;
+    margin-bottom: 2em;
+    padding: 1em;
+    border-left: 3px solid #007acc;
+    background-color: #f9f9f9;
+}
+"""
 
 
 def convert_chunk_to_markdown(data_chunk, fields, tag="----"):
@@ -12,7 +62,7 @@ def convert_chunk_to_markdown(data_chunk, fields, tag="----"):
     将数据块转换为 Markdown 格式
     Args:
         data_chunk: 数据块列表
-        fields: 要提取的字段名列表
+        fields: 要提取的字段名列表，嵌套字段可使用点号路径
         tag: 分隔标记
     """
     md_lines = []
@@ -21,8 +71,9 @@ def convert_chunk_to_markdown(data_chunk, fields, tag="----"):
         
         # 处理多个字段
         for field in fields:
-            if field in item:
-                field_content = str(item[field]).strip().replace('\n\n', '<br><br>').replace('\n', '<br>')
+            value = get_field(item, field)
+            if value is not MISSING:
+                field_content = str(value).strip().replace('\n\n', '<br><br>').replace('\n', '<br>')
                 md_lines.append(f"<h3>{field}:</h3>")
                 md_lines.append(f"<p>{field_content}</p>")
         
@@ -31,46 +82,162 @@ def convert_chunk_to_markdown(data_chunk, fields, tag="----"):
     return "\n".join(md_lines)
 
 
+def estimate_render_weight(item, fields):
+    """
+    估算单条记录的渲染成本，以字符数计
+    WeasyPrint的排版耗时和内存大致与文本量成正比，每条记录另加固定开销
+    """
+    weight = RECORD_WEIGHT_OVERHEAD
+    for field in fields:
+        value = get_field(item, field)
+        if value is not MISSING:
+            weight += len(field) + len(str(value))
+    return weight
+
+
+def convert_chunk_to_html(data_chunk, fields, tag="----", markdown_fields=None, timer=NULL_TIMER):
+    """
+    将数据块直接转换为完整的HTML文档，不经过整篇Markdown解析
+    字段值会做HTML转义，只有 markdown_fields 中的字段才按Markdown渲染
+    Args:
+        data_chunk: 数据块列表
+        fields: 要提取的字段名列表，嵌套字段可使用点号路径
+        tag: 分隔标记
+        markdown_fields: 需要按Markdown渲染的字段名列表
+        timer: 性能分析计时器，markdown2 的耗时记为 markdown 阶段
+    """
+    markdown_fields = set(markdown_fields or ())
+    tag_html = escape(tag, quote=False)
+    parts = ['<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"></head>\n<body>']
+    for item in data_chunk:
+        parts.append('<div class="record">')
+
+        for field in fields:
+            value = get_field(item, field)
+            if value is not MISSING:
+                value = str(value).strip()
+                parts.append(f"<h3>{escape(field, quote=False)}:</h3>")
+                if field in markdown_fields:
+                    import markdown2
+                    with timer.stage("markdown"):
+                        parts.append(markdown2.markdown(value, extras=["fenced-code-blocks"]))
+                else:
+                    value = escape(value, quote=False).replace('\n\n', '<br><br>').replace('\n', '<br>')
+                    parts.append(f"<p>{value}</p>")
+
+        parts.append(tag_html)
+        parts.append("</div>")
+    parts.append("</body>\n</html>")
+    return "\n".join(parts)
+
+
+class PDFRenderer:
+    """
+    可复用的PDF渲染器（html 引擎）
+    样式表只解析一次，字体在创建时解析为具体文件并在同一进程的所有批次之间共享
+    """
+
+    def __init__(self, css=DEFAULT_CSS, font_family=DEFAULT_FONT_FAMILY):
+        """
+        Args:
+            css: 渲染使用的CSS样式
+            font_family: 要绑定到本地字体文件的字体族，通过 fc-match 只解析一次；
+                None 表示交给 WeasyPrint 按CSS自行匹配
+        """
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        match = resolve_font(font_family) if font_family else None
+        # 没有覆盖中文的字体，或者匹配到TTC字体集合中的非首个字体（@font-face 无法指定序号）时不绑定，
+        # 交给 fontconfig 按CSS正常回退
+        self.font_path = match.path if match is not None and match.index == 0 else None
+        if self.font_path:
+            css = font_face_css(font_family, self.font_path) + css
+        self.font_config = FontConfiguration()
+        install_subset_timing("html")
+        self.stylesheet = CSS(string=css, font_config=self.font_config)
+        # 渲染结果的版本标识，用于渲染缓存的键
+        self.cache_version = hashlib.sha256(f"{TEMPLATE_VERSION}\0{css}".encode('utf-8')).hexdigest()
+
+    def build_document(self, data_chunk, fields, tag="----", markdown_fields=None, timer=NULL_TIMER):
+        """构建待渲染的HTML文档"""
+        return convert_chunk_to_html(data_chunk, fields, tag, markdown_fields, timer)
+
+    @staticmethod
+    def cache_text(document):
+        """用于计算渲染缓存键的文本"""
+        return document
+
+    def render_document(self, document, pdf_path, timer=NULL_TIMER):
+        """渲染 build_document 构建的文档"""
+        return self.render_html(document, pdf_path, timer)
+
+    def render_html(self, html_content, pdf_path, timer=NULL_TIMER):
+        """
+        将HTML内容渲染为PDF文件
+        Args:
+            timer: 性能分析计时器，排版、写出和字体子集化分别记为 layout、write 和 subset 阶段
+        Returns:
+            int: 生成的PDF页数
+        """
+        from weasyprint import HTML
+
+        with timer.stage("layout"):
+            document = HTML(string=html_content).render(
+                stylesheets=[self.stylesheet],
+                font_config=self.font_config
+            )
+        with timer.stage("write"), subset_timing(timer):
+            # WeasyPrint 默认只嵌入用到的字形子集（full_fonts=False），不保留hinting（hinting=False）
+            document.write_pdf(pdf_path)
+        return len(document.pages)
+
+    def render(self, markdown_content, pdf_path):
+        """
+        将Markdown内容渲染为PDF文件
+        Returns:
+            int: 生成的PDF页数
+        """
+        import markdown2
+
+        html_content = markdown2.markdown(markdown_content, extras=["fenced-code-blocks"])
+        return self.render_html(html_content, pdf_path)
+
+
+_renderers = {}
+
+
+def get_renderer(engine="html"):
+    """
+    获取当前进程共享的渲染器，首次调用时创建
+    Args:
+        engine: 渲染引擎，html 或 text
+    """
+    renderer = _renderers.get(engine)
+    if renderer is None:
+        if engine == "html":
+            renderer = PDFRenderer()
+        elif engine == "text":
+            from .text_renderer import TextPDFRenderer
+            renderer = TextPDFRenderer()
+        else:
+            raise ValueError(f"未知的渲染引擎: {engine}，可选: {', '.join(ENGINES)}")
+        _renderers[engine] = renderer
+    return renderer
+
+
+def discard_renderer(engine="html"):
+    """丢弃当前进程缓存的渲染器，下次调用 get_renderer 时重新创建（如渲染被中途中止后状态可能不完整）"""
+    _renderers.pop(engine, None)
+
+
 def markdown_to_pdf(markdown_content, pdf_path):
     """
     将Markdown内容转换为PDF文件
     Args:
         markdown_content: Markdown格式的内容
         pdf_path: 输出PDF文件路径
+    Returns:
+        int: 生成的PDF页数
     """
-    html_content = markdown2.markdown(markdown_content, extras=["fenced-code-blocks"])
-    custom_css = CSS(string="""
-        body {
-            font-family: "Microsoft YaHei", sans-serif;
-            line-height: 1.8;
-            font-size: 14px;
-            margin: 2cm;
-        }
-        h2 {
-            color: #333;
-            margin: 1em 0 0.5em;
-        }
-        h3 {
-            color: #555;
-            margin: 0.8em 0 0.3em;
-            font-size: 16px;
-        }
-        p {
-            text-align: justify;
-            margin-bottom: 1em;
-        }
-        hr {
-            border: none;
-            border-top: 1px solid #ccc;
-            margin: 1.5em 0;
-        }
-        .record {
-            page-break-inside: avoid;
-            break-inside: avoid;
-            margin-bottom: 2em;
-            padding: 1em;
-            border-left: 3px solid #007acc;
-            background-color: #f9f9f9;
-        }
-    """)
-    HTML(string=html_content).write_pdf(pdf_path, stylesheets=[custom_css])
+    return get_renderer().render(markdown_content, pdf_path)
@@ -0,0 +1,258 @@
+"""
+PDF合并模块
+把已渲染的批次PDF在PDF对象层面拼接为一个文件，或按页数重新切分为多个文件，不重新排版；
+每个批次在书签中对应一项。需要安装可选依赖 pypdf（pip install "dataset-processing[merge]"）
+
+合并时逐个读取源文件，页面引用的对象（内容流、字体、图片等）复制后立即写入输出文件，
+内存中只保留对象偏移表、页面编号和当前源文件，占用取决于单个批次文件的大小而不是合并后的总大小
+"""
+
+import os
+
+from .manifest import RunManifest
+
+
+def part_path(output_path, part):
+    """按页数切分时第 part 个文件的路径，如 merged.pdf -> merged_part1.pdf"""
+    root, ext = os.path.splitext(output_path)
+    return f"{root}_part{part}{ext or '.pdf'}"
+
+
+class _PDFWriter:
+    """
+    流式PDF写入器：对象写出后不再保留，最后写出页面树、书签、交叉引用表和文件尾
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        self._offsets = {}
+        self._next_id = 1
+        self.pages_id = self.allocate()
+        self.page_ids = []
+        self.outline = []
+
+    def allocate(self):
+        """分配一个新的对象编号"""
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def write_object(self, object_id, obj):
+        """写出一个间接对象"""
+        self._offsets[object_id] = self._file.tell()
+        self._file.write(f"{object_id} 0 obj\n".encode('ascii'))
+        obj.write_to_stream(self._file)
+        self._file.write(b"\nendobj\n")
+
+    def close(self):
+        """写出页面树、书签、目录、交叉引用表和文件尾"""
+        from pypdf.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject,
+                                   NumberObject, TextStringObject)
+
+        def ref(object_id):
+            return IndirectObject(object_id, 0, None)
+
+        self.write_object(self.pages_id, DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): ArrayObject(ref(page_id) for page_id in self.page_ids),
+            NameObject("/Count"): NumberObject(len(self.page_ids)),
+        }))
+
+        catalog = DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): ref(self.pages_id),
+        })
+        if self.outline:
+            outline_id = self.allocate()
+            item_ids = [self.allocate() for _ in self.outline]
+            for index, (title, page_id) in enumerate(self.outline):
+                item = DictionaryObject({
+                    NameObject("/Title"): TextStringObject(title),
+                    NameObject("/Parent"): ref(outline_id),
+                    NameObject("/Dest"): ArrayObject([ref(page_id), NameObject("/Fit")]),
+                })
+                if index > 0:
+                    item[NameObject("/Prev")] = ref(item_ids[index - 1])
+                if index < len(item_ids) - 1:
+                    item[NameObject("/Next")] = ref(item_ids[index + 1])
+                self.write_object(item_ids[index], item)
+            self.write_object(outline_id, DictionaryObject({
+                NameObject("/Type"): NameObject("/Outlines"),
+                NameObject("/First"): ref(item_ids[0]),
+                NameObject("/Last"): ref(item_ids[-1]),
+                NameObject("/Count"): NumberObject(len(item_ids)),
+            }))
+            catalog[NameObject("/Outlines")] = ref(outline_id)
+            catalog[NameObject("/PageMode")] = NameObject("/UseOutlines")
+        catalog_id = self.allocate()
+        self.write_object(catalog_id, catalog)
+
+        xref_offset = self._file.tell()
+        size = self._next_id
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for object_id in range(1, size):
+            lines.append(f"{self._offsets[object_id]:010d} 00000 n \n")
+        lines.append(f"trailer\n<< /Size {size} /Root {catalog_id} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+        self._file.write("".join(lines).encode('ascii'))
+        self._file.close()
+
+    def abort(self):
+        self._file.close()
+        os.remove(self.path)
+
+
+class _PageCopier:
+    """
+    把一个源文件中的页面复制到 _PDFWriter
+    间接对象按需复制，每个对象在同一个输出文件中只写出一次；
+    指向源文件页面树或不在当前输出文件中的页面的引用替换为 null
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self._map = {}
+        self._pending = []
+
+    def copy_page(self, page):
+        """复制一页并返回它在输出文件中的对象编号"""
+        from pypdf.generic import IndirectObject, NameObject
+
+        source = page.indirect_reference
+        page_id = self._map.get((source.idnum, source.generation))
+        if page_id is None:
+            page_id = self.writer.allocate()
+            self._map[(source.idnum, source.generation)] = page_id
+        copied = self._copy_dict(page, skip=("/Parent",))
+        copied[NameObject("/Parent")] = IndirectObject(self.writer.pages_id, 0, None)
+        self.writer.write_object(page_id, copied)
+        self._flush()
+        return page_id
+
+    def reserve_pages(self, pages):
+        """预先为将写入当前输出文件的页面分配编号，页面之间的链接（如目录跳转）可以保留"""
+        for page in pages:
+            source = page.indirect_reference
+            self._map.setdefault((source.idnum, source.generation), self.writer.allocate())
+
+    def _flush(self):
+        while self._pending:
+            object_id, obj = self._pending.pop()
+            self.writer.write_object(object_id, self._copy(obj))
+
+    def _copy(self, obj):
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NullObject, StreamObject
+
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            object_id = self._map.get(key)
+            if object_id is None:
+                target = obj.get_object()
+                if isinstance(target, DictionaryObject) and target.get("/Type") in ("/Page", "/Pages"):
+                    return NullObject()
+                object_id = self.writer.allocate()
+                self._map[key] = object_id
+                self._pending.append((object_id, target))
+            return IndirectObject(object_id, 0, None)
+        if isinstance(obj, StreamObject):
+            copied = self._copy_dict(obj, skip=("/Length",), cls=obj.__class__)
+            copied._data = obj._data
+            return copied
+        if isinstance(obj, DictionaryObject):
+            return self._copy_dict(obj)
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._copy(item) for item in obj)
+        return obj
+
+    def _copy_dict(self, obj, skip=(), cls=None):
+        from pypdf.generic import DictionaryObject
+
+        copied = (cls or DictionaryObject)()
+        for key, value in obj.items():
+            if key not in skip:
+                copied[key] = self._copy(value)
+        return copied
+
+
+def merge_pdfs(sources, output_path, pages_per_file=None):
+    """
+    把多个PDF合并为一个文件，或按页数切分为多个文件
+    Args:
+        sources: [(PDF路径, 书签标题), ...]，书签标题为None时不生成书签
+        output_path: 输出文件路径；按页数切分时依次写出 <名称>_part1.pdf、<名称>_part2.pdf ...
+        pages_per_file: 每个输出文件的页数，None 表示全部合并为一个文件
+    Returns:
+        list: 写出的文件路径
+    """
+    from pypdf import PdfReader
+
+    if pages_per_file is not None and pages_per_file < 1:
+        raise ValueError("每个文件的页数必须大于0")
+    written = []
+    writer = None
+
+    def new_writer():
+        path = output_path if pages_per_file is None else part_path(output_path, len(written) + 1)
+        written.append(path)
+        return _PDFWriter(path)
+
+    try:
+        for pdf_path, title in sources:
+            reader = PdfReader(pdf_path)
+            pages = reader.pages
+            start = 0
+            while start < len(pages):
+                if writer is None:
+                    writer = new_writer()
+                room = len(pages) if pages_per_file is None else pages_per_file - len(writer.page_ids)
+                stop = min(len(pages), start + room)
+                copier = _PageCopier(writer)
+                copier.reserve_pages(pages[index] for index in range(start, stop))
+                for index in range(start, stop):
+                    page_id = copier.copy_page(pages[index])
+                    writer.page_ids.append(page_id)
+                    # 批次被切分到下一个文件时，在下一个文件中补一个"续"书签
+                    if index == start and title is not None:
+                        writer.outline.append((title if start == 0 else f"{title}（续）", page_id))
+                start = stop
+                if pages_per_file is not None and len(writer.page_ids) >= pages_per_file:
+                    writer.close()
+                    writer = None
+        if writer is not None:
+            writer.close()
+            writer = None
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+            written.pop()
+        raise
+    return written
+
+
+def merge_batches(output_dir, output_path, pages_per_file=None):
+    """
+    按运行清单中的批次顺序合并输出目录中的批次PDF，每个批次生成一个书签
+    Args:
+        output_dir: process_in_batches 的输出目录
+        output_path: 合并后的文件路径
+        pages_per_file: 每个输出文件的页数，None 表示全部合并为一个文件
+    Returns:
+        list: 写出的文件路径
+    """
+    manifest = RunManifest.load(output_dir)
+    if manifest is None or not manifest.batches:
+        raise ValueError(f"输出目录中没有已完成的批次: {output_dir}")
+    sources = []
+    missing = []
+    for batch_no in sorted(manifest.batches):
+        # 超出内存预算被拆分的批次按子批次顺序合并
+        for entry in manifest.batches[batch_no].get("parts", [manifest.batches[batch_no]]):
+            pdf_path = os.path.join(output_dir, entry["file"])
+            if not os.path.exists(pdf_path):
+                missing.append(entry["file"])
+            title = f"批次 {entry['batch']}（{entry['records']} 条记录）"
+            sources.append((pdf_path, title))
+    if missing:
+        raise ValueError(f"运行清单中有 {len(missing)} 个批次文件不存在（如 {missing[0]}），请先续跑补齐")
+    return merge_pdfs(sources, output_path, pages_per_file)
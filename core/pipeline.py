@@ -0,0 +1,164 @@
+"""
+流水线模块
+用有界队列把读取、构建文档等阶段串联起来，各阶段在独立的线程中与下游阶段同时执行；
+队列满时上游阶段阻塞等待，在途的数据量只与队列深度和各阶段的线程数有关
+"""
+
+import multiprocessing
+import queue
+import threading
+
+# 阶段结束标记
+_DONE = object()
+
+# 正在运行的流水线数量
+_running = 0
+_running_lock = threading.Lock()
+
+# 阻塞等待队列时检查停止标志的间隔（秒）
+_POLL_INTERVAL = 0.1
+
+
+class Pipeline:
+    """
+    线程流水线：source 在读取线程中迭代，每个阶段由若干线程处理上一阶段的输出，
+    迭代 Pipeline 得到最后一个阶段的输出
+
+        pipeline = Pipeline(chunks, queue_size=2)
+        pipeline.add_stage(build, workers=2)
+        for document in pipeline:
+            ...
+
+    阶段的线程数大于1时输出顺序与输入顺序不一定一致。
+    任一阶段（包括读取 source）抛出异常时停止整个流水线，并在迭代处重新抛出该异常；
+    迭代提前结束时各阶段在处理完手上的数据后退出，source 会在读取线程中被关闭
+    """
+
+    def __init__(self, source, queue_size=2):
+        """
+        Args:
+            source: 数据来源的可迭代对象，只在读取线程中迭代
+            queue_size: 相邻阶段之间队列的深度
+        """
+        self.source = source
+        self.queue_size = max(1, int(queue_size))
+        self._stages = []
+        self._stop = threading.Event()
+        self._error = None
+        self._lock = threading.Lock()
+
+    def add_stage(self, func, workers=1):
+        """添加一个阶段：workers 个线程对上一阶段的每个输出调用 func，返回值传给下一阶段"""
+        self._stages.append((func, max(1, int(workers))))
+        return self
+
+    def __iter__(self):
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self._stages) + 1)]
+        # 每个队列的消费者数量，上游结束时向队列放入同样数量的结束标记
+        consumers = [workers for _, workers in self._stages] + [1]
+        threads = [threading.Thread(target=self._read, args=(queues[0], consumers[0]), daemon=True)]
+        for index, (func, workers) in enumerate(self._stages):
+            remaining = [workers]
+            for _ in range(workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(func, queues[index], queues[index + 1], consumers[index + 1], remaining),
+                    daemon=True
+                ))
+        global _running
+        with _running_lock:
+            _running += 1
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _DONE:
+                    break
+                yield item
+            if self._error is not None:
+                raise self._error
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            with _running_lock:
+                _running -= 1
+
+    def _read(self, outbox, consumers):
+        try:
+            for item in self.source:
+                if not self._put(outbox, item):
+                    return
+        except BaseException as e:
+            self._fail(e)
+            return
+        finally:
+            close = getattr(self.source, "close", None)
+            if close is not None:
+                close()
+        self._finish(outbox, consumers)
+
+    def _work(self, func, inbox, outbox, consumers, remaining):
+        while True:
+            item = self._get(inbox)
+            if item is _DONE:
+                break
+            try:
+                result = func(item)
+            except BaseException as e:
+                self._fail(e)
+                return
+            if not self._put(outbox, result):
+                return
+        # 同一阶段的最后一个线程结束时通知下游
+        with self._lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            self._finish(outbox, consumers)
+
+    def _get(self, inbox):
+        """从队列取出一项，流水线停止后返回结束标记"""
+        while not self._stop.is_set():
+            try:
+                return inbox.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _put(self, outbox, item):
+        """放入一项，队列满时等待；流水线停止后放弃并返回False"""
+        while not self._stop.is_set():
+            try:
+                outbox.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _finish(self, outbox, consumers):
+        for _ in range(consumers):
+            if not self._put(outbox, _DONE):
+                return
+
+    def _fail(self, error):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+
+def pool_context():
+    """
+    创建进程池时使用的 multiprocessing 上下文
+    在非主线程中（流水线的读取线程、Web服务的任务线程）创建进程池，或者有流水线线程正在运行时，
+    fork 出的子进程只复制调用线程，其他线程持有的锁在子进程中永远不会释放，可能导致子进程死锁；
+    这时使用 forkserver，子进程由单线程的服务进程 fork 出来。其他情况返回None，使用平台默认方式
+    """
+    if threading.current_thread() is threading.main_thread() and not _running:
+        return None
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("forkserver")
@@ -5,44 +5,657 @@
 
 import math
 import os
-from datetime import datetime
+from collections import deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
 from tqdm import tqdm
 
-from .data_loader import load_data_file
-from .pdf_generator import convert_chunk_to_markdown, markdown_to_pdf
+from .data_loader import iter_records, iter_chunks, iter_weighted_chunks, is_jsonl_path
+from .manifest import RunManifest, fingerprint_input, file_sha256
+from .pdf_generator import get_renderer, discard_renderer, estimate_render_weight, ENGINES
+from .render_cache import RenderCache, DEFAULT_CACHE_SIZE_MB
+from .profiling import StageTimer, NULL_TIMER, peak_rss_mb
+from .query import Query
+from .dedup import Deduplicator
+from .pipeline import Pipeline, pool_context
+from .jsonl_index import JsonlIndex
+from .memory_guard import MemoryWatchdog, release_memory
+from .incremental import IncrementalRun
+from .compression import detect_compression
 
+# 每完成多少个批次检查一次渲染缓存的大小
+CACHE_EVICT_INTERVAL = 50
 
-def process_in_batches(json_path_or_data, output_dir, fields, batch_size=100, tag="----"):
+# 当前渲染进程的批次内存预算（MB），由进程池初始化时设置，None 表示不限制
+_memory_budget_mb = None
+
+
+def _render_batch(batch_no, chunk, fields, tag, markdown_fields, pdf_path, cache=None, profile=False,
+                  engine="html", prebuilt=None):
+    """
+    渲染单个批次（可在子进程中执行），复用当前进程的渲染器
+    启用渲染缓存时，内容未变化的批次直接复用缓存中的PDF
+    Args:
+        prebuilt: 构建阶段已构建好的 (文档, 记录数, 构建阶段耗时)，此时不再使用 chunk
+    Returns:
+        dict: 批次结果，包含批次号、文件路径、校验和、记录数、页数、文件大小以及是否命中缓存；
+            profile 为True时另含各阶段耗时和渲染进程的峰值内存
+    """
+    timer = StageTimer() if profile else NULL_TIMER
+    # 渲染器（字体解析、样式表）在每个进程中只创建一次，只有该进程的第一个批次会计入耗时
+    with timer.stage("fonts"):
+        renderer = get_renderer(engine)
+    if prebuilt is None:
+        with timer.stage("build"):
+            document = renderer.build_document(chunk, fields, tag, markdown_fields, timer)
+        records, build_stages = len(chunk), {}
+    else:
+        document, records, build_stages = prebuilt
+    # 先删除旧文件：它可能是缓存条目的硬链接，直接覆盖写入会破坏缓存
+    if os.path.exists(pdf_path):
+        os.remove(pdf_path)
+
+    cached = False
+    pages = None
+    if cache is not None:
+        key = cache.make_key(renderer.cache_text(document), renderer.cache_version)
+        with timer.stage("cache"):
+            cached = cache.fetch(key, pdf_path)
+    if not cached:
+        pages = renderer.render_document(document, pdf_path, timer)
+        if cache is not None:
+            with timer.stage("cache"):
+                cache.store(key, pdf_path)
+
+    with timer.stage("checksum"):
+        sha256 = file_sha256(pdf_path)
+
+    result = {
+        "batch": batch_no,
+        "path": pdf_path,
+        "sha256": sha256,
+        "records": records,
+        "pages": pages,
+        "cached": cached,
+        "size": os.path.getsize(pdf_path),
+    }
+    if profile:
+        result["profile"] = {"pid": os.getpid(), "stages": {**build_stages, **timer.stages},
+                             "peak_rss_mb": peak_rss_mb()}
+    return result
+
+
+def _render_with_budget(task, budget_mb):
+    """
+    在内存预算内渲染批次（在渲染进程中执行）：超出预算或抛出 MemoryError 时删除不完整的输出并重新抛出，
+    由主进程把批次拆分后在新的渲染进程中重试。
+    超出预算的异常由信号处理函数在任意位置抛出，排版库和渲染器的状态可能不完整，
+    因此丢弃缓存的渲染器，当前进程之后由主进程回收，不再用来渲染拆分后的子批次
+    """
+    pdf_path, engine = task[5], task[8]
+    try:
+        with MemoryWatchdog(budget_mb):
+            return _render_batch(*task)
+    except MemoryError:
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+        discard_renderer(engine)
+        release_memory()
+        raise
+
+
+def _split_and_retry(task, render, reason):
+    """
+    把批次的数据块对半拆分为子批次（批次号和文件名加 _1、_2 后缀），依次用 render 渲染
+    任一子批次失败时整个批次按失败处理，删除已完成的子批次文件
+    Returns:
+        dict: 合并后的批次结果，parts 为各子批次的结果
+    """
+    batch_no, chunk, fields, tag, markdown_fields, pdf_path, cache, profile, engine = task[:9]
+    middle = len(chunk) // 2
+    root, ext = os.path.splitext(pdf_path)
+    parts = []
+    try:
+        for index, half in enumerate((chunk[:middle], chunk[middle:]), 1):
+            sub_task = (f"{batch_no}_{index}", half, fields, tag, markdown_fields, f"{root}_{index}{ext}",
+                        cache, profile, engine)
+            result = render(sub_task)
+            parts.extend(result.get("parts", [result]))
+    except Exception:
+        for part in parts:
+            if os.path.exists(part["path"]):
+                os.remove(part["path"])
+        raise
+    return _combine_parts(batch_no, parts, reason)
+
+
+def _combine_parts(batch_no, parts, reason):
+    """合并子批次的结果"""
+    pages = [part["pages"] for part in parts]
+    result = {
+        "batch": batch_no,
+        "parts": parts,
+        "split_reason": reason,
+        "records": sum(part["records"] for part in parts),
+        "pages": sum(pages) if None not in pages else None,
+        "cached": all(part["cached"] for part in parts),
+        "size": sum(part["size"] for part in parts),
+    }
+    profiles = [part["profile"] for part in parts if "profile" in part]
+    if profiles:
+        stages = {}
+        for profile in profiles:
+            for name, timing in profile["stages"].items():
+                total = stages.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+                total["wall"] += timing["wall"]
+                total["cpu"] += timing["cpu"]
+        peaks = [profile["peak_rss_mb"] for profile in profiles if profile["peak_rss_mb"] is not None]
+        result["profile"] = {"pid": profiles[-1]["pid"], "stages": stages,
+                             "peak_rss_mb": max(peaks) if peaks else None}
+    return result
+
+
+def _render_task(*task):
+    """进程池中执行的批次任务，设置了内存预算时超出预算的批次抛出 MemoryError"""
+    if _memory_budget_mb is None:
+        return _render_batch(*task)
+    return _render_with_budget(task, _memory_budget_mb)
+
+
+def _build_task(renderer, keep_chunk, task):
+    """
+    构建阶段：在流水线线程中把数据块构建为文档，渲染阶段直接使用构建好的文档
+    构建失败时原样返回任务，由渲染阶段重新构建，失败按该批次失败处理；
+    keep_chunk 为True时保留原数据块，超出内存预算时可以拆分重试
+    """
+    batch_no, chunk, fields, tag, markdown_fields, pdf_path, cache, profile, engine = task[:9]
+    timer = StageTimer() if profile else NULL_TIMER
+    try:
+        with timer.stage("build"):
+            document = renderer.build_document(chunk, fields, tag, markdown_fields, timer)
+    except Exception:
+        return task
+    prebuilt = (document, len(chunk), timer.stages)
+    return batch_no, chunk if keep_chunk else None, fields, tag, markdown_fields, pdf_path, cache, profile, \
+        engine, prebuilt
+
+
+def _staged_tasks(tasks, skipped_batches, on_skip, prefetch, build_workers, engine, cancel_event=None,
+                  keep_chunks=False):
+    """
+    把任务的读取（以及文档构建）放到流水线线程中，与渲染同时进行
+    读取线程中跳过的批次记入 skipped_batches，由这里在主线程中报告；
+    cancel_event 被设置后丢弃队列中已读取的批次
+    """
+    pipeline = Pipeline(tasks, queue_size=max(1, prefetch))
+    if build_workers:
+        pipeline.add_stage(partial(_build_task, get_renderer(engine), keep_chunks), workers=build_workers)
+    for task in pipeline:
+        while skipped_batches:
+            on_skip(skipped_batches.popleft())
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        yield task
+    while skipped_batches:
+        on_skip(skipped_batches.popleft())
+
+
+def _init_worker(engine="html", memory_budget_mb=None):
+    """进程池初始化：每个子进程只创建一次渲染器，并设置批次内存预算"""
+    global _memory_budget_mb
+    _memory_budget_mb = memory_budget_mb
+    get_renderer(engine)
+
+
+def _iter_tasks(chunks, manifest, fields, tag, markdown_fields, cache, on_skip, cancel_event=None, profile=False,
+                engine="html", first_batch=1):
+    """
+    按顺序生成批次任务，批次号和文件名在主进程中确定
+    续跑时跳过清单中已完成的批次；cancel_event 被设置后不再生成新任务
+    """
+    for batch_no, chunk in enumerate(chunks, first_batch):
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        if manifest.is_done(batch_no):
+            on_skip(batch_no)
+            continue
+        pdf_output_path = os.path.join(manifest.output_dir, manifest.file_name(batch_no))
+        yield batch_no, chunk, fields, tag, markdown_fields, pdf_output_path, cache, profile, engine
+
+
+def _run_sequential(tasks, on_result, on_failure):
+    """在当前进程中逐个渲染批次"""
+    for task in tasks:
+        try:
+            result = _render_batch(*task)
+        except Exception as e:
+            on_failure(task[0], e)
+        else:
+            on_result(result)
+
+
+class _IsolatedPool:
+    """
+    只有一个渲染进程的进程池，逐个渲染批次
+    进程异常退出时可以确定是哪个批次导致的；退出或超出内存预算后下一个批次使用新的进程
+    """
+
+    def __init__(self, engine="html", memory_budget_mb=None):
+        self.engine = engine
+        self.memory_budget_mb = memory_budget_mb
+        self._executor = None
+
+    def render(self, task):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=pool_context(),
+                                                 initializer=_init_worker,
+                                                 initargs=(self.engine, self.memory_budget_mb))
+        try:
+            return self._executor.submit(_render_task, *task).result()
+        except (BrokenProcessPool, MemoryError):
+            self.close()
+            raise
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def _render_isolated(pool, task, memory_budget_mb=None):
+    """
+    在单独的进程中渲染批次：进程池损坏时在途的批次，以及超出内存预算后拆分出的子批次
+    再次导致进程退出时，设置了内存预算则把批次对半拆分后重试，否则按失败处理；
+    超出预算时回收该进程，拆分后的子批次在新的进程中渲染
+    """
+    try:
+        return pool.render(task)
+    except BrokenProcessPool as e:
+        pdf_path, chunk = task[5], task[1]
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+        if memory_budget_mb is None or chunk is None or len(chunk) < 2:
+            raise RuntimeError("渲染进程异常退出（可能因内存不足被系统终止）") from e
+        return _split_and_retry(task, partial(_render_isolated, pool, memory_budget_mb=memory_budget_mb),
+                                "渲染进程异常退出")
+    except MemoryError as e:
+        if memory_budget_mb is None:
+            raise
+        return _split_over_budget(pool, task, memory_budget_mb, e)
+
+
+def _split_over_budget(pool, task, memory_budget_mb, error):
+    """把超出内存预算的批次对半拆分后在单独的进程中重试，单条记录仍超出时按失败处理"""
+    chunk = task[1]
+    if chunk is None or len(chunk) < 2:
+        raise error
+    return _split_and_retry(task, partial(_render_isolated, pool, memory_budget_mb=memory_budget_mb), str(error))
+
+
+def _run_parallel(tasks, workers, on_result, on_failure, cancel_event=None, engine="html", memory_budget_mb=None):
+    """
+    使用进程池渲染批次
+    同时在途的批次数限制为 workers 的两倍，避免一次性把所有数据块提交到进程池；
+    cancel_event 被设置后取消尚未开始的批次，只等待正在渲染的批次结束。
+    渲染进程异常退出（如被系统因内存不足终止、C扩展崩溃）后进程池不能再使用：
+    等待在途的批次全部结束，把其中未完成的批次在单独的进程中逐个重新渲染，再创建新的进程池继续。
+    批次超出内存预算时同样等待在途的批次结束后回收整个进程池（被中止的进程状态可能不完整），
+    把该批次拆分后在单独的进程中重试
+    """
+    pending = {}
+    crashed = []
+    over_budget = [] if memory_budget_mb is not None else None
+    executor = None
+    isolated = _IsolatedPool(engine, memory_budget_mb)
+
+    def recover():
+        nonlocal executor
+        # 进程池损坏后，在途的批次都会以 BrokenProcessPool 结束
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            _collect(done, pending, on_result, on_failure, crashed, over_budget)
+        executor.shutdown(wait=True)
+        executor = None
+        retries = [(task, partial(_render_isolated, isolated, task, memory_budget_mb)) for task in crashed]
+        retries += [(task, partial(_split_over_budget, isolated, task, memory_budget_mb, error))
+                    for task, error in over_budget or ()]
+        crashed.clear()
+        if over_budget:
+            over_budget.clear()
+        for task, render in retries:
+            try:
+                result = render()
+            except Exception as e:
+                on_failure(task[0], e)
+            else:
+                on_result(result)
+        isolated.close()
+
+    try:
+        for task in tasks:
+            if executor is None:
+                # 进程池在流水线线程启动后才创建，pool_context 会改用 forkserver
+                executor = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(),
+                                               initializer=_init_worker, initargs=(engine, memory_budget_mb))
+            try:
+                pending[executor.submit(_render_task, *task)] = task
+            except BrokenProcessPool:
+                crashed.append(task)
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                _collect(done, pending, on_result, on_failure, crashed, over_budget)
+            if crashed or over_budget:
+                recover()
+        if cancel_event is not None and cancel_event.is_set():
+            for future in pending:
+                future.cancel()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            _collect(done, pending, on_result, on_failure, crashed, over_budget)
+            if crashed or over_budget:
+                recover()
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+        isolated.close()
+
+
+def _collect(done, pending, on_result, on_failure, crashed, over_budget=None):
+    """
+    收集已完成批次的结果，失败的批次只记录不中断，已取消的批次直接忽略；
+    因进程池损坏而未完成的批次放入 crashed，由调用方重新渲染；
+    over_budget 不为None时，超出内存预算的批次连同异常放入其中，由调用方拆分重试
+    """
+    for future in done:
+        task = pending.pop(future)
+        if future.cancelled():
+            continue
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            crashed.append(task)
+        except MemoryError as e:
+            if over_budget is None:
+                on_failure(task[0], e)
+            else:
+                over_budget.append((task, e))
+        except Exception as e:
+            on_failure(task[0], e)
+        else:
+            on_result(result)
+
+
+def _selected_count(total, query):
+    """没有筛选条件时，按 offset/limit 计算 total 条记录中被选中的记录数"""
+    count = max(0, total - query.offset)
+    return count if query.limit is None else min(count, query.limit)
+
+
+def process_in_batches(json_path_or_data, output_dir, fields, batch_size=100, tag="----", workers=1,
+                       markdown_fields=None, parse_workers=1, resume=False, cache_dir=None,
+                       cache_size_mb=DEFAULT_CACHE_SIZE_MB, batch_weight=None, progress_callback=None,
+                       cancel_event=None, profiler=None, engine="html", query=None, dedup=False,
+                       prefetch=0, build_workers=0, batch_range=None, index=False, index_key=None,
+                       memory_budget_mb=None, incremental=False, render_in_subprocess=False):
     """
     批量处理JSON数据并生成PDF
     Args:
-        json_path_or_data: JSON/JSONL文件路径或已加载的数据列表
+        json_path_or_data: JSON/JSONL文件路径或已加载的数据列表，文件会被流式读取
         output_dir: 输出目录
         fields: 要提取的字段列表
-        batch_size: 批处理大小
+        batch_size: 批处理大小；指定 batch_weight 时作为每批记录数的上限
         tag: 分隔标记
+        workers: 并行渲染的进程数，1 表示在当前进程中顺序渲染
+        markdown_fields: 需要按Markdown渲染的字段，其余字段按纯文本转义输出
+        parse_workers: JSONL文件并行解析的进程数，大于1时按字节区间多进程解析
+        resume: 是否根据输出目录中的运行清单跳过已完成的批次，只渲染缺失的批次
+        cache_dir: 渲染缓存目录，内容未变化的批次直接复用缓存的PDF；None 表示不使用缓存
+        cache_size_mb: 渲染缓存大小上限（MB），超过后按最近使用时间淘汰
+        batch_weight: 按估算的渲染字符数打包批次，使各批次的渲染耗时和内存大致相同；
+            None 表示按固定记录数分批
+        progress_callback: 每个批次结束（完成、失败或跳过）后调用，参数为进度字典：
+            {"done": 已结束批次数, "total": 总批次数或None, "records": 已渲染记录数,
+             "batch": 批次号, "status": "done"/"failed"/"skipped",
+             "pages": 本批次渲染的页数，命中缓存、失败或跳过时为None}
+        cancel_event: threading.Event，设置后不再开始新的批次，已在渲染的批次完成后返回
+        profiler: core.profiling.Profiler，记录每个批次各阶段的墙钟时间、CPU时间和峰值内存；
+            None 表示不做性能分析
+        engine: 渲染引擎，html 经 WeasyPrint 完整排版；text 直接绘制纯文本（需要 reportlab），
+            速度快得多但不支持 markdown_fields
+        query: core.query.Query，加载时按条件筛选记录、按 offset/limit 截取；
+            无论是否指定，加载时都只保留 fields 中的字段
+        dedup: 是否按 fields 的内容去除重复记录，在筛选和 offset/limit 之后进行；
+            内存中的哈希超过上限后转存到临时SQLite数据库
+        prefetch: 读取阶段最多预先读取的批次数；大于0时在单独的线程中读取和解析数据，
+            与构建、渲染同时进行；0 表示在渲染间隙按需读取
+        build_workers: 构建文档（包括Markdown渲染）的线程数；大于0时在主进程的流水线线程中构建，
+            渲染阶段只做排版和写出；0 表示在渲染阶段中构建
+        batch_range: (起始批次号, 结束批次号)，只生成这些批次（包含两端，结束批次号为None表示到最后），
+            批次号与完整运行时一致；输出目录中已有参数一致的运行清单时沿用它，文件名不变，
+            只重新生成范围内的批次（resume 为True时只生成其中缺失的批次），其他批次保持不变；
+            需要固定的批次大小，不能与 batch_weight、dedup 同时使用
+        index: 是否使用JSONL偏移索引（保存在输入文件旁的 .idx 文件中，没有或已过期时先建立）；
+            没有筛选条件时直接定位到 offset 或 batch_range 对应的记录，并且可以立即得到总批次数
+        index_key: 建立索引时同时保存的键字段，供 JsonlIndex.find 按键查找记录
+        memory_budget_mb: 每个批次的内存预算（MB，渲染进程RSS在批次开始后的增量）；设置后即使 workers 为1
+            也在子进程中渲染，超出预算或抛出 MemoryError 的批次被对半拆分为子批次
+            （文件名为 batchN_1、batchN_2 ...）重试，拆分情况记入运行清单和运行总结；None 表示不限制
+        incremental: 增量模式，只用于只追加写入的未压缩JSONL文件：只读取上次运行之后追加的完整行，
+            生成的批次号接着上次运行继续编号；输出目录中的检查点（checkpoint.json）记录已处理部分的
+            字节偏移、记录数和内容哈希，文件被截断、已处理部分被改写或参数变化时回退为完整运行。
+            有批次失败或被取消时不更新检查点，下次运行重新处理这些记录。
+            不能与 batch_range、offset/limit 和 index 同时使用，parse_workers 不生效
+        render_in_subprocess: 为True时即使 workers 为1也在子进程中渲染，当前进程只负责读取和调度；
+            用于在服务进程（如Web界面）中调用，排版不占用服务进程的GIL，各任务也不共享同一个渲染器
+    Returns:
+        int: 输出目录中已完成的PDF文件数量（包括续跑时跳过的批次）；增量模式下为本次生成的数量
     """
+    if engine not in ENGINES:
+        raise ValueError(f"未知的渲染引擎: {engine}，可选: {', '.join(ENGINES)}")
+    if engine == "text" and markdown_fields:
+        raise ValueError("纯文本引擎不支持Markdown字段")
+    first_batch = 1
+    if batch_range is not None:
+        first_batch, last_batch = batch_range
+        if first_batch < 1 or (last_batch is not None and last_batch < first_batch):
+            raise ValueError(f"无效的批次范围: {first_batch}-{last_batch}")
+        if batch_weight or dedup:
+            raise ValueError("按批次范围处理需要固定的批次大小，不能与 batch_weight 或去重同时使用")
+    if incremental:
+        if (not isinstance(json_path_or_data, str) or not is_jsonl_path(json_path_or_data)
+                or detect_compression(json_path_or_data) is not None):
+            raise ValueError("增量模式只支持未压缩的JSONL文件")
+        if batch_range is not None or index or (query is not None and (query.offset or query.limit is not None)):
+            raise ValueError("增量模式不能与批次范围、offset/limit 或偏移索引同时使用")
     os.makedirs(output_dir, exist_ok=True)
-    
-    # 判断输入是文件路径还是数据
-    if isinstance(json_path_or_data, str):
-        data = load_data_file(json_path_or_data)
+
+    params = {
+        # 增量模式下文件内容的变化由检查点判断，运行清单只记录路径
+        "input": ({"path": os.path.abspath(json_path_or_data), "incremental": True} if incremental
+                  else fingerprint_input(json_path_or_data)),
+        "fields": list(fields),
+        "batch_size": batch_size,
+        "tag": tag,
+        "markdown_fields": list(markdown_fields or []),
+        "batch_weight": batch_weight,
+    }
+    # 只在非默认值时写入，使已有的运行清单仍可续跑
+    if engine != "html":
+        params["engine"] = engine
+    if query is not None and query.filters_records:
+        params["query"] = query.describe()
+    if dedup:
+        params["dedup"] = True
+    # 加载时只保留要输出的字段，其余字段解析后立即丢弃
+    query = (query or Query()).with_fields(fields)
+    if batch_range is not None:
+        count = None if last_batch is None else (last_batch - first_batch + 1) * batch_size
+        query = query.narrowed((first_batch - 1) * batch_size, count)
+    incremental_run = None
+    if incremental:
+        incremental_run = IncrementalRun(output_dir, json_path_or_data, params)
+        if incremental_run.full:
+            print(f"🔁 {incremental_run.reason}，从头完整处理")
+        manifest = RunManifest.open(output_dir, params, resume=not incremental_run.full)
+        # 上次增量运行中途失败时留下的批次会按相同的批次号重新生成
+        manifest.discard(incremental_run.next_batch)
+        first_batch = incremental_run.next_batch
+    elif batch_range is not None:
+        # 在完整运行的输出目录中沿用其运行清单，文件名不变，只替换范围内的批次；续跑时只补齐缺失的批次
+        manifest = RunManifest.open(output_dir, params, resume, reuse=True)
+        if not resume:
+            manifest.discard(first_batch, last_batch)
+    else:
+        manifest = RunManifest.open(output_dir, params, resume)
+
+    # 判断输入是文件路径还是数据：文件按批次流式读取，峰值内存只与batch_size相关
+    if incremental_run is not None:
+        records = query.apply(incremental_run.iter_records())
+        total_records = None
+    elif isinstance(json_path_or_data, str):
+        jsonl_index = JsonlIndex.open(json_path_or_data, index_key, parse_workers) if index else None
+        records = iter_records(json_path_or_data, parse_workers, query, jsonl_index)
+        total_records = len(jsonl_index) if jsonl_index is not None else None
     else:
-        data = json_path_or_data
-    
-    total = len(data)
-    batches = math.ceil(total / batch_size)
+        records = json_path_or_data
+        total_records = len(records)
+        records = query.apply(records)
+    batches = None
+    if total_records is not None and not (batch_weight or dedup or query.conditions):
+        batches = math.ceil(_selected_count(total_records, query) / batch_size)
+
+    deduplicator = None
+    if dedup:
+        deduplicator = Deduplicator(fields)
+        records = deduplicator.filter(records)
+
+    if batch_weight:
+        chunks = iter_weighted_chunks(records, partial(estimate_render_weight, fields=fields),
+                                      batch_weight, batch_size)
+    else:
+        chunks = iter_chunks(records, batch_size)
+    if profiler is not None:
+        profiler.start()
+        chunks = profiler.time_loading(chunks, first_batch)
+
+    workers = max(1, int(workers or 1))
+    cache = RenderCache(cache_dir, cache_size_mb) if cache_dir else None
+    failures = []
+    skipped = []
+    cache_hits = []
+    splits = []
+    rendered_records = 0
+    output_bytes = 0
+    rendered_pages = 0
+
+    with tqdm(total=batches, desc="生成PDF中", ncols=80) as progress:
+
+        def report(batch_no, status, pages=None):
+            progress.update(1)
+            if progress_callback is not None:
+                progress_callback({
+                    "done": progress.n,
+                    "total": batches,
+                    "records": rendered_records,
+                    "batch": batch_no,
+                    "status": status,
+                    "pages": pages,
+                })
+
+        def on_result(result):
+            nonlocal rendered_records, output_bytes, rendered_pages
+            if "parts" in result:
+                manifest.mark_split(result["batch"], [
+                    {"batch": part["batch"], "file": os.path.basename(part["path"]),
+                     "sha256": part["sha256"], "records": part["records"]}
+                    for part in result["parts"]
+                ])
+                splits.append((result["batch"], [part["batch"] for part in result["parts"]]))
+                progress.write(f"✂️ 批次 {result['batch']} {result['split_reason']}，"
+                               f"已拆分为 {len(result['parts'])} 个子批次")
+            else:
+                manifest.mark_done(result["batch"], os.path.basename(result["path"]),
+                                   result["sha256"], result["records"])
+            if result["cached"]:
+                cache_hits.append(result["batch"])
+            rendered_records += result["records"]
+            output_bytes += result["size"]
+            rendered_pages += result["pages"] or 0
+            if profiler is not None:
+                profiler.add_batch(result["batch"], "done", result)
+            report(result["batch"], "done", result["pages"])
+            if cache is not None and progress.n % CACHE_EVICT_INTERVAL == 0:
+                cache.evict()
+
+        def on_failure(batch_no, error):
+            failures.append((batch_no, error))
+            progress.write(f"❌ 批次 {batch_no} 生成失败: {error}")
+            if profiler is not None:
+                profiler.add_batch(batch_no, "failed")
+            report(batch_no, "failed")
+
+        def on_skip(batch_no):
+            skipped.append(batch_no)
+            if profiler is not None:
+                profiler.add_batch(batch_no, "skipped")
+            report(batch_no, "skipped")
 
-    for i in tqdm(range(batches), desc="生成PDF中", ncols=80):
-        start = i * batch_size
-        end = min(start + batch_size, total)
-        chunk = data[start:end]
+        if prefetch or build_workers:
+            skipped_batches = deque()
+            tasks = _iter_tasks(chunks, manifest, fields, tag, markdown_fields, cache, skipped_batches.append,
+                                cancel_event, profile=profiler is not None, engine=engine, first_batch=first_batch)
+            tasks = _staged_tasks(tasks, skipped_batches, on_skip, prefetch, build_workers, engine, cancel_event,
+                                  keep_chunks=memory_budget_mb is not None)
+        else:
+            tasks = _iter_tasks(chunks, manifest, fields, tag, markdown_fields, cache, on_skip, cancel_event,
+                                profile=profiler is not None, engine=engine, first_batch=first_batch)
+        # 设置了内存预算时始终在子进程中渲染，超出预算的批次不会影响主进程
+        if workers == 1 and memory_budget_mb is None and not render_in_subprocess:
+            _run_sequential(tasks, on_result, on_failure)
+        else:
+            _run_parallel(tasks, workers, on_result, on_failure, cancel_event, engine, memory_budget_mb)
+        batches = progress.n
 
-        markdown_content = convert_chunk_to_markdown(chunk, fields, tag)
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        pdf_output_path = os.path.join(output_dir, f'医疗问诊_{timestamp}_batch{i+1}.pdf')
+    if cache is not None:
+        cache.evict()
+    if profiler is not None:
+        profiler.finish()
 
-        markdown_to_pdf(markdown_content, pdf_output_path)
+    cancelled = cancel_event is not None and cancel_event.is_set()
+    if incremental_run is not None and not failures and not cancelled:
+        incremental_run.commit(first_batch + batches)
 
-    print(f"\n✅ 全部完成，共生成 {batches} 个 PDF 文件，输出路径：{output_dir}")
-    return batches
+    succeeded = batches - len(failures)
+    print(f"\n✅ 全部完成，共生成 {succeeded - len(skipped)} 个 PDF 文件，输出路径：{output_dir}")
+    if output_bytes:
+        size_line = f"📦 本次输出 {output_bytes / (1024 * 1024):.2f}MB"
+        if rendered_pages:
+            size_line += f"，平均每页 {output_bytes / rendered_pages / 1024:.1f}KB"
+        print(size_line)
+    if deduplicator is not None:
+        stats = deduplicator.stats()
+        print(f"🧹 去重: 读取 {stats['records']} 条记录，跳过 {stats['duplicates']} 条重复记录，"
+              f"保留 {stats['unique']} 条")
+    if skipped:
+        print(f"⏭️ 跳过 {len(skipped)} 个已完成的批次")
+    if incremental_run is not None:
+        total = incremental_run.records_before + incremental_run.records_read
+        if failures or cancelled:
+            print(f"📈 增量处理: 读取 {incremental_run.records_read} 条新增记录，"
+                  f"检查点未更新，下次运行将重新处理这些记录")
+        else:
+            print(f"📈 增量处理: 新增 {incremental_run.records_read} 条记录，累计 {total} 条，"
+                  f"下次从批次 {first_batch + batches} 开始")
+    if cancelled:
+        print("⏹️ 处理已取消，可使用续跑模式继续")
+    if splits:
+        print(f"✂️ 有 {len(splits)} 个批次因超出内存预算或渲染进程退出被拆分重试:")
+        for batch_no, parts in splits:
+            print(f"   批次 {batch_no} → {', '.join(parts)}")
+    if cache is not None:
+        print(f"♻️ 渲染缓存命中 {len(cache_hits)} 个批次")
+    if failures:
+        failed = ", ".join(str(batch_no) for batch_no, _ in sorted(failures, key=lambda f: f[0]))
+        print(f"⚠️ 有 {len(failures)} 个批次生成失败: {failed}")
+    return succeeded
@@ -0,0 +1,211 @@
+"""
+性能分析模块
+记录批量处理中每个阶段、每个批次的墙钟时间、CPU时间和峰值内存，
+可通过回调接入外部监控系统，也可写出JSON/CSV报告
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+# 批次处理的各个阶段，报告中按此顺序输出
+#   load: 读取和解析记录（主进程）      fonts: 创建渲染器、解析字体（每个进程一次）
+#   build: 构建HTML或文本块（不含markdown）
+#   markdown: markdown2 渲染字段        layout: 排版（WeasyPrint 或纯文本折行分页）
+#   write: 写出PDF文件（不含字体子集化） subset: 字体子集化和嵌入（每个批次）
+#   cache: 渲染缓存的查找和写入         checksum: 计算输出文件校验和
+STAGES = ("load", "fonts", "build", "markdown", "layout", "write", "subset", "cache", "checksum")
+
+
+def peak_rss_mb():
+    """当前进程的峰值内存（MB），不支持的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 的单位是KB，macOS 是字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageTimer:
+    """
+    累计各阶段的墙钟时间和CPU时间
+    阶段可以嵌套，外层阶段只计入扣除内层阶段后的时间，各阶段之和即总耗时；
+    CPU时间按当前线程统计，流水线中同时运行的其他阶段不会计入
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name):
+        self._stack.append([0.0, 0.0])
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            child_wall, child_cpu = self._stack.pop()
+            if self._stack:
+                self._stack[-1][0] += wall
+                self._stack[-1][1] += cpu
+            entry = self.stages.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+            entry["wall"] += wall - child_wall
+            entry["cpu"] += cpu - child_cpu
+
+
+class _NullTimer:
+    """不记录任何数据的计时器，未启用性能分析时使用"""
+
+    stages = {}
+
+    def stage(self, name):
+        return nullcontext()
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Profiler:
+    """
+    批量处理的性能分析器，传给 process_in_batches 的 profiler 参数
+    每个批次结束后生成一条记录：
+        {"batch", "status", "records", "pages", "size", "cached", "pid", "peak_rss_mb",
+         "stages": {阶段: {"wall": 秒, "cpu": 秒}}}
+    """
+
+    def __init__(self, on_batch=None):
+        """
+        Args:
+            on_batch: 每个批次结束后以批次记录为参数调用，可用于接入监控系统
+        """
+        self.on_batch = on_batch
+        self.batches = []
+        self._load = {}
+        self._wall_start = None
+        self._cpu_start = None
+        self.wall = None
+        self.cpu = None
+
+    def start(self):
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def finish(self):
+        self.wall = time.perf_counter() - self._wall_start
+        self.cpu = time.process_time() - self._cpu_start
+
+    def time_loading(self, chunks, first_batch=1):
+        """包装数据块迭代器，把读取每个数据块的耗时记为该批次的 load 阶段"""
+        chunks = iter(chunks)
+        batch_no = first_batch - 1
+        while True:
+            timer = StageTimer()
+            with timer.stage("load"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            batch_no += 1
+            self._load[batch_no] = timer.stages["load"]
+            yield chunk
+
+    def add_batch(self, batch_no, status, result=None):
+        """
+        记录一个批次
+        Args:
+            batch_no: 批次号
+            status: "done"/"failed"/"skipped"
+            result: 批次结果字典（包含渲染进程记录的 profile）
+        """
+        profile = (result or {}).get("profile") or {}
+        stages = {"load": self._load.pop(batch_no, {"wall": 0.0, "cpu": 0.0})}
+        stages.update(profile.get("stages", {}))
+        entry = {
+            "batch": batch_no,
+            "status": status,
+            "records": (result or {}).get("records"),
+            "pages": (result or {}).get("pages"),
+            "size": (result or {}).get("size"),
+            "cached": (result or {}).get("cached"),
+            "pid": profile.get("pid"),
+            "peak_rss_mb": profile.get("peak_rss_mb"),
+            "stages": stages,
+        }
+        self.batches.append(entry)
+        if self.on_batch is not None:
+            self.on_batch(entry)
+
+    def summary(self):
+        """汇总各阶段的总耗时、记录数、页数和峰值内存"""
+        stages = {name: {"wall": 0.0, "cpu": 0.0} for name in STAGES}
+        for entry in self.batches:
+            for name, timing in entry["stages"].items():
+                total = stages.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+                total["wall"] += timing["wall"]
+                total["cpu"] += timing["cpu"]
+        worker_peaks = [entry["peak_rss_mb"] for entry in self.batches if entry["peak_rss_mb"] is not None]
+        records = sum(entry["records"] or 0 for entry in self.batches)
+        pages = sum(entry["pages"] or 0 for entry in self.batches)
+        size = sum(entry["size"] or 0 for entry in self.batches)
+        return {
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "batches": len(self.batches),
+            "records": records,
+            "pages": pages,
+            "size": size,
+            "bytes_per_page": size / pages if pages else None,
+            "records_per_sec": records / self.wall if self.wall else None,
+            "pages_per_sec": pages / self.wall if self.wall else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "worker_peak_rss_mb": max(worker_peaks) if worker_peaks else None,
+            "stages": stages,
+        }
+
+    def format_summary(self):
+        """格式化为命令行输出的文本"""
+        summary = self.summary()
+        lines = [f"⏱️ 总耗时 {summary['wall']:.2f}s，CPU {summary['cpu']:.2f}s（主进程）"]
+        for name, timing in summary["stages"].items():
+            if timing["wall"]:
+                lines.append(f"   {name:<9} 墙钟 {timing['wall']:8.2f}s  CPU {timing['cpu']:8.2f}s")
+        if summary["bytes_per_page"] is not None:
+            lines.append(f"   输出 {summary['size'] / (1024 * 1024):.2f}MB，平均每页 "
+                         f"{summary['bytes_per_page'] / 1024:.1f}KB")
+        if summary["worker_peak_rss_mb"] is not None:
+            lines.append(f"   渲染进程峰值内存 {summary['worker_peak_rss_mb']:.0f}MB")
+        return "\n".join(lines)
+
+    def write_report(self, path):
+        """写出报告：扩展名为 .csv 时每个批次一行，否则写为包含汇总的JSON"""
+        if os.path.splitext(path)[1].lower() == '.csv':
+            self._write_csv(path)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"summary": self.summary(), "batches": self.batches}, f,
+                          ensure_ascii=False, indent=2)
+
+    def _write_csv(self, path):
+        stage_names = list(STAGES)
+        for entry in self.batches:
+            stage_names.extend(name for name in entry["stages"] if name not in stage_names)
+        columns = ["batch", "status", "records", "pages", "size", "cached", "pid", "peak_rss_mb"]
+        for name in stage_names:
+            columns += [f"{name}_wall", f"{name}_cpu"]
+
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            for entry in self.batches:
+                row = {key: entry[key] for key in columns[:8]}
+                for name in stage_names:
+                    timing = entry["stages"].get(name, {"wall": 0.0, "cpu": 0.0})
+                    row[f"{name}_wall"] = f"{timing['wall']:.6f}"
+                    row[f"{name}_cpu"] = f"{timing['cpu']:.6f}"
+                writer.writerow(row)
@@ -0,0 +1,146 @@
+"""
+记录查询模块
+在加载数据时按条件筛选记录、按 offset/limit 截取，并只保留需要的字段，
+不需要的记录和字段在解析后立即丢弃，不会进入数据块
+
+条件语法（多个条件之间为"且"的关系）：
+    字段 == 值    字段 != 值    字段 > 值    字段 >= 值    字段 < 值    字段 <= 值
+    字段 ~ 文本   字段的字符串形式包含该文本
+    字段          字段存在
+字段可使用点号路径；值按JSON解析（如 3、true、null、"带空格的文本"），解析失败时作为字符串
+"""
+
+import operator
+import re
+from itertools import islice
+
+from . import json_backend
+from .fields import get_field, MISSING
+
+
+def _contains(value, text):
+    return str(text) in str(value)
+
+
+# 使用 operator 模块的函数，Query 可以被pickle后传给解析子进程
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+    "~": _contains,
+}
+
+_CONDITION_RE = re.compile(r'^\s*(?P<field>[^\s=!<>~]+)\s*(?:(?P<op>==|!=|>=|<=|>|<|~)\s*(?P<value>.*?))?\s*$')
+
+
+def parse_condition(expression):
+    """
+    解析单个条件表达式
+    Returns:
+        tuple: (字段, 运算符, 值)，只判断字段是否存在时运算符为None
+    """
+    match = _CONDITION_RE.match(expression)
+    if match is None:
+        raise ValueError(f"无法解析的筛选条件: {expression}")
+    field, op, raw = match.group("field"), match.group("op"), match.group("value")
+    if op is None:
+        return field, None, None
+    try:
+        value = json_backend.loads(raw)
+    except ValueError:
+        value = raw
+    return field, op, value
+
+
+class Query:
+    """
+    加载时应用的查询：筛选条件、offset/limit 和字段投影
+    """
+
+    def __init__(self, where=None, fields=None, limit=None, offset=0):
+        """
+        Args:
+            where: 条件表达式或表达式列表
+            fields: 要保留的字段列表，None 表示保留全部字段
+            limit: 最多返回的记录数，None 表示不限制
+            offset: 跳过前 offset 条符合条件的记录
+        """
+        if isinstance(where, str):
+            where = [where]
+        self.where = list(where or [])
+        self.conditions = [parse_condition(expression) for expression in self.where]
+        self.fields = list(fields) if fields is not None else None
+        self.limit = limit
+        self.offset = offset or 0
+        if self.limit is not None and self.limit < 0:
+            raise ValueError("limit 不能为负数")
+        if self.offset < 0:
+            raise ValueError("offset 不能为负数")
+
+    def with_fields(self, fields):
+        """返回投影到 fields 的查询，已指定字段时保持不变"""
+        if self.fields is not None:
+            return self
+        return Query(self.where, fields, self.limit, self.offset)
+
+    def narrowed(self, offset=0, limit=None):
+        """返回在当前 offset/limit 范围内再跳过 offset 条、最多取 limit 条的查询"""
+        if self.limit is None:
+            new_limit = limit
+        else:
+            remaining = max(0, self.limit - offset)
+            new_limit = remaining if limit is None else min(limit, remaining)
+        return Query(self.where, self.fields, new_limit, self.offset + offset)
+
+    @property
+    def filters_records(self):
+        """是否会去掉部分记录（有筛选条件或 offset/limit），只做字段投影时为False"""
+        return bool(self.conditions) or self.offset > 0 or self.limit is not None
+
+    def describe(self):
+        """用于运行清单的查询参数，字段投影不影响输出内容，不包含在内"""
+        return {"where": self.where, "limit": self.limit, "offset": self.offset}
+
+    def matches(self, record):
+        """记录是否满足所有条件，类型不可比较时视为不满足"""
+        for field, op, expected in self.conditions:
+            value = get_field(record, field)
+            if value is MISSING:
+                return False
+            if op is None:
+                continue
+            try:
+                if not OPERATORS[op](value, expected):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def project(self, record):
+        """只保留需要的字段，嵌套字段以点号路径作为键"""
+        if self.fields is None:
+            return record
+        projected = {}
+        for field in self.fields:
+            value = get_field(record, field)
+            if value is not MISSING:
+                projected[field] = value
+        return projected
+
+    def select(self, records):
+        """筛选并投影记录，不处理 offset/limit"""
+        for record in records:
+            if self.matches(record):
+                yield self.project(record)
+
+    def slice(self, records):
+        """按 offset/limit 截取，达到 limit 后不再从 records 中读取"""
+        stop = None if self.limit is None else self.offset + self.limit
+        return islice(records, self.offset, stop)
+
+    def apply(self, records):
+        """筛选、截取并投影记录"""
+        return self.slice(self.select(records))
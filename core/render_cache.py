@@ -0,0 +1,106 @@
+"""
+渲染缓存模块
+以批次内容的哈希为键缓存已渲染的PDF，内容未变化的批次直接复用之前的文件而不再调用WeasyPrint
+"""
+
+import hashlib
+import os
+import shutil
+import uuid
+
+# 默认缓存大小上限（MB）
+DEFAULT_CACHE_SIZE_MB = 2048
+
+
+class RenderCache:
+    """
+    基于内容寻址的PDF渲染缓存
+    缓存键由批次的HTML文档（由记录内容、字段、分隔标记和模板决定）与渲染器版本（CSS等）共同计算；
+    命中时优先使用硬链接，跨文件系统时退回复制；超过大小上限时按最近使用时间淘汰
+    """
+
+    def __init__(self, cache_dir, max_size_mb=DEFAULT_CACHE_SIZE_MB):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_size_mb: 缓存大小上限（MB）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(document, renderer_version):
+        """计算缓存键"""
+        digest = hashlib.sha256()
+        digest.update(renderer_version.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(document.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pdf")
+
+    def fetch(self, key, pdf_path):
+        """
+        缓存命中时把PDF链接或复制到目标路径
+        Returns:
+            bool: 是否命中
+        """
+        entry = self._entry_path(key)
+        if not os.path.exists(entry):
+            return False
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+        _link_or_copy(entry, pdf_path)
+        # 更新修改时间作为最近使用时间
+        os.utime(entry)
+        return True
+
+    def store(self, key, pdf_path):
+        """把刚渲染的PDF加入缓存，先写临时文件再原子替换，避免并发写入时读到不完整的文件"""
+        entry = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp_path = f"{entry}.{uuid.uuid4().hex}.tmp"
+        _link_or_copy(pdf_path, tmp_path)
+        os.replace(tmp_path, entry)
+
+    def evict(self):
+        """
+        淘汰最久未使用的缓存条目，直到总大小不超过上限
+        Returns:
+            int: 淘汰的条目数
+        """
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+def _link_or_copy(src, dst):
+    """优先创建硬链接，不支持时复制文件"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
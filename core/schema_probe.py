@@ -0,0 +1,84 @@
+"""
+字段探测模块
+只读取文件开头的一部分样本来推断字段结构，避免为了获取字段名加载整个文件
+"""
+
+import io
+from itertools import islice
+
+from .compression import open_input
+from .data_loader import is_jsonl_path, iter_stream_records
+from .fields import iter_field_paths
+
+# 默认最多采样的记录数
+DEFAULT_SAMPLE_RECORDS = 1000
+# 默认最多读取的字节数
+DEFAULT_SAMPLE_BYTES = 4 * 1024 * 1024
+
+_TYPE_NAMES = {
+    type(None): "null",
+    bool: "bool",
+    int: "int",
+    float: "float",
+    str: "str",
+    list: "list",
+    dict: "object",
+}
+
+
+def iter_sample_records(file_path, max_records=DEFAULT_SAMPLE_RECORDS, max_bytes=DEFAULT_SAMPLE_BYTES):
+    """
+    读取文件开头的样本记录
+    Args:
+        file_path: JSON或JSONL文件路径
+        max_records: 最多读取的记录数
+        max_bytes: 最多读取的字节数，压缩文件按解压后的字节数计算
+    """
+    with open_input(file_path) as f:
+        head = f.read(max_bytes)
+        truncated = bool(f.read(1))
+
+    jsonl = is_jsonl_path(file_path)
+    if jsonl and truncated:
+        # 丢弃被字节预算截断的最后一行
+        head = head[:head.rfind(b'\n') + 1]
+
+    records = iter_stream_records(io.BytesIO(head), jsonl)
+    try:
+        yield from islice(records, max_records)
+    except ValueError:
+        # JSON数组在字节预算处被截断，已解析的元素足够作为样本
+        if jsonl or not truncated:
+            raise
+
+
+def probe_schema(file_path, max_records=DEFAULT_SAMPLE_RECORDS, max_bytes=DEFAULT_SAMPLE_BYTES):
+    """
+    采样推断数据文件的字段结构
+    Args:
+        file_path: JSON或JSONL文件路径
+        max_records: 最多采样的记录数
+        max_bytes: 最多读取的字节数
+    Returns:
+        dict: {
+            "records": 采样的记录数,
+            "fields": {字段路径: {"count": 出现次数, "ratio": 出现比例, "types": 值类型列表}}
+        }
+        字段按首次出现的顺序排列，嵌套字段使用点号路径表示
+    """
+    fields = {}
+    sampled = 0
+    for record in iter_sample_records(file_path, max_records, max_bytes):
+        if not isinstance(record, dict):
+            continue
+        sampled += 1
+        for path, value in iter_field_paths(record):
+            info = fields.setdefault(path, {"count": 0, "types": []})
+            info["count"] += 1
+            type_name = _TYPE_NAMES.get(type(value), type(value).__name__)
+            if type_name not in info["types"]:
+                info["types"].append(type_name)
+
+    for info in fields.values():
+        info["ratio"] = info["count"] / sampled
+    return {"records": sampled, "fields": fields}
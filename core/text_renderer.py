@@ -0,0 +1,270 @@
+"""
+纯文本PDF渲染模块
+不经过HTML/CSS排版，直接把字段和分隔标记逐行绘制到PDF页面上，适用于不含标记的问答文本；
+需要安装可选依赖 reportlab（pip install "dataset-processing[text]"）
+
+字段与分隔标记的语义与 convert_chunk_to_markdown 一致：
+按 fields 顺序输出存在的字段（标题为 "字段名:"），值去除首尾空白后按换行分行，每条记录末尾输出分隔标记
+"""
+
+import hashlib
+import os
+
+from . import json_backend
+from .fields import get_field, MISSING
+from .fonts import DEFAULT_FONT_FAMILY, resolve_font, install_subset_timing, subset_timing
+from .profiling import NULL_TIMER
+
+# 布局版本，修改排版规则时需要递增，使渲染缓存失效
+TEXT_LAYOUT_VERSION = "1"
+
+# 字体文件路径的环境变量，未设置时通过 fontconfig 查找系统中的中文字体
+FONT_ENV = "JSON_PROCESSOR_TEXT_FONT"
+# 嵌入字体在PDF中的名称
+EMBEDDED_FONT_NAME = "JSONProcessorText"
+# 找不到可嵌入的中文字体时使用的 reportlab 内置宋体CID字体：不嵌入字体文件，
+# 阅读器没有安装Adobe亚洲字体包时会替换字形或无法显示
+DEFAULT_CID_FONT = "STSong-Light"
+
+# 版面参数（pt），与 DEFAULT_CSS 的字号、行高和边距大致对应
+MARGIN = 56.7
+FONT_SIZE = 10.5
+HEADING_SIZE = 12
+LEADING = 1.8
+RECORD_PADDING = 10
+RECORD_GAP = 20
+
+TEXT_COLOR = (0.2, 0.2, 0.2)
+HEADING_COLOR = (0.33, 0.33, 0.33)
+ACCENT_COLOR = (0, 0.48, 0.8)
+BACKGROUND_COLOR = (0.976, 0.976, 0.976)
+
+
+def build_text_document(data_chunk, fields, tag="----"):
+    """
+    提取数据块中要输出的文本
+    Returns:
+        list: 每条记录一个列表，元素为 ("heading" | "text" | "tag", 文本)
+    """
+    document = []
+    for item in data_chunk:
+        blocks = []
+        for field in fields:
+            value = get_field(item, field)
+            if value is not MISSING:
+                blocks.append(("heading", f"{field}:"))
+                blocks.append(("text", str(value).strip()))
+        blocks.append(("tag", tag))
+        document.append(blocks)
+    return document
+
+
+class TextPDFRenderer:
+    """
+    基于 reportlab 的纯文本渲染器
+    与 PDFRenderer 提供相同的 build_document / render_document / cache_text 接口
+    """
+
+    def __init__(self, font_path=None, font_family=DEFAULT_FONT_FAMILY):
+        """
+        Args:
+            font_path: TrueType字体文件路径（.ttf/.ttc，glyf轮廓），嵌入PDF时只包含用到的字形；
+                默认读取环境变量 JSON_PROCESSOR_TEXT_FONT
+            font_family: 都未指定字体文件时，通过 fc-match 查找该字体族或能覆盖中文的 TrueType 替代字体嵌入；
+                系统中没有这样的字体（或字体无法加载）时才使用不嵌入的内置宋体CID字体
+        """
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont, TTFError
+
+        font_path = font_path or os.environ.get(FONT_ENV)
+        font_index = 0
+        explicit = bool(font_path)
+        if not explicit and font_family:
+            # reportlab 只支持 TrueType 轮廓，CFF轮廓的OTF/TTC无法嵌入
+            match = resolve_font(font_family, fontformat="TrueType")
+            if match is not None:
+                font_path, font_index = match
+
+        self.font_name = DEFAULT_CID_FONT
+        if font_path:
+            try:
+                pdfmetrics.registerFont(TTFont(EMBEDDED_FONT_NAME, font_path, subfontIndex=font_index))
+                self.font_name = EMBEDDED_FONT_NAME
+            except (TTFError, OSError) as e:
+                if explicit:
+                    raise
+                print(f"警告: 无法嵌入字体 {font_path}: {e}，使用内置的宋体CID字体")
+                font_path = None
+        if self.font_name == DEFAULT_CID_FONT:
+            from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+
+            pdfmetrics.registerFont(UnicodeCIDFont(DEFAULT_CID_FONT))
+        self.font_path = font_path
+        install_subset_timing("text")
+        self._string_width = pdfmetrics.stringWidth
+        self._char_widths = {}
+
+        font_id = f"{os.path.abspath(font_path)}#{font_index}" if font_path else self.font_name
+        self.cache_version = hashlib.sha256(
+            f"text\0{TEXT_LAYOUT_VERSION}\0{font_id}".encode('utf-8')
+        ).hexdigest()
+
+    def build_document(self, data_chunk, fields, tag="----", markdown_fields=None, timer=NULL_TIMER):
+        """构建待渲染的文本块，纯文本引擎不支持 markdown_fields"""
+        if markdown_fields:
+            raise ValueError("纯文本引擎不支持Markdown字段")
+        return build_text_document(data_chunk, fields, tag)
+
+    @staticmethod
+    def cache_text(document):
+        """用于计算渲染缓存键的文本"""
+        return json_backend.dumps(document)
+
+    def _width(self, text, size):
+        """按字符缓存宽度的字符串宽度，避免对每一行重复查询字体度量"""
+        widths = self._char_widths
+        total = 0.0
+        for char in text:
+            width = widths.get(char)
+            if width is None:
+                width = widths[char] = self._string_width(char, self.font_name, 1)
+            total += width
+        return total * size
+
+    def _wrap(self, text, size, max_width):
+        """
+        按可用宽度折行：中文逐字折行，西文优先在空格处折行
+        Returns:
+            list: 行列表，空字符串表示空行
+        """
+        widths = self._char_widths
+        lines = []
+        for paragraph in text.split('\n'):
+            line_start = 0
+            line_width = 0.0
+            last_space = -1
+            i = 0
+            while i < len(paragraph):
+                char = paragraph[i]
+                char_width = widths.get(char)
+                if char_width is None:
+                    char_width = self._width(char, 1)
+                char_width *= size
+                if line_width + char_width > max_width and i > line_start:
+                    if last_space > line_start:
+                        lines.append(paragraph[line_start:last_space])
+                        line_start = i = last_space + 1
+                    else:
+                        lines.append(paragraph[line_start:i])
+                        line_start = i
+                    line_width = 0.0
+                    last_space = -1
+                    continue
+                if char == ' ':
+                    last_space = i
+                line_width += char_width
+                i += 1
+            lines.append(paragraph[line_start:])
+        return lines
+
+    def _layout_record(self, blocks, text_width):
+        """把一条记录折行为 (字号, 颜色, 文本) 列表"""
+        lines = []
+        for kind, text in blocks:
+            if kind == "heading":
+                for line in self._wrap(text, HEADING_SIZE, text_width):
+                    lines.append((HEADING_SIZE, HEADING_COLOR, line))
+            else:
+                for line in self._wrap(text, FONT_SIZE, text_width):
+                    lines.append((FONT_SIZE, TEXT_COLOR, line))
+        return lines
+
+    def render_document(self, document, pdf_path, timer=NULL_TIMER):
+        """
+        把文本块渲染为PDF文件
+        能放进一页的记录不跨页（对应CSS的 page-break-inside: avoid），更长的记录逐行分页
+        Returns:
+            int: 生成的PDF页数
+        """
+        from reportlab import rl_config
+
+        # ASCII85 编码只会让页面内容流变大、写出变慢，渲染期间关闭
+        use_a85 = rl_config.useA85
+        rl_config.useA85 = 0
+        try:
+            return self._render(document, pdf_path, timer)
+        finally:
+            rl_config.useA85 = use_a85
+
+    def _render(self, document, pdf_path, timer):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen import canvas
+
+        page_width, page_height = A4
+        text_left = MARGIN + RECORD_PADDING + 3
+        text_width = page_width - text_left - MARGIN - RECORD_PADDING
+        page_top = page_height - MARGIN
+        usable_height = page_top - MARGIN
+
+        with timer.stage("layout"):
+            pdf = canvas.Canvas(pdf_path, pagesize=A4, pageCompression=1)
+            pages = 1
+            y = page_top
+
+            for blocks in document:
+                lines = self._layout_record(blocks, text_width)
+                height = sum(size * LEADING for size, _, _ in lines) + 2 * RECORD_PADDING
+                if y - height < MARGIN and height <= usable_height and y < page_top:
+                    pdf.showPage()
+                    pages += 1
+                    y = page_top
+
+                index = 0
+                while index < len(lines):
+                    # 输出当前页能容纳的行，剩余的行换页继续
+                    segment_top = y
+                    y -= RECORD_PADDING
+                    start = index
+                    while index < len(lines) and y - lines[index][0] * LEADING - RECORD_PADDING >= MARGIN:
+                        y -= lines[index][0] * LEADING
+                        index += 1
+                    if index == start:
+                        if segment_top < page_top:
+                            pdf.showPage()
+                            pages += 1
+                            y = page_top
+                            continue
+                        # 单行高度超过整页时强制输出
+                        y -= lines[index][0] * LEADING
+                        index += 1
+                    y -= RECORD_PADDING
+                    self._draw_segment(pdf, lines[start:index], segment_top, y, text_left, page_width)
+                    if index < len(lines):
+                        pdf.showPage()
+                        pages += 1
+                        y = page_top
+                y -= RECORD_GAP
+
+        with timer.stage("write"), subset_timing(timer):
+            pdf.save()
+        return pages
+
+    def _draw_segment(self, pdf, lines, top, bottom, text_left, page_width):
+        """绘制记录在一页上的部分：背景、左侧强调线和文本行"""
+        pdf.setFillColorRGB(*BACKGROUND_COLOR)
+        pdf.rect(MARGIN, bottom, page_width - 2 * MARGIN, top - bottom, stroke=0, fill=1)
+        pdf.setFillColorRGB(*ACCENT_COLOR)
+        pdf.rect(MARGIN, bottom, 3, top - bottom, stroke=0, fill=1)
+
+        y = top - RECORD_PADDING
+        style = None
+        for size, color, text in lines:
+            y -= size * LEADING
+            if text:
+                # 只在字号或颜色变化时切换，减少页面内容流中的指令
+                if style != (size, color):
+                    style = (size, color)
+                    pdf.setFillColorRGB(*color)
+                    pdf.setFont(self.font_name, size)
+                # 基线位于行框中偏下的位置
+                pdf.drawString(text_left, y + size * (LEADING - 1) / 2 + size * 0.12, text)
@@ -0,0 +1,59 @@
+"""
+命令行测试：部分批次失败时以非零状态退出
+使用 text 引擎（需要 reportlab）
+"""
+
+import json
+import sys
+
+import pytest
+
+pytest.importorskip("reportlab")
+
+import cli
+from core.pdf_generator import get_renderer
+
+
+def _run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["cli.py", *argv])
+    cli.main()
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "data.jsonl"
+    records = [{"q": f"问题{i}", "a": "BAD" if i in (4, 5, 13) else f"回答{i}"} for i in range(16)]
+    path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def failing_renderer(monkeypatch):
+    renderer = get_renderer("text")
+    render_document = type(renderer).render_document
+
+    def render(self, document, pdf_path, timer=None):
+        if "BAD" in self.cache_text(document):
+            raise RuntimeError("模拟渲染失败")
+        return render_document(self, document, pdf_path, timer)
+
+    monkeypatch.setattr(type(renderer), "render_document", render)
+
+
+def test_format_batch_numbers():
+    assert cli.format_batch_numbers([9, 3, 4, 5, 11, 12]) == "3-5, 9, 11-12"
+    assert cli.format_batch_numbers([7]) == "7"
+
+
+def test_partial_failure_exits_non_zero(tmp_path, monkeypatch, capsys, input_file, failing_renderer):
+    with pytest.raises(SystemExit) as info:
+        _run(monkeypatch, input_file, "-o", str(tmp_path / "out"), "-f", "q", "a", "-b", "2", "--engine", "text")
+    assert info.value.code == 1
+    out = capsys.readouterr().out
+    assert "批次 3, 7" in out
+    assert "处理完成" not in out
+
+
+def test_success_exits_normally(tmp_path, monkeypatch, capsys, input_file):
+    _run(monkeypatch, input_file, "-o", str(tmp_path / "out"), "-f", "q", "a", "-b", "4", "--engine", "text")
+    assert "共生成 4 个PDF文件" in capsys.readouterr().out
@@ -0,0 +1,162 @@
+"""
+压缩输入测试：按扩展名和文件头识别格式，gzip/bz2/xz/zstd 流式解压，
+外部解压程序（pigz/zstd）与模块之间的回退，以及加载器和修复流程直接读取压缩文件
+"""
+
+import bz2
+import gzip
+import json
+import lzma
+import shutil
+import subprocess
+
+import pytest
+
+from core import compression
+from core.compression import detect_compression, open_input, strip_compression_suffix
+from core.data_loader import is_jsonl_path, iter_records, load_data_file
+from core.json_repair import fix_json_file
+
+RECORDS = [{"id": i, "text": f"第{i}条记录"} for i in range(200)]
+JSONL = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in RECORDS).encode('utf-8')
+
+requires_zstd_cli = pytest.mark.skipif(shutil.which("zstd") is None, reason="需要 zstd 命令行程序")
+requires_gzip_cli = pytest.mark.skipif(shutil.which("gzip") is None, reason="需要 gzip 命令行程序")
+
+
+def _zstd_compress(data):
+    return subprocess.run(["zstd", "-q", "-c"], input=data, stdout=subprocess.PIPE, check=True).stdout
+
+
+COMPRESSORS = {
+    "gzip": (".gz", gzip.compress),
+    "bz2": (".bz2", bz2.compress),
+    "xz": (".xz", lzma.compress),
+}
+
+
+@pytest.fixture
+def no_external(monkeypatch):
+    """不使用外部解压程序，只用Python模块解压"""
+    monkeypatch.setattr(compression.shutil, "which", lambda name: None)
+
+
+def _read_all(path):
+    with open_input(str(path)) as f:
+        return f.read()
+
+
+def test_strip_compression_suffix():
+    assert strip_compression_suffix("data.jsonl.gz") == "data.jsonl"
+    assert strip_compression_suffix("DATA.JSON.ZST") == "DATA.JSON"
+    assert strip_compression_suffix("data.jsonl") == "data.jsonl"
+    assert is_jsonl_path("dump.jsonl.zst")
+    assert not is_jsonl_path("dump.json.bz2")
+
+
+@pytest.mark.parametrize("name", sorted(COMPRESSORS))
+def test_detect_by_suffix_and_magic(tmp_path, name):
+    suffix, compress = COMPRESSORS[name]
+    named = tmp_path / f"data.jsonl{suffix}"
+    named.write_bytes(compress(JSONL))
+    unnamed = tmp_path / "data.bin"
+    unnamed.write_bytes(compress(JSONL))
+    assert detect_compression(str(named)) == name
+    assert detect_compression(str(unnamed)) == name
+
+
+def test_plain_file_is_not_compressed(tmp_path):
+    path = tmp_path / "data.jsonl"
+    path.write_bytes(JSONL)
+    assert detect_compression(str(path)) is None
+    assert _read_all(path) == JSONL
+
+
+@pytest.mark.parametrize("name", sorted(COMPRESSORS))
+def test_stdlib_decompression(tmp_path, no_external, name):
+    suffix, compress = COMPRESSORS[name]
+    path = tmp_path / f"data.jsonl{suffix}"
+    path.write_bytes(compress(JSONL))
+    assert _read_all(path) == JSONL
+    with open_input(str(path)) as f:
+        assert list(f) == JSONL.splitlines(keepends=True)
+
+
+@requires_gzip_cli
+def test_gzip_uses_external_decompressor(tmp_path, monkeypatch):
+    # 用 gzip 命令行程序代替 pigz，验证经外部进程解压的路径
+    monkeypatch.setitem(compression._EXTERNAL_DECOMPRESSORS, "gzip", (("gzip", "-d", "-c"),))
+    path = tmp_path / "data.jsonl.gz"
+    path.write_bytes(gzip.compress(JSONL))
+    with open_input(str(path)) as f:
+        assert isinstance(f, compression._ProcessReader)
+        assert f.readline() == JSONL.splitlines(keepends=True)[0]
+        assert f.read() == JSONL.split(b"\n", 1)[1]
+
+
+@requires_gzip_cli
+def test_external_decompressor_failure_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setitem(compression._EXTERNAL_DECOMPRESSORS, "gzip", (("gzip", "-d", "-c"),))
+    path = tmp_path / "data.jsonl.gz"
+    path.write_bytes(gzip.compress(JSONL)[:-40])
+    with pytest.raises(OSError, match="解压失败"):
+        list(iter_records(str(path)))
+
+
+def test_missing_pigz_falls_back_to_gzip_module(tmp_path, monkeypatch):
+    monkeypatch.setitem(compression._EXTERNAL_DECOMPRESSORS, "gzip", (("no-such-pigz", "-d", "-c"),))
+    path = tmp_path / "data.jsonl.gz"
+    path.write_bytes(gzip.compress(JSONL))
+    with open_input(str(path)) as f:
+        assert not isinstance(f, compression._ProcessReader)
+        assert f.read() == JSONL
+
+
+@requires_zstd_cli
+def test_zstd_cli(tmp_path):
+    path = tmp_path / "data.jsonl.zst"
+    path.write_bytes(_zstd_compress(JSONL))
+    unnamed = tmp_path / "data.bin"
+    unnamed.write_bytes(path.read_bytes())
+    assert detect_compression(str(unnamed)) == "zstd"
+    with open_input(str(path)) as f:
+        assert isinstance(f, compression._ProcessReader)
+        assert f.read() == JSONL
+
+
+@requires_zstd_cli
+def test_zstd_module_fallback(tmp_path, no_external):
+    path = tmp_path / "data.jsonl.zst"
+    path.write_bytes(_zstd_compress(JSONL))
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        with pytest.raises(ImportError, match="zstandard"):
+            open_input(str(path))
+    else:
+        assert _read_all(path) == JSONL
+
+
+@pytest.mark.parametrize("suffix", [".jsonl.gz", ".jsonl.bz2", ".json.xz", ".json.gz"])
+def test_loader_reads_compressed_files(tmp_path, suffix):
+    if suffix.startswith(".jsonl"):
+        data = JSONL
+    else:
+        data = json.dumps(RECORDS, ensure_ascii=False).encode('utf-8')
+    compress = {".gz": gzip.compress, ".bz2": bz2.compress, ".xz": lzma.compress}[suffix[suffix.rindex("."):]]
+    path = tmp_path / f"data{suffix}"
+    path.write_bytes(compress(data))
+    assert load_data_file(str(path)) == RECORDS
+    # 压缩的JSONL不能按字节区间拆分，多进程解析时回退为顺序读取
+    assert list(iter_records(str(path), parse_workers=2)) == RECORDS
+
+
+def test_fix_json_file_reads_compressed_input(tmp_path):
+    lines = JSONL.splitlines(keepends=True)
+    path = tmp_path / "broken.jsonl.gz"
+    path.write_bytes(gzip.compress(b"".join(lines[:3]) + b"{broken\n" + b"".join(lines[3:])))
+    output = tmp_path / "fixed.json"
+    is_file, result, status = fix_json_file(str(path), str(output))
+    assert is_file and result == str(output)
+    assert json.loads(output.read_text(encoding='utf-8')) == RECORDS
+    assert "跳过 1 行" in status
@@ -0,0 +1,134 @@
+"""
+数据加载模块测试：JSON数组的流式增量解析
+"""
+
+import io
+import json
+
+import pytest
+
+from core.data_loader import READ_CHUNK_SIZE, JsonArrayError, _iter_json_array_stream, iter_json_array
+from core.json_repair import repair_json_stream
+from core.schema_probe import probe_schema
+
+RECORDS = [
+    {"id": 1, "score": 3.25, "ratio": 1.5e10, "small": -2.5E-3, "text": "第一条"},
+    3.25,
+    -0.5,
+    1e5,
+    1.5e+10,
+    12345678901234567890,
+    {"nested": [0.125, 7e-3, {"x": 100.0}]},
+    "字符串",
+    True,
+    None,
+]
+
+
+def _parse(data, chunk_size):
+    return list(_iter_json_array_stream(io.BytesIO(data), chunk_size=chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 16, 64])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_numbers_across_read_boundaries(chunk_size, indent):
+    """任意读取边界（包括数字的小数点和指数处）都不影响解析结果"""
+    data = json.dumps(RECORDS, ensure_ascii=False, indent=indent).encode('utf-8')
+    assert _parse(data, chunk_size) == json.loads(data)
+
+
+@pytest.mark.parametrize("text", ["[3.25]", "[1.5e10, 2E-3]", "[ 1 , 2.0 ,3e1 ]", "[]", "[ ]"])
+def test_every_split_point(text):
+    data = text.encode('utf-8')
+    for chunk_size in range(1, len(data) + 1):
+        assert _parse(data, chunk_size) == json.loads(text)
+
+
+@pytest.mark.parametrize("text", ["[1 2]", "[3.]", "[1.5e]", "[1,]", "[1", "{}", "[1] 2"])
+def test_invalid_arrays_raise(text):
+    for chunk_size in (1, 2, 64):
+        with pytest.raises(ValueError):
+            _parse(text.encode('utf-8'), chunk_size)
+
+
+class _CountingReader(io.BytesIO):
+    """记录已读取的字节数"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_malformed_element_fails_fast():
+    """数组中间的元素格式错误时立即报错，不会把后面的内容读入内存"""
+    good = json.dumps([{"id": i, "text": "x" * 100} for i in range(2000)])
+    data = ('[{"id": 0}, {"id": 1}, {"id": 2, oops}, ' + good[1:]).encode('utf-8')
+    reader = _CountingReader(data)
+    with pytest.raises(JsonArrayError) as info:
+        list(_iter_json_array_stream(reader, chunk_size=1024))
+    assert info.value.index == 2
+    assert data[info.value.offset:].startswith(b'{"id": 2, oops}')
+    assert data[:info.value.valid_end].endswith(b'{"id": 1}')
+    assert reader.bytes_read < 4096 < len(data)
+
+
+@pytest.mark.parametrize("text, index, at", [
+    ('[1, 2, {"a": tru}, 4]', 2, '{"a": tru}'),
+    ('[1, 2 3]', 2, '3]'),
+    ('[{"a": 1} {"b": 2}]', 1, '{"b": 2}'),
+    ('\ufeff["abc", "d\\u12g"]', 1, '"d'),
+])
+def test_error_location_independent_of_chunk_size(text, index, at):
+    data = text.encode('utf-8')
+    for chunk_size in range(1, len(data) + 1):
+        with pytest.raises(JsonArrayError) as info:
+            _parse(data, chunk_size)
+        assert info.value.index == index
+        assert data[info.value.offset:].decode('utf-8').startswith(at)
+
+
+def test_element_size_is_capped():
+    data = b'["' + b'x' * 10000
+    reader = _CountingReader(data + b'"]')
+    with pytest.raises(JsonArrayError, match="仍未结束"):
+        list(_iter_json_array_stream(reader, chunk_size=64, max_element_size=1000))
+    assert reader.bytes_read < 4096
+
+
+def _boundary_file(tmp_path, number="3.25"):
+    """生成一个合法的JSON数组，其中的数字从 READ_CHUNK_SIZE 前3个字节处开始"""
+    prefix = '[{"text": "'
+    middle = '"}, '
+    padding = READ_CHUNK_SIZE - 3 - len(prefix) - len(middle)
+    text = prefix + "x" * padding + middle + number + ', {"id": 2}]'
+    assert text.index(number) == READ_CHUNK_SIZE - 3
+    path = tmp_path / "boundary.json"
+    path.write_text(text, encoding='utf-8')
+    return path, json.loads(text)
+
+
+@pytest.mark.parametrize("number", ["3.25", "1.5e10", "12.5E-3"])
+def test_file_with_number_at_read_boundary(tmp_path, number):
+    path, expected = _boundary_file(tmp_path, number)
+    assert list(iter_json_array(str(path))) == expected
+
+
+def test_repair_keeps_valid_array_at_read_boundary(tmp_path):
+    path, expected = _boundary_file(tmp_path)
+    output = tmp_path / "out.json"
+    result = repair_json_stream(str(path), str(output))
+    assert result["records"] == len(expected)
+    assert result["errors"] == 0
+    assert json.loads(output.read_text(encoding='utf-8')) == expected
+
+
+def test_probe_schema_at_read_boundary(tmp_path):
+    path, _ = _boundary_file(tmp_path)
+    schema = probe_schema(str(path))
+    assert schema["records"] == 2
+    assert set(schema["fields"]) == {"text", "id"}
@@ -0,0 +1,75 @@
+"""
+去重测试：按所选字段去重、超过内存上限后转存到SQLite，以及在流水线读取线程中去重
+"""
+
+import os
+
+import pytest
+
+from core import processor
+from core.dedup import Deduplicator, record_key
+from core.pipeline import Pipeline
+
+
+def _records(count, repeat):
+    """count 条记录，每条重复 repeat 次，重复的记录彼此相邻"""
+    return [{"q": f"问题{i}", "a": f"回答{i}", "extra": n} for i in range(count) for n in range(repeat)]
+
+
+def test_record_key_semantics():
+    assert record_key({"a": 1, "b": {"x": 1, "y": 2}}, ["a", "b"]) == \
+        record_key({"b": {"y": 2, "x": 1}, "a": 1}, ["a", "b"])
+    # 缺失的字段与值为 null 的字段不同
+    assert record_key({"a": None}, ["a"]) != record_key({}, ["a"])
+    # 只比较所选字段
+    assert record_key({"a": 1, "b": 2}, ["a"]) == record_key({"a": 1, "b": 3}, ["a"])
+    assert record_key({"a": 1}, ["a"]) != record_key({"a": "1"}, ["a"])
+
+
+@pytest.mark.parametrize("max_memory_keys", [1000000, 3])
+def test_filter_removes_duplicates(tmp_path, max_memory_keys):
+    dedup = Deduplicator(["q", "a"], max_memory_keys=max_memory_keys, spill_dir=str(tmp_path))
+    records = _records(10, 3)
+    unique = list(dedup.filter(records))
+    assert unique == records[::3]
+    assert dedup.stats() == {"records": 30, "unique": 10, "duplicates": 20, "spilled": max_memory_keys == 3}
+    # 迭代结束后删除转存数据库
+    assert os.listdir(tmp_path) == []
+
+
+def test_spill_keeps_keys_seen_before(tmp_path):
+    dedup = Deduplicator(["q"], max_memory_keys=2, spill_dir=str(tmp_path))
+    records = [{"q": i} for i in range(5)] + [{"q": i} for i in range(5)]
+    assert [r["q"] for r in dedup.filter(records)] == [0, 1, 2, 3, 4]
+
+
+def test_close_from_another_thread(tmp_path):
+    """在流水线读取线程中转存，在主线程中关闭"""
+    dedup = Deduplicator(["q", "a"], max_memory_keys=3, spill_dir=str(tmp_path))
+    pipeline = Pipeline(dedup.filter(_records(20, 2)), queue_size=1)
+    iterator = iter(pipeline)
+    for _ in range(10):
+        next(iterator)
+    assert dedup.spilled
+    dedup.close()
+    iterator.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_dedup_with_prefetch_pipeline(tmp_path, monkeypatch):
+    pytest.importorskip("reportlab")
+    spill_dir = tmp_path / "spill"
+    spill_dir.mkdir()
+    created = []
+
+    def make_deduplicator(fields):
+        created.append(Deduplicator(fields, max_memory_keys=4, spill_dir=str(spill_dir)))
+        return created[-1]
+
+    monkeypatch.setattr(processor, "Deduplicator", make_deduplicator)
+    output_dir = str(tmp_path / "out")
+    succeeded = processor.process_in_batches(_records(12, 3), output_dir, ["q", "a"], batch_size=4,
+                                             engine="text", dedup=True, prefetch=2, build_workers=1)
+    assert succeeded == 3
+    assert created[0].stats() == {"records": 36, "unique": 12, "duplicates": 24, "spilled": True}
+    assert os.listdir(spill_dir) == []
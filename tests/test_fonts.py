@@ -0,0 +1,61 @@
+"""
+字体解析测试：只接受确实覆盖中文的字体（不依赖系统中安装的 fontconfig）
+"""
+
+import pytest
+
+from core import fonts
+
+
+@pytest.fixture
+def fc_output(monkeypatch, tmp_path):
+    """把 fc-match 的输出替换为给定文本，字体文件放在临时目录中"""
+    font_file = tmp_path / "font.ttc"
+    font_file.write_bytes(b"")
+    outputs = {}
+
+    def run(*args):
+        return outputs.get(args[0])
+
+    monkeypatch.setattr(fonts, "_run_fontconfig", run)
+    fonts.resolve_font.cache_clear()
+    yield outputs, str(font_file)
+    fonts.resolve_font.cache_clear()
+
+
+def test_cjk_font_is_accepted(fc_output):
+    outputs, path = fc_output
+    outputs["fc-match"] = f"{path}\t0\tTrueType\ten|ja|zh-cn|zh-tw"
+    assert fonts.resolve_font() == fonts.FontMatch(path, 0)
+
+
+def test_ttc_index_is_kept(fc_output):
+    outputs, path = fc_output
+    outputs["fc-match"] = f"{path}\t2\tCFF\tzh-cn"
+    assert fonts.resolve_font() == fonts.FontMatch(path, 2)
+
+
+def test_non_cjk_fallback_is_rejected(fc_output):
+    outputs, path = fc_output
+    outputs["fc-match"] = f"{path}\t0\tTrueType\taa|af|en|fr|ru"
+    assert fonts.resolve_font() is None
+
+
+def test_missing_fontconfig(fc_output):
+    assert fonts.resolve_font() is None
+
+
+def test_missing_file_is_rejected(fc_output, tmp_path):
+    outputs, _ = fc_output
+    outputs["fc-match"] = f"{tmp_path / 'missing.ttf'}\t0\tTrueType\tzh-cn"
+    assert fonts.resolve_font() is None
+
+
+def test_fontformat_falls_back_to_fc_list(fc_output, tmp_path):
+    outputs, path = fc_output
+    other = tmp_path / "other.ttf"
+    other.write_bytes(b"")
+    outputs["fc-match"] = f"{path}\t0\tCFF\tzh-cn"
+    outputs["fc-list"] = f"{path}\t0\tCFF\tzh-cn\n{other}\t1\tTrueType\tzh-cn\n"
+    assert fonts.resolve_font() == fonts.FontMatch(path, 0)
+    assert fonts.resolve_font(fontformat="TrueType") == fonts.FontMatch(str(other), 1)
@@ -0,0 +1,176 @@
+"""
+增量处理测试：检查点的读写与失效条件，以及只渲染追加记录、批次号接着编号、失败时不推进检查点
+端到端测试使用 text 引擎（需要 reportlab）
+"""
+
+import json
+import os
+
+import pytest
+
+from core import incremental
+from core.incremental import CHECKPOINT_NAME, Checkpoint, IncrementalRun, complete_lines_end
+from core.manifest import RunManifest
+
+PARAMS = {"fields": ["q", "a"], "batch_size": 4}
+
+
+def _lines(start, stop):
+    return "".join(json.dumps({"q": f"问题{i}", "a": f"回答{i}"}, ensure_ascii=False) + "\n"
+                   for i in range(start, stop))
+
+
+def _append(path, text):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+
+@pytest.fixture
+def jsonl_path(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_text(_lines(0, 10), encoding='utf-8')
+    return str(path)
+
+
+def test_complete_lines_end_ignores_partial_line(tmp_path, monkeypatch):
+    # 使用很小的读取块，使换行符落在较早的块中
+    monkeypatch.setattr(incremental, "HASH_CHUNK_SIZE", 7)
+    path = tmp_path / "log.jsonl"
+    path.write_bytes(b"")
+    assert complete_lines_end(str(path)) == 0
+    path.write_bytes(b'{"a": 1}\n{"a": 2}\n{"a": 3, "b": "half')
+    assert complete_lines_end(str(path)) == len(b'{"a": 1}\n{"a": 2}\n')
+    path.write_bytes(b'{"a": 1, "b": "no newline"}')
+    assert complete_lines_end(str(path)) == 0
+
+
+def test_checkpoint_round_trip(tmp_path):
+    Checkpoint(PARAMS, 120, 10, "abc", 4).save(str(tmp_path))
+    loaded = Checkpoint.load(str(tmp_path))
+    assert (loaded.params, loaded.offset, loaded.records, loaded.prefix_sha256, loaded.next_batch) == \
+        (PARAMS, 120, 10, "abc", 4)
+    assert not os.path.exists(tmp_path / (CHECKPOINT_NAME + ".tmp"))
+
+
+def test_unusable_checkpoint_is_none(tmp_path):
+    assert Checkpoint.load(str(tmp_path)) is None
+    (tmp_path / CHECKPOINT_NAME).write_text("{broken", encoding='utf-8')
+    assert Checkpoint.load(str(tmp_path)) is None
+    (tmp_path / CHECKPOINT_NAME).write_text(json.dumps({"version": 999}), encoding='utf-8')
+    assert Checkpoint.load(str(tmp_path)) is None
+
+
+def _commit_first_run(output_dir, jsonl_path, params=PARAMS):
+    run = IncrementalRun(output_dir, jsonl_path, params)
+    assert run.full
+    records = list(run.iter_records())
+    run.commit(4)
+    return records
+
+
+def test_appended_records_are_read_incrementally(tmp_path, jsonl_path):
+    output_dir = str(tmp_path)
+    assert len(_commit_first_run(output_dir, jsonl_path)) == 10
+    _append(jsonl_path, _lines(10, 13) + '{"q": "写到一半')
+
+    run = IncrementalRun(output_dir, jsonl_path, PARAMS)
+    assert not run.full
+    assert (run.records_before, run.next_batch) == (10, 4)
+    assert [r["q"] for r in run.iter_records()] == ["问题10", "问题11", "问题12"]
+    run.commit(5)
+
+    checkpoint = Checkpoint.load(output_dir)
+    assert (checkpoint.records, checkpoint.next_batch) == (13, 5)
+    assert checkpoint.offset == complete_lines_end(jsonl_path)
+
+
+@pytest.mark.parametrize("change, reason", [
+    ("params", "参数"),
+    ("truncate", "截断"),
+    ("rewrite", "改写"),
+])
+def test_checkpoint_is_invalidated(tmp_path, jsonl_path, change, reason):
+    output_dir = str(tmp_path)
+    _commit_first_run(output_dir, jsonl_path)
+    params = PARAMS
+    if change == "params":
+        params = dict(PARAMS, batch_size=8)
+    elif change == "truncate":
+        with open(jsonl_path, 'r+b') as f:
+            f.truncate(20)
+    else:
+        with open(jsonl_path, 'r+b') as f:
+            data = f.read().replace("问题3".encode('utf-8'), "问题X".encode('utf-8'))
+            f.seek(0)
+            f.write(data)
+
+    run = IncrementalRun(output_dir, jsonl_path, params)
+    assert run.full and reason in run.reason
+    assert (run.start, run.records_before, run.next_batch) == (0, 0, 1)
+
+
+def _run(input_path, output_dir, **kwargs):
+    from core.processor import process_in_batches
+
+    return process_in_batches(input_path, output_dir, ["q", "a"], batch_size=4, engine="text",
+                              incremental=True, **kwargs)
+
+
+def test_incremental_runs_continue_batch_numbers(tmp_path, jsonl_path):
+    pytest.importorskip("reportlab")
+    output_dir = str(tmp_path / "out")
+    assert _run(jsonl_path, output_dir) == 3
+    # 追加的记录不足一个完整批次，最后一行还没有写完
+    _append(jsonl_path, _lines(10, 16) + '{"q": "问题16", "a": ')
+    assert _run(jsonl_path, output_dir) == 2
+    assert _run(jsonl_path, output_dir) == 0
+
+    manifest = RunManifest.load(output_dir)
+    assert sorted(manifest.batches) == [1, 2, 3, 4, 5]
+    assert [manifest.batches[n]["records"] for n in (4, 5)] == [4, 2]
+    checkpoint = Checkpoint.load(output_dir)
+    assert (checkpoint.records, checkpoint.next_batch) == (16, 6)
+
+    _append(jsonl_path, '"回答16"}\n')
+    assert _run(jsonl_path, output_dir) == 1
+    assert Checkpoint.load(output_dir).records == 17
+    assert sorted(RunManifest.load(output_dir).batches) == [1, 2, 3, 4, 5, 6]
+
+
+def test_failed_run_does_not_advance_checkpoint(tmp_path, jsonl_path, monkeypatch):
+    pytest.importorskip("reportlab")
+    from core.pdf_generator import get_renderer
+
+    output_dir = str(tmp_path / "out")
+    _run(jsonl_path, output_dir)
+    _append(jsonl_path, _lines(10, 18))
+
+    renderer = get_renderer("text")
+    render_document = type(renderer).render_document
+
+    def render(self, document, pdf_path, timer=None):
+        if "问题15" in self.cache_text(document):
+            raise RuntimeError("渲染失败")
+        return render_document(self, document, pdf_path, timer)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(type(renderer), "render_document", render)
+        _run(jsonl_path, output_dir)
+    checkpoint = Checkpoint.load(output_dir)
+    assert (checkpoint.records, checkpoint.next_batch) == (10, 4)
+
+    # 下次运行从同一批次号重新处理这些记录，上次生成的批次被替换
+    assert _run(jsonl_path, output_dir) == 2
+    manifest = RunManifest.load(output_dir)
+    assert sorted(manifest.batches) == [1, 2, 3, 4, 5]
+    assert all(manifest.is_done(n) for n in manifest.batches)
+    assert Checkpoint.load(output_dir).next_batch == 6
+
+
+def test_incremental_rejects_unsupported_inputs(tmp_path, jsonl_path):
+    from core.query import Query
+
+    with pytest.raises(ValueError, match="JSONL"):
+        _run(str(tmp_path / "data.json"), str(tmp_path / "out"))
+    with pytest.raises(ValueError, match="offset/limit"):
+        _run(jsonl_path, str(tmp_path / "out"), query=Query(limit=3))
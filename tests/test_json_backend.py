@@ -0,0 +1,111 @@
+"""
+JSON后端测试：每个已安装的后端在边界输入上的结果都与标准库一致
+"""
+
+import json
+import math
+
+import pytest
+
+from core import json_backend
+from core.json_backend import BACKEND_ENV, _LOADERS
+from core.json_repair import fix_json_file
+
+
+def _installed_backends():
+    backends = []
+    for name, loader in _LOADERS.items():
+        try:
+            backends.append(pytest.param(loader(), id=name))
+        except ImportError:
+            continue
+    return backends
+
+
+BACKENDS = _installed_backends()
+
+LOADS_CASES = [
+    '123456789012345678901234',
+    '-123456789012345678901234',
+    '18446744073709551615',
+    '18446744073709551616',
+    '-9223372036854775808',
+    '-9223372036854775809',
+    '9999999999999999999',
+    '{"id": 123456789012345678901234, "name": "病例"}',
+    '{"phone": "13800138000123456789", "n": 1}',
+    '[NaN, Infinity, -Infinity]',
+    '1e400',
+    '0.12345678901234567890123',
+    '{"text": "中文", "list": [1, 2.5, true, null]}',
+]
+
+DUMPS_CASES = [
+    float('nan'),
+    [float('inf'), float('-inf'), None],
+    {"score": float('nan'), "empty": None},
+    2 ** 64,
+    -(2 ** 63) - 1,
+    {"id": 123456789012345678901234, "name": "病例"},
+    {"text": "中文/路径", "list": [1, 2.5, True, None]},
+    {1: "非字符串键"},
+]
+
+
+def _canonical(value):
+    """标准库的紧凑序列化，NaN 等非有限值也可以比较"""
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("text", LOADS_CASES)
+def test_loads_matches_stdlib(backend, text):
+    loads, _ = backend
+    expected = json.loads(text)
+    for data in (text, text.encode('utf-8')):
+        value = loads(data)
+        assert _canonical(value) == _canonical(expected)
+        assert type(value) is type(expected)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("text", ['{"a": ', 'nul', '[1, 2', ''])
+def test_loads_rejects_like_stdlib(backend, text):
+    loads, _ = backend
+    with pytest.raises(json.JSONDecodeError):
+        loads(text)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("obj", DUMPS_CASES)
+@pytest.mark.parametrize("indent", [None, 2])
+def test_dumps_round_trips_like_stdlib(backend, obj, indent):
+    _, dumps = backend
+    text = dumps(obj, indent)
+    assert _canonical(json.loads(text)) == _canonical(json.loads(json.dumps(obj, ensure_ascii=False)))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_dumps_keeps_non_ascii(backend):
+    _, dumps = backend
+    assert "病例" in dumps({"name": "病例"})
+
+
+def test_non_finite_detection():
+    assert json_backend._has_non_finite({"a": [1, {"b": float('nan')}]})
+    assert not json_backend._has_non_finite({"a": [1, None, 2.5]})
+    assert json_backend._has_non_finite((1, -math.inf))
+
+
+@pytest.mark.parametrize("name", [param.id for param in BACKENDS])
+def test_fix_json_file_keeps_big_ids(tmp_path, monkeypatch, name):
+    monkeypatch.setenv(BACKEND_ENV, "auto")
+    try:
+        json_backend.set_backend(name)
+        src = tmp_path / "big.jsonl"
+        src.write_text('{"id": 123456789012345678901234}\n{"id": 7}\n', encoding='utf-8')
+        out = tmp_path / "big_out.json"
+        fix_json_file(str(src), str(out))
+        assert json.loads(out.read_text(encoding='utf-8')) == [{"id": 123456789012345678901234}, {"id": 7}]
+    finally:
+        json_backend.set_backend("auto")
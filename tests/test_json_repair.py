@@ -0,0 +1,97 @@
+"""
+JSON修复测试：格式错误的JSON数组从出错的位置开始逐行修复
+"""
+
+import json
+import tracemalloc
+
+import pytest
+
+from core import json_repair
+from core.json_repair import repair_json_stream
+
+RECORDS = [{"id": i, "text": "病例" + "x" * 200} for i in range(5000)]
+BAD_INDEX = 2500
+
+
+def _array_lines(records, bad_index):
+    """每行一个元素的JSON数组，bad_index 处的元素格式错误"""
+    lines = [json.dumps(r, ensure_ascii=False) for r in records]
+    lines[bad_index] = '{"id": %d, oops}' % bad_index
+    return "[\n" + ",\n".join(lines) + "\n]\n"
+
+
+@pytest.fixture
+def broken_array(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text(_array_lines(RECORDS, BAD_INDEX), encoding="utf-8")
+    return path
+
+
+def _expected():
+    return [r for i, r in enumerate(RECORDS) if i != BAD_INDEX]
+
+
+@pytest.mark.parametrize("suffix", [".json", ".jsonl"])
+def test_repair_broken_array_keeps_valid_elements(tmp_path, broken_array, suffix):
+    output = tmp_path / ("out" + suffix)
+    result = repair_json_stream(str(broken_array), str(output))
+    assert result["records"] == len(RECORDS) - 1
+    assert result["errors"] == 1
+    text = output.read_text(encoding="utf-8")
+    if suffix == ".json":
+        records = json.loads(text)
+    else:
+        records = [json.loads(line) for line in text.splitlines()]
+    assert records == _expected()
+    report = [json.loads(line) for line in open(result["report"], encoding="utf-8")]
+    # 第1行是 '['，元素从第2行开始
+    assert report[0]["line"] == BAD_INDEX + 2
+    assert "oops" in report[0]["content"]
+
+
+def test_repair_broken_array_memory_is_bounded(tmp_path):
+    """出错位置之后的内容逐行修复，峰值内存与文件大小无关（只与读取块大小有关）"""
+    path = tmp_path / "large.json"
+    path.write_text(_array_lines([{"id": i, "text": "x" * 2000} for i in range(10000)], 3), encoding="utf-8")
+    size = path.stat().st_size
+    tracemalloc.start()
+    try:
+        repair_json_stream(str(path), str(tmp_path / "out.json"))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < size / 4
+
+
+def test_repair_single_line_array_skips_overlong_rest(tmp_path, monkeypatch):
+    """整个数组写在一行时，出错位置之后的剩余内容超过行长度上限，记为一条错误而不读入内存"""
+    monkeypatch.setattr(json_repair, "MAX_LINE_SIZE", 1024)
+    records = RECORDS[:50]
+    text = json.dumps(records[:3], ensure_ascii=False)[:-1] + ', {"id": 3, oops}, ' + \
+        json.dumps(records[4:], ensure_ascii=False)[1:]
+    path = tmp_path / "one_line.json"
+    path.write_text(text, encoding="utf-8")
+    output = tmp_path / "out.json"
+    result = repair_json_stream(str(path), str(output))
+    assert json.loads(output.read_text(encoding="utf-8")) == records[:3]
+    assert result["errors"] == 1
+
+
+def test_repair_truncated_array(tmp_path):
+    text = _array_lines(RECORDS[:10], 0).replace('{"id": 0, oops}', json.dumps(RECORDS[0], ensure_ascii=False))
+    path = tmp_path / "truncated.json"
+    path.write_text(text[:text.rindex(",\n")], encoding="utf-8")
+    output = tmp_path / "out.json"
+    result = repair_json_stream(str(path), str(output))
+    assert json.loads(output.read_text(encoding="utf-8")) == RECORDS[:9]
+    assert result["errors"] == 0
+
+
+def test_repair_array_with_bad_first_element(tmp_path):
+    path = tmp_path / "first.json"
+    path.write_text(_array_lines(RECORDS[:5], 0), encoding="utf-8")
+    output = tmp_path / "out.json"
+    result = repair_json_stream(str(path), str(output))
+    assert json.loads(output.read_text(encoding="utf-8")) == RECORDS[1:5]
+    assert result["errors"] == 1
@@ -0,0 +1,80 @@
+"""
+JSONL偏移索引测试：建立、保存、读取，读取已保存的索引时不把偏移量数组读入内存
+"""
+
+import json
+import tracemalloc
+
+import pytest
+
+from core.jsonl_index import JsonlIndex, index_path_for
+
+RECORDS = [{"id": f"Q-{i:05d}", "n": i} for i in range(1000)]
+
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+    path = tmp_path / "data.jsonl"
+    lines = [json.dumps(r) for r in RECORDS]
+    # 空行和无效行不计入记录
+    lines.insert(10, "")
+    lines.insert(20, "{invalid")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("parse_workers", [1, 2])
+def test_build_and_load(jsonl_file, parse_workers):
+    built = JsonlIndex.open(jsonl_file, key="id", parse_workers=parse_workers)
+    loaded = JsonlIndex.load(jsonl_file)
+    assert loaded is not None
+    assert len(built) == len(loaded) == len(RECORDS)
+    assert [loaded.offsets[i] for i in range(len(loaded))] == list(built.offsets)
+    assert loaded.read(123) == RECORDS[123]
+    assert loaded.find("Q-00500") == [500]
+    assert list(loaded.iter_records(995)) == RECORDS[995:]
+    assert list(loaded.iter_records(100, 104)) == RECORDS[100:104]
+
+
+def test_load_does_not_read_offsets(tmp_path):
+    path = tmp_path / "big.jsonl"
+    with open(path, "w") as f:
+        for i in range(400000):
+            f.write('{"n": %d}\n' % i)
+    JsonlIndex.open(str(path))
+
+    tracemalloc.start()
+    try:
+        index = JsonlIndex.load(str(path))
+        assert len(index) == 400000
+        records = list(index.iter_records(150000, 150003))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert records == [{"n": 150000}, {"n": 150001}, {"n": 150002}]
+    # 400000 个偏移量占 3.2MB；校验指纹时会读取输入文件头尾各1MB
+    assert peak < 1.5 * 1024 * 1024
+
+
+def test_loaded_index_can_be_saved_again(jsonl_file):
+    JsonlIndex.open(jsonl_file, key="id")
+    loaded = JsonlIndex.load(jsonl_file, key="id")
+    loaded.save()
+    again = JsonlIndex.load(jsonl_file, key="id")
+    assert len(again) == len(RECORDS)
+    assert again.find("Q-00007") == [7]
+
+
+def test_stale_or_truncated_index_is_ignored(jsonl_file):
+    JsonlIndex.open(jsonl_file)
+    index_path = index_path_for(jsonl_file)
+    data = open(index_path, "rb").read()
+    with open(index_path, "wb") as f:
+        f.write(data[:-4])
+    assert JsonlIndex.load(jsonl_file) is None
+
+    JsonlIndex.open(jsonl_file)
+    assert JsonlIndex.load(jsonl_file, key="id") is None
+    with open(jsonl_file, "a") as f:
+        f.write(json.dumps({"id": "new"}) + "\n")
+    assert JsonlIndex.load(jsonl_file) is None
@@ -0,0 +1,200 @@
+"""
+运行清单测试：清单的读写、已完成批次的校验，以及续跑时只渲染缺失或被改动的批次
+端到端测试使用 text 引擎（需要 reportlab）
+"""
+
+import json
+import os
+
+import pytest
+
+from core import manifest as manifest_module
+from core.manifest import MANIFEST_NAME, RunManifest, file_sha256, fingerprint_input
+
+PARAMS = {"input": {"sha256": "abc"}, "fields": ["q", "a"], "batch_size": 4}
+
+
+def _write_pdf(output_dir, manifest, batch_no, content=b"%PDF-1.4 test"):
+    name = manifest.file_name(batch_no)
+    path = os.path.join(output_dir, name)
+    with open(path, 'wb') as f:
+        f.write(content)
+    manifest.mark_done(batch_no, name, file_sha256(path), 4)
+    return path
+
+
+def test_manifest_round_trip(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = RunManifest.open(output_dir, PARAMS)
+    _write_pdf(output_dir, manifest, 1)
+    _write_pdf(output_dir, manifest, 2)
+
+    loaded = RunManifest.load(output_dir)
+    assert loaded.params == PARAMS
+    assert loaded.timestamp == manifest.timestamp
+    assert sorted(loaded.batches) == [1, 2]
+    assert loaded.file_name(1) == manifest.file_name(1)
+    assert loaded.is_done(1) and loaded.is_done(2)
+    assert not loaded.is_done(3)
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = RunManifest.open(output_dir, PARAMS)
+    _write_pdf(output_dir, manifest, 1)
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'a', encoding='utf-8') as f:
+        f.write('{"batch": 2, "file": "医疗')
+
+    loaded = RunManifest.load(output_dir)
+    assert sorted(loaded.batches) == [1]
+
+
+def test_unreadable_manifest_is_none(tmp_path):
+    assert RunManifest.load(str(tmp_path)) is None
+    (tmp_path / MANIFEST_NAME).write_text("not json\n", encoding='utf-8')
+    assert RunManifest.load(str(tmp_path)) is None
+
+
+def test_modified_or_missing_file_is_not_done(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = RunManifest.open(output_dir, PARAMS)
+    changed = _write_pdf(output_dir, manifest, 1)
+    missing = _write_pdf(output_dir, manifest, 2)
+    with open(changed, 'ab') as f:
+        f.write(b"garbage")
+    os.remove(missing)
+
+    assert not manifest.is_done(1)
+    assert not manifest.is_done(2)
+
+
+def test_split_batch_needs_every_part(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = RunManifest.open(output_dir, PARAMS)
+    parts = []
+    for suffix in ("1", "2"):
+        name = f"part{suffix}.pdf"
+        (tmp_path / name).write_bytes(b"%PDF " + suffix.encode())
+        parts.append({"batch": f"3_{suffix}", "file": name,
+                      "sha256": file_sha256(str(tmp_path / name)), "records": 2})
+    manifest.mark_split(3, parts)
+
+    loaded = RunManifest.load(output_dir)
+    assert loaded.batches[3]["records"] == 4
+    assert loaded.is_done(3)
+    os.remove(tmp_path / "part2.pdf")
+    assert not loaded.is_done(3)
+
+
+def test_resume_keeps_matching_manifest(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = RunManifest.open(output_dir, PARAMS)
+    _write_pdf(output_dir, manifest, 1)
+
+    resumed = RunManifest.open(output_dir, dict(PARAMS), resume=True)
+    assert resumed.timestamp == manifest.timestamp
+    assert resumed.is_done(1)
+
+
+def test_resume_with_different_params_starts_over(tmp_path, capsys):
+    output_dir = str(tmp_path)
+    manifest = RunManifest.open(output_dir, PARAMS)
+    _write_pdf(output_dir, manifest, 1)
+
+    restarted = RunManifest.open(output_dir, dict(PARAMS, batch_size=8), resume=True)
+    assert "不一致" in capsys.readouterr().out
+    assert restarted.batches == {}
+    assert RunManifest.load(output_dir).params["batch_size"] == 8
+
+
+def test_without_resume_manifest_is_replaced(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = RunManifest.open(output_dir, PARAMS)
+    _write_pdf(output_dir, manifest, 1)
+
+    assert RunManifest.open(output_dir, PARAMS).batches == {}
+    assert RunManifest.load(output_dir).batches == {}
+
+
+def test_discard_removes_entries_and_files(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = RunManifest.open(output_dir, PARAMS)
+    paths = [_write_pdf(output_dir, manifest, n) for n in (1, 2, 3)]
+
+    manifest.discard(2)
+    assert sorted(manifest.batches) == [1]
+    assert os.path.exists(paths[0])
+    assert not os.path.exists(paths[1]) and not os.path.exists(paths[2])
+    assert sorted(RunManifest.load(output_dir).batches) == [1]
+
+
+def test_file_fingerprint_samples_head_and_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest_module, "FINGERPRINT_SAMPLE_BYTES", 16)
+    path = tmp_path / "data.jsonl"
+    data = bytearray(b"x" * 100)
+    path.write_bytes(bytes(data))
+    mtime_ns = os.stat(path).st_mtime_ns
+    original = fingerprint_input(str(path))
+
+    # 改动头部或尾部时指纹变化（保持大小和修改时间不变）
+    for position in (0, 99):
+        changed = bytearray(data)
+        changed[position:position + 1] = b"y"
+        path.write_bytes(bytes(changed))
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+        assert fingerprint_input(str(path))["sha256"] != original["sha256"]
+
+    path.write_bytes(bytes(data))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    assert fingerprint_input(str(path)) == original
+
+
+def test_data_fingerprint_depends_on_records():
+    records = [{"q": "问题1"}, {"q": "问题2"}]
+    assert fingerprint_input(records) == fingerprint_input([dict(r) for r in records])
+    assert fingerprint_input(records) != fingerprint_input(records[::-1])
+    assert fingerprint_input(records)["records"] == 2
+
+
+def _write_input(path, count=16):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({"q": f"问题{i}", "a": f"回答{i}"}, ensure_ascii=False) + '\n')
+
+
+def test_resume_renders_only_missing_batches(tmp_path, monkeypatch):
+    pytest.importorskip("reportlab")
+    from core.pdf_generator import get_renderer
+    from core.processor import process_in_batches
+
+    input_path = str(tmp_path / "data.jsonl")
+    output_dir = str(tmp_path / "out")
+    _write_input(input_path)
+    assert process_in_batches(input_path, output_dir, ["q", "a"], batch_size=4, engine="text") == 4
+    first_run = RunManifest.load(output_dir)
+    files = {n: entry["file"] for n, entry in first_run.batches.items()}
+
+    # 删除一个批次、改动另一个批次的文件，续跑时只重新渲染这两个批次
+    os.remove(os.path.join(output_dir, files[2]))
+    with open(os.path.join(output_dir, files[4]), 'ab') as f:
+        f.write(b"garbage")
+    renderer = get_renderer("text")
+    render_document = type(renderer).render_document
+    rendered = []
+
+    def render(self, document, pdf_path, timer=None):
+        rendered.append(os.path.basename(pdf_path))
+        return render_document(self, document, pdf_path, timer)
+
+    monkeypatch.setattr(type(renderer), "render_document", render)
+    statuses = {}
+    succeeded = process_in_batches(input_path, output_dir, ["q", "a"], batch_size=4, engine="text",
+                                   resume=True,
+                                   progress_callback=lambda p: statuses.__setitem__(p["batch"], p["status"]))
+
+    assert succeeded == 4
+    assert sorted(rendered) == sorted([files[2], files[4]])
+    assert statuses == {1: "skipped", 2: "done", 3: "skipped", 4: "done"}
+    resumed = RunManifest.load(output_dir)
+    assert resumed.timestamp == first_run.timestamp
+    assert all(resumed.is_done(n) for n in (1, 2, 3, 4))
@@ -0,0 +1,139 @@
+"""
+PDF合并测试：合并与按页切分真实的PDF，检查页数、书签和输出能否被 pypdf 读回
+"""
+
+import re
+import sys
+
+import pytest
+
+pypdf = pytest.importorskip("pypdf")
+pytest.importorskip("reportlab")
+
+import cli
+from core.manifest import RunManifest
+from core.pdf_merge import merge_batches, merge_pdfs, part_path
+from core.processor import process_in_batches
+
+
+def _make_pdf(path, pages, tag):
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(str(path))
+    for page in range(1, pages + 1):
+        c.drawString(100, 700, f"{tag} page {page}")
+        if page > 1:
+            # 指向同一文件第一页的内部链接，合并后应指向输出文件中的对应页面
+            c.linkAbsolute("first", f"{tag}-1", (100, 650, 200, 670))
+        else:
+            c.bookmarkPage(f"{tag}-1")
+        c.showPage()
+    c.save()
+    return str(path)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    return [(_make_pdf(tmp_path / "a.pdf", 3, "A"), "批次 1"), (_make_pdf(tmp_path / "b.pdf", 2, "B"), "批次 2"),
+            (_make_pdf(tmp_path / "c.pdf", 1, "C"), None)]
+
+
+def _read(path):
+    reader = pypdf.PdfReader(path, strict=True)
+    texts = [page.extract_text().strip() for page in reader.pages]
+    outline = [(item.title, reader.get_destination_page_number(item)) for item in reader.outline]
+    return reader, texts, outline
+
+
+def _check_xref(path):
+    """交叉引用表中的每个偏移都指向对应对象的开头"""
+    data = open(path, 'rb').read()
+    xref = int(data[data.rindex(b"startxref") + 9:].split()[0])
+    lines = data[xref:].split(b"\n")
+    assert lines[0] == b"xref"
+    first, count = map(int, lines[1].split())
+    for object_id in range(first + 1, first + count):
+        offset = int(lines[2 + object_id - first].split()[0])
+        assert re.match(rb"%d 0 obj\b" % object_id, data[offset:offset + 20])
+
+
+def test_merge_pages_and_bookmarks(tmp_path, sources):
+    output = str(tmp_path / "merged.pdf")
+    assert merge_pdfs(sources, output) == [output]
+    reader, texts, outline = _read(output)
+    assert texts == ["A page 1", "A page 2", "A page 3", "B page 1", "B page 2", "C page 1"]
+    assert outline == [("批次 1", 0), ("批次 2", 3)]
+    _check_xref(output)
+
+
+def test_merge_keeps_internal_links(tmp_path, sources):
+    output = str(tmp_path / "merged.pdf")
+    merge_pdfs(sources, output)
+    reader = pypdf.PdfReader(output)
+    targets = []
+    for page in reader.pages:
+        for annot in page.get("/Annots") or []:
+            dest = annot.get_object()["/Dest"]
+            targets.append(reader.get_page_number(dest[0].get_object()))
+    # A、B 的第2页及之后各有一个指向各自第一页的链接
+    assert targets == [0, 0, 3]
+
+
+def test_split_pages(tmp_path, sources):
+    output = str(tmp_path / "split.pdf")
+    written = merge_pdfs(sources, output, pages_per_file=2)
+    assert written == [part_path(output, part) for part in (1, 2, 3)]
+    results = [_read(path) for path in written]
+    assert [texts for _, texts, _ in results] == [
+        ["A page 1", "A page 2"], ["A page 3", "B page 1"], ["B page 2", "C page 1"]]
+    assert [outline for _, _, outline in results] == [
+        [("批次 1", 0)], [("批次 1（续）", 0), ("批次 2", 1)], [("批次 2（续）", 0)]]
+    for path in written:
+        _check_xref(path)
+
+
+def test_split_rejects_invalid_page_count(tmp_path, sources):
+    with pytest.raises(ValueError):
+        merge_pdfs(sources, str(tmp_path / "x.pdf"), pages_per_file=0)
+
+
+def test_failed_merge_removes_partial_output(tmp_path, sources):
+    output = tmp_path / "merged.pdf"
+    with pytest.raises(Exception):
+        merge_pdfs(sources + [(str(tmp_path / "missing.pdf"), "缺失")], str(output))
+    assert not output.exists()
+
+
+@pytest.fixture
+def rendered(tmp_path):
+    output_dir = str(tmp_path / "out")
+    records = [{"q": f"问题{i}", "a": f"回答{i}"} for i in range(10)]
+    process_in_batches(records, output_dir, ["q", "a"], batch_size=4, engine="text")
+    return output_dir
+
+
+def test_merge_batches_in_manifest_order(tmp_path, rendered):
+    output = str(tmp_path / "all.pdf")
+    merge_batches(rendered, output)
+    manifest = RunManifest.load(rendered)
+    reader, _, outline = _read(output)
+    pages = sum(len(pypdf.PdfReader(f"{rendered}/{manifest.batches[n]['file']}").pages) for n in manifest.batches)
+    assert len(reader.pages) == pages
+    assert [title for title, _ in outline] == ["批次 1（4 条记录）", "批次 2（4 条记录）", "批次 3（2 条记录）"]
+
+
+def test_merge_batches_reports_missing_files(tmp_path, rendered):
+    manifest = RunManifest.load(rendered)
+    (tmp_path / "out" / manifest.batches[2]["file"]).unlink()
+    with pytest.raises(ValueError, match="不存在"):
+        merge_batches(rendered, str(tmp_path / "all.pdf"))
+
+
+def test_cli_merge_only(tmp_path, monkeypatch, rendered):
+    output = str(tmp_path / "all.pdf")
+    monkeypatch.setattr(sys, "argv", ["cli.py", "-o", rendered, "--merge", output, "--merge-only",
+                                      "--split-pages", "1"])
+    cli.main()
+    written = sorted((tmp_path).glob("all_part*.pdf"))
+    assert len(written) == 3
+    assert all(len(pypdf.PdfReader(str(path)).pages) == 1 for path in written)
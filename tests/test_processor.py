@@ -0,0 +1,174 @@
+"""
+批次处理测试：渲染进程异常退出或超出内存预算时运行继续进行、按批次范围重新生成
+使用 text 引擎（需要 reportlab）；模拟崩溃的测试要求进程池以 fork 方式继承打过补丁的渲染器
+"""
+
+import multiprocessing
+import os
+import time
+
+import pytest
+
+pytest.importorskip("reportlab")
+
+from core import pdf_generator
+from core.pdf_generator import get_renderer
+from core.manifest import RunManifest
+from core.memory_guard import MemoryBudgetExceeded, MemoryWatchdog
+from core.processor import process_in_batches, _render_with_budget
+
+requires_fork = pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                                   reason="需要 fork 方式启动渲染进程")
+
+RECORDS = [{"q": f"问题{i}", "a": f"回答{i}"} for i in range(16)]
+
+
+@pytest.fixture
+def crashing_renderer(monkeypatch):
+    """文档中含有两个及以上 BIG 时直接退出进程，模拟内存随批次内容增长、被系统杀掉的渲染进程"""
+    renderer = get_renderer("text")
+    render_document = type(renderer).render_document
+
+    def render(self, document, pdf_path, timer=None):
+        if self.cache_text(document).count("BIG") >= 2:
+            os._exit(9)
+        return render_document(self, document, pdf_path, timer)
+
+    monkeypatch.setattr(type(renderer), "render_document", render)
+
+
+def _with_big(*positions, text="BIG"):
+    return [{"q": record["q"], "a": text} if index in positions else record
+            for index, record in enumerate(RECORDS)]
+
+
+@requires_fork
+def test_worker_crash_fails_only_its_batch(tmp_path, crashing_renderer):
+    output_dir = str(tmp_path)
+    succeeded = process_in_batches(_with_big(8, 10), output_dir, ["q", "a"], batch_size=4, workers=2,
+                                   engine="text")
+    assert succeeded == 3
+    assert sorted(RunManifest.load(output_dir).batches) == [1, 2, 4]
+
+
+@requires_fork
+def test_worker_crash_is_split_with_memory_budget(tmp_path, crashing_renderer):
+    output_dir = str(tmp_path)
+    succeeded = process_in_batches(_with_big(8, 10), output_dir, ["q", "a"], batch_size=4, workers=2,
+                                   engine="text", memory_budget_mb=4096)
+    assert succeeded == 4
+    manifest = RunManifest.load(output_dir)
+    assert [part["batch"] for part in manifest.batches[3]["parts"]] == ["3_1", "3_2"]
+    assert manifest.batches[3]["records"] == 4
+
+
+@requires_fork
+def test_worker_crash_unsplittable_batch_fails(tmp_path, crashing_renderer):
+    output_dir = str(tmp_path)
+    # 单条记录本身就会导致退出，拆分到单条后仍失败
+    succeeded = process_in_batches(_with_big(11, text="BIG BIG"), output_dir, ["q", "a"], batch_size=4, workers=2,
+                                   engine="text", memory_budget_mb=4096)
+    assert succeeded == 3
+    assert sorted(RunManifest.load(output_dir).batches) == [1, 2, 4]
+    # 失败批次已完成的子批次文件被删除
+    assert not [name for name in os.listdir(output_dir) if "batch3" in name]
+
+
+@pytest.fixture
+def memory_hungry_renderer(monkeypatch, tmp_path):
+    """
+    文档中含有两个及以上 BIG 时分配大量内存并等待内存监视线程中止渲染；
+    每次渲染在日志中记录进程号和结果
+    """
+    log = tmp_path / "render.log"
+    renderer = get_renderer("text")
+    render_document = type(renderer).render_document
+
+    def render(self, document, pdf_path, timer=None):
+        if self.cache_text(document).count("BIG") >= 2:
+            hog = b"x" * (64 * 1024 * 1024)
+            try:
+                deadline = time.monotonic() + 10
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+            except MemoryBudgetExceeded:
+                with open(log, "a") as f:
+                    f.write(f"{os.getpid()} over\n")
+                raise
+            del hog
+        with open(log, "a") as f:
+            f.write(f"{os.getpid()} ok {self.cache_text(document).count('BIG')}\n")
+        return render_document(self, document, pdf_path, timer)
+
+    monkeypatch.setattr(type(renderer), "render_document", render)
+    return log
+
+
+@requires_fork
+@pytest.mark.skipif(not MemoryWatchdog.supported(), reason="当前平台不支持内存监视")
+@pytest.mark.parametrize("workers", [1, 2])
+def test_over_budget_batch_is_split_in_new_process(tmp_path, memory_hungry_renderer, workers):
+    output_dir = str(tmp_path / "out")
+    succeeded = process_in_batches(_with_big(8, 10), output_dir, ["q", "a"], batch_size=4, workers=workers,
+                                   engine="text", memory_budget_mb=16)
+    assert succeeded == 4
+    manifest = RunManifest.load(output_dir)
+    assert [part["batch"] for part in manifest.batches[3]["parts"]] == ["3_1", "3_2"]
+    assert all(manifest.is_done(n) for n in [1, 2, 3, 4])
+
+    entries = [line.split() for line in memory_hungry_renderer.read_text().splitlines()]
+    over = [pid for pid, status, *_ in entries if status == "over"]
+    halves = [pid for pid, status, *count in entries if status == "ok" and count == ["1"]]
+    assert len(over) == 1 and len(halves) == 2
+    # 被中止的进程不再渲染拆分后的子批次
+    assert over[0] not in halves
+
+
+def test_over_budget_discards_cached_renderer(tmp_path, monkeypatch):
+    renderer = get_renderer("text")
+
+    def render(self, document, pdf_path, timer=None):
+        open(pdf_path, "wb").close()
+        raise MemoryBudgetExceeded("超过预算")
+
+    monkeypatch.setattr(type(renderer), "render_document", render)
+    pdf_path = str(tmp_path / "batch1.pdf")
+    task = (1, RECORDS[:2], ["q", "a"], "----", [], pdf_path, None, False, "text")
+    with pytest.raises(MemoryBudgetExceeded):
+        _render_with_budget(task, 4096)
+    assert "text" not in pdf_generator._renderers
+    assert not os.path.exists(pdf_path)
+    assert get_renderer("text") is not renderer
+
+
+def test_batch_range_reuses_full_run(tmp_path):
+    output_dir = str(tmp_path)
+    process_in_batches(RECORDS, output_dir, ["q", "a"], batch_size=4, engine="text")
+    full = RunManifest.load(output_dir)
+    assert sorted(full.batches) == [1, 2, 3, 4]
+
+    succeeded = process_in_batches(RECORDS, output_dir, ["q", "a"], batch_size=4, engine="text",
+                                   batch_range=(2, 3))
+    assert succeeded == 2
+    manifest = RunManifest.load(output_dir)
+    # 文件名和范围外的批次保持不变，范围内的批次被重新生成
+    assert manifest.timestamp == full.timestamp
+    assert sorted(manifest.batches) == [1, 2, 3, 4]
+    assert {n: entry["file"] for n, entry in manifest.batches.items()} == \
+        {n: entry["file"] for n, entry in full.batches.items()}
+    assert sorted(os.listdir(output_dir)) == sorted([entry["file"] for entry in full.batches.values()] +
+                                                    ["manifest.jsonl"])
+    assert all(manifest.is_done(n) for n in manifest.batches)
+
+
+def test_batch_range_resume_renders_only_missing(tmp_path):
+    output_dir = str(tmp_path)
+    process_in_batches(RECORDS, output_dir, ["q", "a"], batch_size=4, engine="text")
+    full = RunManifest.load(output_dir)
+    os.remove(os.path.join(output_dir, full.batches[3]["file"]))
+
+    process_in_batches(RECORDS, output_dir, ["q", "a"], batch_size=4, engine="text",
+                       batch_range=(2, 3), resume=True)
+    manifest = RunManifest.load(output_dir)
+    assert all(manifest.is_done(n) for n in [1, 2, 3, 4])
+    assert manifest.batches[2] == full.batches[2]
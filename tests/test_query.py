@@ -0,0 +1,131 @@
+"""
+记录查询测试：条件解析、筛选、offset/limit、字段投影，以及在加载器中（包括多进程解析）下推执行
+"""
+
+import json
+import pickle
+
+import pytest
+
+from core.data_loader import iter_jsonl_parallel, iter_records, load_data_file
+from core.query import Query, parse_condition
+
+RECORDS = [
+    {"id": i, "dept": "内科" if i % 2 else "外科", "score": i % 5, "meta": {"tag": f"t{i}"},
+     "answer": f"第{i}条，发热" if i % 3 == 0 else f"第{i}条"}
+    for i in range(30)
+]
+
+
+def test_parse_condition():
+    assert parse_condition("score >= 3") == ("score", ">=", 3)
+    assert parse_condition("dept == 内科") == ("dept", "==", "内科")
+    assert parse_condition('dept == "有 空格"') == ("dept", "==", "有 空格")
+    assert parse_condition("flag == true") == ("flag", "==", True)
+    assert parse_condition("meta.tag") == ("meta.tag", None, None)
+    with pytest.raises(ValueError):
+        parse_condition("== 3")
+
+
+def test_conditions_are_combined():
+    query = Query(["dept == 内科", "score >= 3"])
+    selected = list(query.apply(RECORDS))
+    assert selected == [r for r in RECORDS if r["dept"] == "内科" and r["score"] >= 3]
+
+
+def test_contains_existence_and_nested_fields():
+    assert [r["id"] for r in Query("answer ~ 发热").apply(RECORDS)] == list(range(0, 30, 3))
+    assert [r["id"] for r in Query("meta.tag == t7").apply(RECORDS)] == [7]
+    records = [{"a": 1}, {"b": 2}, {"a": None}]
+    assert list(Query("a").apply(records)) == [{"a": 1}, {"a": None}]
+
+
+def test_missing_or_incomparable_values_do_not_match():
+    records = [{"score": "高"}, {"other": 1}, {"score": 4}]
+    assert list(Query("score > 3").apply(records)) == [{"score": 4}]
+    assert list(Query("score != 1").apply(records)) == [{"score": "高"}, {"score": 4}]
+
+
+def test_offset_and_limit_count_matching_records():
+    query = Query("dept == 外科", limit=3, offset=2)
+    assert [r["id"] for r in query.apply(RECORDS)] == [4, 6, 8]
+
+
+def test_limit_stops_reading():
+    consumed = []
+
+    def source():
+        for record in RECORDS:
+            consumed.append(record["id"])
+            yield record
+
+    assert len(list(Query(limit=2).apply(source()))) == 2
+    assert consumed == [0, 1]
+
+
+def test_projection_keeps_only_requested_fields():
+    query = Query(fields=["id", "meta.tag", "missing"])
+    assert next(query.apply(RECORDS)) == {"id": 0, "meta.tag": "t0"}
+    # 条件可以使用不在投影中的字段
+    query = Query("score == 4", fields=["id"])
+    assert list(query.apply(RECORDS)) == [{"id": 4}, {"id": 9}, {"id": 14}, {"id": 19}, {"id": 24}, {"id": 29}]
+
+
+def test_narrowed_stays_inside_the_original_range():
+    query = Query(limit=10, offset=5)
+    narrowed = query.narrowed(4, 20)
+    assert (narrowed.offset, narrowed.limit) == (9, 6)
+    assert query.narrowed(12).limit == 0
+    assert Query().narrowed(3, 2).limit == 2
+
+
+def test_with_fields_and_describe():
+    query = Query("score > 1", limit=5)
+    projected = query.with_fields(["id"])
+    assert projected.fields == ["id"]
+    assert projected.with_fields(["dept"]) is projected
+    assert projected.describe() == query.describe() == {"where": ["score > 1"], "limit": 5, "offset": 0}
+    assert not Query(fields=["id"]).filters_records
+    assert Query(offset=1).filters_records
+
+
+def test_invalid_limit_and_offset():
+    with pytest.raises(ValueError):
+        Query(limit=-1)
+    with pytest.raises(ValueError):
+        Query(offset=-1)
+
+
+def test_query_is_picklable():
+    query = Query(["answer ~ 发热", "score >= 1"], fields=["id"], limit=3)
+    clone = pickle.loads(pickle.dumps(query))
+    assert list(clone.apply(RECORDS)) == list(query.apply(RECORDS))
+
+
+@pytest.fixture
+def data_files(tmp_path):
+    jsonl_path = tmp_path / "data.jsonl"
+    with open(jsonl_path, 'w', encoding='utf-8') as f:
+        for record in RECORDS:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    json_path = tmp_path / "data.json"
+    json_path.write_text(json.dumps(RECORDS, ensure_ascii=False), encoding='utf-8')
+    return str(jsonl_path), str(json_path)
+
+
+def test_loader_applies_query(data_files):
+    query = Query("dept == 内科", fields=["id", "answer"], limit=4, offset=1)
+    expected = list(query.apply(RECORDS))
+    assert [r["id"] for r in expected] == [3, 5, 7, 9]
+    for path in data_files:
+        assert list(iter_records(path, query=query)) == expected
+        assert load_data_file(path, query=query) == expected
+
+
+def test_parallel_loader_applies_query(data_files):
+    query = Query("score >= 2", fields=["id"], limit=7, offset=3)
+    expected = list(query.apply(RECORDS))
+    assert list(iter_records(data_files[0], parse_workers=2, query=query)) == expected
+    # 按很小的字节区间拆分，使多个解析进程各自筛选一部分记录，顺序保持不变
+    records = iter_jsonl_parallel(data_files[0], 2, range_size=256, query=query)
+    assert list(query.slice(records)) == expected
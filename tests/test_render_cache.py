@@ -0,0 +1,117 @@
+"""
+渲染缓存测试：命中与未命中、按最近使用时间淘汰、缓存键随内容和模板/布局版本变化，
+以及重复运行时未变化的批次直接复用缓存
+端到端测试使用 text 引擎（需要 reportlab）
+"""
+
+import os
+import time
+
+import pytest
+
+from core.render_cache import RenderCache
+
+
+def _pdf(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"%" + b"x" * (size - 1))
+    return str(path)
+
+
+def test_fetch_hit_and_miss(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    key = RenderCache.make_key("<html>batch</html>", "v1")
+    target = str(tmp_path / "out.pdf")
+    assert not cache.fetch(key, target)
+    assert not os.path.exists(target)
+
+    cache.store(key, _pdf(tmp_path, "rendered.pdf", 100))
+    with open(target, 'wb') as f:
+        f.write(b"stale")
+    assert cache.fetch(key, target)
+    with open(target, 'rb') as f:
+        assert f.read() == b"%" + b"x" * 99
+
+
+def test_key_depends_on_document_and_version():
+    key = RenderCache.make_key("文档", "v1")
+    assert key == RenderCache.make_key("文档", "v1")
+    assert key != RenderCache.make_key("文档", "v2")
+    assert key != RenderCache.make_key("文档2", "v1")
+    # 文档和版本之间有分隔符，拼接结果相同的两组输入不会得到相同的键
+    assert RenderCache.make_key("b", "a") != RenderCache.make_key("", "ab")
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_size_mb=250 / (1024 * 1024))
+    keys = [RenderCache.make_key(f"doc{i}", "v1") for i in range(3)]
+    now = time.time()
+    for age, key in zip((30, 20, 10), keys):
+        cache.store(key, _pdf(tmp_path, f"{key}.pdf", 100))
+        entry = cache._entry_path(key)
+        os.utime(entry, (now - age, now - age))
+    # 读取最旧的条目后它变为最近使用，淘汰的是第二个条目
+    assert cache.fetch(keys[0], str(tmp_path / "hit.pdf"))
+
+    assert cache.evict() == 1
+    assert os.path.exists(cache._entry_path(keys[0]))
+    assert not os.path.exists(cache._entry_path(keys[1]))
+    assert os.path.exists(cache._entry_path(keys[2]))
+    assert cache.evict() == 0
+
+
+def test_text_layout_version_invalidates_keys(monkeypatch):
+    pytest.importorskip("reportlab")
+    from core import text_renderer
+
+    version = text_renderer.TextPDFRenderer(font_path=None).cache_version
+    monkeypatch.setattr(text_renderer, "TEXT_LAYOUT_VERSION", text_renderer.TEXT_LAYOUT_VERSION + "-next")
+    assert text_renderer.TextPDFRenderer(font_path=None).cache_version != version
+
+
+def test_template_version_invalidates_keys(monkeypatch):
+    from core import pdf_generator
+
+    try:
+        version = pdf_generator.PDFRenderer(font_family=None).cache_version
+    except (ImportError, OSError) as e:
+        pytest.skip(f"WeasyPrint 不可用: {e}")
+    assert pdf_generator.PDFRenderer(font_family=None, css="body { margin: 0 }").cache_version != version
+    monkeypatch.setattr(pdf_generator, "TEMPLATE_VERSION", pdf_generator.TEMPLATE_VERSION + "-next")
+    assert pdf_generator.PDFRenderer(font_family=None).cache_version != version
+
+
+def test_unchanged_batches_are_served_from_cache(tmp_path, monkeypatch):
+    pytest.importorskip("reportlab")
+    from core.pdf_generator import get_renderer
+    from core.processor import process_in_batches
+
+    records = [{"q": f"问题{i}", "a": f"回答{i}"} for i in range(12)]
+    cache_dir = str(tmp_path / "cache")
+    renderer = get_renderer("text")
+    render_document = type(renderer).render_document
+    rendered = []
+
+    def render(self, document, pdf_path, timer=None):
+        rendered.append(os.path.basename(pdf_path))
+        return render_document(self, document, pdf_path, timer)
+
+    monkeypatch.setattr(type(renderer), "render_document", render)
+
+    def run(data, output_dir, tag="----"):
+        rendered.clear()
+        statuses = []
+        process_in_batches(data, str(tmp_path / output_dir), ["q", "a"], batch_size=4, engine="text",
+                           tag=tag, cache_dir=cache_dir,
+                           progress_callback=lambda p: statuses.append(p["pages"] is not None))
+        return len(rendered), statuses
+
+    assert run(records, "first") == (3, [True, True, True])
+    # 只有内容变化的第二批重新渲染，命中缓存的批次不报告页数
+    changed = records[:5] + [{"q": "问题5", "a": "新的回答"}] + records[6:]
+    assert run(changed, "second") == (1, [False, True, False])
+    for name in os.listdir(tmp_path / "second"):
+        if name.endswith(".pdf"):
+            assert (tmp_path / "second" / name).read_bytes().startswith(b"%PDF")
+    # 分隔标记是文档的一部分，修改后全部未命中
+    assert run(records, "third", tag="====")[0] == 3
@@ -0,0 +1,79 @@
+"""
+纯文本渲染器测试：默认嵌入系统字体，找不到可嵌入的字体时才使用CID字体
+"""
+
+import os
+
+import pytest
+
+reportlab = pytest.importorskip("reportlab")
+
+from core import text_renderer
+from core.fonts import FontMatch
+from core.profiling import StageTimer
+from core.text_renderer import DEFAULT_CID_FONT, EMBEDDED_FONT_NAME, FONT_ENV, TextPDFRenderer
+
+TTF_PATH = os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf")
+RECORDS = [{"question": "What?", "answer": "Plain text answer"}]
+
+
+@pytest.fixture(autouse=True)
+def no_font_env(monkeypatch):
+    monkeypatch.delenv(FONT_ENV, raising=False)
+
+
+def _render(renderer, tmp_path):
+    pdf_path = tmp_path / "out.pdf"
+    document = renderer.build_document(RECORDS, ["question", "answer"])
+    renderer.render_document(document, str(pdf_path))
+    return pdf_path.read_bytes()
+
+
+def test_resolved_font_is_embedded(monkeypatch, tmp_path):
+    requested = []
+
+    def resolve(family, lang="zh-cn", fontformat=None):
+        requested.append(fontformat)
+        return FontMatch(TTF_PATH, 0)
+
+    monkeypatch.setattr(text_renderer, "resolve_font", resolve)
+    renderer = TextPDFRenderer()
+    assert renderer.font_name == EMBEDDED_FONT_NAME
+    assert requested == ["TrueType"]
+    assert b"/FontFile2" in _render(renderer, tmp_path)
+
+
+def test_font_subsetting_is_timed_per_batch(tmp_path):
+    renderer = TextPDFRenderer(font_path=TTF_PATH)
+    document = renderer.build_document(RECORDS, ["question", "answer"])
+    timers = []
+    for n in range(2):
+        timer = StageTimer()
+        renderer.render_document(document, str(tmp_path / f"out{n}.pdf"), timer)
+        timers.append(timer)
+    for timer in timers:
+        assert {"layout", "write", "subset"} <= set(timer.stages)
+        assert timer.stages["subset"]["wall"] > 0
+
+
+def test_cid_font_is_last_resort(monkeypatch, tmp_path):
+    monkeypatch.setattr(text_renderer, "resolve_font", lambda *args, **kwargs: None)
+    renderer = TextPDFRenderer()
+    assert renderer.font_name == DEFAULT_CID_FONT
+    assert b"/FontFile2" not in _render(renderer, tmp_path)
+
+
+def test_unloadable_resolved_font_falls_back(monkeypatch, tmp_path, capsys):
+    broken = tmp_path / "broken.ttf"
+    broken.write_bytes(b"not a font")
+    monkeypatch.setattr(text_renderer, "resolve_font", lambda *args, **kwargs: FontMatch(str(broken), 0))
+    renderer = TextPDFRenderer()
+    assert renderer.font_name == DEFAULT_CID_FONT
+    assert "无法嵌入字体" in capsys.readouterr().out
+
+
+def test_explicit_font_errors_are_raised(tmp_path):
+    broken = tmp_path / "broken.ttf"
+    broken.write_bytes(b"not a font")
+    with pytest.raises(Exception):
+        TextPDFRenderer(font_path=str(broken))
@@ -0,0 +1,27 @@
+"""
+Web界面处理器测试：提交任务与状态刷新（不需要 gradio）
+"""
+
+from web import handlers
+from web.jobs import JobManager
+
+
+def test_rejected_submit_keeps_error():
+    job_id, status = handlers.submit_pdf_job(None, ["q"], "./out", 10, "----", False, "")
+    assert job_id == ""
+    assert status == "❌ 请先上传JSON文件"
+    # 提交后的状态刷新不输出任何内容，界面上保留上面的错误信息
+    assert list(handlers.follow_submitted_job(job_id)) == []
+
+
+def test_refresh_without_job_id_asks_for_one():
+    assert list(handlers.stream_job_status("  ")) == ["❌ 请先提交任务或输入任务ID"]
+
+
+def test_follow_submitted_job_streams_until_done(monkeypatch):
+    manager = JobManager(max_concurrent_jobs=1)
+    monkeypatch.setattr(handlers, "get_job_manager", lambda: manager)
+    job_id = manager.submit(lambda job: "✅ 完成")
+    statuses = list(handlers.follow_submitted_job(job_id, interval=0.01))
+    assert statuses
+    assert "✅ 完成" in statuses[-1]
@@ -1,27 +1,44 @@
 """
 Web界面模块
+
+导出的名称在首次访问时才导入对应的子模块，
+只有用到 create_interface 等界面相关的名称时才会加载 gradio
 """
 
-from .interface import create_interface
-from .handlers import (
-    get_json_fields,
-    process_json_to_pdf,
-    update_fields_dropdown,
-    toggle_fix_json_output,
-    toggle_usage_guide
-)
-from .content import get_usage_guide
-from .styles import get_header_html, get_help_button_js, get_custom_css
-
-__all__ = [
-    'create_interface',
-    'get_json_fields',
-    'process_json_to_pdf', 
-    'update_fields_dropdown',
-    'toggle_fix_json_output',
-    'toggle_usage_guide',
-    'get_usage_guide',
-    'get_header_html',
-    'get_help_button_js',
-    'get_custom_css'
-]
+import importlib
+
+# 导出名称 -> 子模块
+_LAZY_ATTRS = {
+    'create_interface': '.interface',
+    'get_json_schema': '.handlers',
+    'get_json_fields': '.handlers',
+    'get_json_field_choices': '.handlers',
+    'process_json_to_pdf': '.handlers',
+    'submit_pdf_job': '.handlers',
+    'stream_job_status': '.handlers',
+    'follow_submitted_job': '.handlers',
+    'cancel_pdf_job': '.handlers',
+    'update_fields_dropdown': '.handlers',
+    'toggle_fix_json_output': '.handlers',
+    'toggle_usage_guide': '.handlers',
+    'JobManager': '.jobs',
+    'get_job_manager': '.jobs',
+    'get_usage_guide': '.content',
+    'get_header_html': '.styles',
+    'get_help_button_js': '.styles',
+    'get_custom_css': '.styles',
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
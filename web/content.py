@@ -12,11 +12,12 @@ def get_usage_guide():
     2. **修复格式**: 如果文件格式不规范，勾选"修复JSON文件格式"选项
        - 小文件(≤10MB): 修复后自动存储在内存中，无需输出路径
        - 大文件(>10MB): 需要指定修复文件的输出路径
-    3. **选择字段**: 上传文件后会自动显示可选字段，选择需要提取的字段
+    3. **选择字段**: 上传文件后会采样文件开头的记录并显示可选字段（附带出现比例和类型），嵌套字段以 `a.b` 形式显示
     4. **设置输出**: 指定PDF文件的输出路径
     5. **调整Batch Size**: 根据需要调整每个PDF文件包含的记录数量
     6. **自定义标记**: 可以自定义记录之间的分隔符号，如 "----"、"==="、"***" 等
-    7. **开始处理**: 点击"开始处理"按钮生成PDF文件
+    7. **开始处理**: 点击"开始处理"按钮提交后台任务，状态框会实时显示批次进度、吞吐量和预计剩余时间
+    8. **任务管理**: 任务在后台运行，关闭页面不会中断；可以粘贴任务ID点击"查询进度"重新查看，或点击"取消任务"在当前批次完成后停止
     
     ## 📝 支持的文件格式
     
@@ -46,7 +47,8 @@ def get_usage_guide():
     - **自动识别**: 智能识别JSON和JSONL文件格式
     - **格式转换**: 支持JSONL到JSON的自动转换
     - **自动优化**: 小文件修复后直接存储在内存中，提高处理速度
-    - **大文件处理**: 大文件修复后输出到指定路径，避免内存溢出
+    - **大文件处理**: 大文件流式修复并输出到指定路径，只读取一遍源文件，避免内存溢出
+    - **错误报告**: 无法解析的行不会中断修复，会记录到 `<输出路径>.errors.jsonl`
     - **智能判断**: 自动检测文件是否需要修复，无需修复则直接处理
     - **默认路径**: 不指定修复输出路径时，默认保存到PDF输出目录
     
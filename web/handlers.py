@@ -3,34 +3,52 @@ Web界面处理器
 负责处理用户交互逻辑
 """
 
+import math
 import os
 import tempfile
-from core import load_data_file, fix_json_file, process_in_batches
+import time
+from core import fix_json_file, process_in_batches, probe_schema
+from core.compression import detect_compression
+from core.data_loader import count_lines, is_jsonl_path
+from core.jsonl_index import JsonlIndex
+from .jobs import get_job_manager, format_job_status, DONE, FAILED, CANCELLED
 
 
-def get_json_fields(json_file):
-    """获取JSON/JSONL文件中的字段名"""
+def get_json_schema(json_file):
+    """采样探测JSON/JSONL文件的字段结构，只读取文件开头的一部分"""
     if json_file is None:
-        return []
+        return None
     
     try:
-        # 使用统一的数据加载函数
-        data = load_data_file(json_file)
-        
-        if not data or not isinstance(data, list):
-            return []
-        
-        # 获取第一个对象的字段名
-        first_item = data[0] if data else {}
-        fields = list(first_item.keys()) if isinstance(first_item, dict) else []
-        return fields
+        return probe_schema(json_file)
     except Exception as e:
         print(f"读取文件错误: {e}")
+        return None
+
+
+def get_json_fields(json_file):
+    """获取JSON/JSONL文件中的字段名，嵌套字段以点号路径表示"""
+    schema = get_json_schema(json_file)
+    if not schema:
         return []
+    return list(schema["fields"])
 
 
-def process_json_to_pdf(json_file, selected_fields, output_dir, batch_size, custom_tag, fix_json_checkbox, fix_json_output):
-    """处理JSON文件并生成PDF"""
+def get_json_field_choices(json_file):
+    """获取字段选项，标签中附带字段出现比例和值类型"""
+    schema = get_json_schema(json_file)
+    if not schema:
+        return []
+    
+    choices = []
+    for path, info in schema["fields"].items():
+        label = f"{path} ({info['ratio']:.0%}, {'/'.join(info['types'])})"
+        choices.append((label, path))
+    return choices
+
+
+def _validate_inputs(json_file, selected_fields, output_dir, batch_size):
+    """校验表单输入，有错误时返回错误信息"""
     if json_file is None:
         return "❌ 请先上传JSON文件"
     
@@ -40,57 +58,158 @@ def process_json_to_pdf(json_file, selected_fields, output_dir, batch_size, cust
     if not output_dir.strip():
         return "❌ 请指定输出路径"
     
-    try:
-        json_data_or_path = json_file
-        status_messages = []
-        
-        # 如果需要修复JSON文件
-        if fix_json_checkbox:
-            # 确定修复文件的输出路径
-            if fix_json_output and fix_json_output.strip():
-                fix_output_path = fix_json_output.strip()
-            else:
-                # 默认使用PDF输出目录
-                fix_output_path = os.path.join(output_dir, "fixed.json")
-            
-            # 检查文件大小并决定处理方式
-            file_size_mb = os.path.getsize(json_file) / (1024 * 1024)
-            
-            if file_size_mb > 10:  # 大文件，必须输出到文件
-                is_file_output, result, status = fix_json_file(json_file, fix_output_path)
-                status_messages.append(status)
-                if is_file_output:
-                    json_data_or_path = result  # 使用修复后的文件路径
-                else:
-                    return f"❌ 大文件修复失败: {status}"
-            else:  # 小文件，可以存储在内存中
-                is_file_output, result, status = fix_json_file(json_file)
-                status_messages.append(status)
-                json_data_or_path = result  # 直接使用内存中的数据
-        
-        # 确保输出目录存在
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # 处理数据并生成PDF
-        batches = process_in_batches(
-            json_path_or_data=json_data_or_path,
-            output_dir=output_dir,
-            fields=selected_fields,
-            batch_size=batch_size,
-            tag=custom_tag
-        )
+    if not batch_size or batch_size < 1:
+        return "❌ 请设置有效的Batch Size"
+    return None
+
+
+def _estimate_batches(json_data_or_path, batch_size):
+    """预估总批次数，用于显示进度和预计剩余时间；JSON数组文件和压缩文件无法快速估算时返回None"""
+    if isinstance(json_data_or_path, list):
+        return math.ceil(len(json_data_or_path) / batch_size)
+    if is_jsonl_path(json_data_or_path) and detect_compression(json_data_or_path) is None:
+        # 已有有效的偏移索引时直接使用其中的记录数
+        index = JsonlIndex.load(json_data_or_path)
+        records = len(index) if index is not None else count_lines(json_data_or_path)
+        return math.ceil(records / batch_size)
+    return None
+
+
+def _convert(json_file, selected_fields, output_dir, batch_size, custom_tag, fix_json_checkbox,
+             fix_json_output, job=None):
+    """
+    执行修复和PDF生成，返回最终状态信息
+    传入后台任务时上报进度并响应取消
+    """
+    json_data_or_path = json_file
+    status_messages = []
+    batch_size = int(batch_size)
+    
+    # 如果需要修复JSON文件
+    if fix_json_checkbox:
+        # 确定修复文件的输出路径
+        if fix_json_output and fix_json_output.strip():
+            fix_output_path = fix_json_output.strip()
+        else:
+            # 默认使用PDF输出目录
+            fix_output_path = os.path.join(output_dir, "fixed.json")
         
-        final_message = "\n".join(status_messages) + f"\n✅ PDF生成完成！共生成 {batches} 个文件，输出路径: {output_dir}"
-        return final_message
+        # 检查文件大小并决定处理方式
+        file_size_mb = os.path.getsize(json_file) / (1024 * 1024)
         
+        if file_size_mb > 10:  # 大文件，必须输出到文件
+            is_file_output, result, status = fix_json_file(json_file, fix_output_path)
+            status_messages.append(status)
+            if is_file_output:
+                json_data_or_path = result  # 使用修复后的文件路径
+            else:
+                return f"❌ 大文件修复失败: {status}"
+        else:  # 小文件，可以存储在内存中
+            is_file_output, result, status = fix_json_file(json_file)
+            status_messages.append(status)
+            json_data_or_path = result  # 直接使用内存中的数据
+    
+    # 确保输出目录存在
+    os.makedirs(output_dir, exist_ok=True)
+    
+    progress_callback = None
+    cancel_event = None
+    if job is not None:
+        job.total_batches = _estimate_batches(json_data_or_path, batch_size)
+        progress_callback = job.update_progress
+        cancel_event = job.cancel_event
+    
+    # 处理数据并生成PDF，渲染始终在子进程中进行，服务进程只负责读取和调度
+    batches = process_in_batches(
+        json_path_or_data=json_data_or_path,
+        output_dir=output_dir,
+        fields=selected_fields,
+        batch_size=batch_size,
+        tag=custom_tag,
+        workers=get_job_manager().workers_per_job,
+        progress_callback=progress_callback,
+        cancel_event=cancel_event,
+        render_in_subprocess=True
+    )
+    
+    if cancel_event is not None and cancel_event.is_set():
+        status_messages.append(f"⏹️ 任务已取消，已完成 {batches} 个文件，输出路径: {output_dir}")
+    else:
+        status_messages.append(f"✅ PDF生成完成！共生成 {batches} 个文件，输出路径: {output_dir}")
+    return "\n".join(status_messages)
+
+
+def process_json_to_pdf(json_file, selected_fields, output_dir, batch_size, custom_tag, fix_json_checkbox, fix_json_output):
+    """处理JSON文件并生成PDF（同步执行，完成后返回状态信息）"""
+    error = _validate_inputs(json_file, selected_fields, output_dir, batch_size)
+    if error:
+        return error
+    
+    try:
+        return _convert(json_file, selected_fields, output_dir, batch_size, custom_tag,
+                        fix_json_checkbox, fix_json_output)
     except Exception as e:
         return f"❌ 处理失败: {str(e)}"
 
 
+def submit_pdf_job(json_file, selected_fields, output_dir, batch_size, custom_tag, fix_json_checkbox, fix_json_output):
+    """
+    提交后台PDF生成任务，立即返回
+    Returns:
+        tuple: (任务ID, 状态信息)
+    """
+    error = _validate_inputs(json_file, selected_fields, output_dir, batch_size)
+    if error:
+        return "", error
+    
+    def run(job):
+        return _convert(json_file, selected_fields, output_dir, batch_size, custom_tag,
+                        fix_json_checkbox, fix_json_output, job=job)
+    
+    manager = get_job_manager()
+    job_id = manager.submit(run)
+    return job_id, format_job_status(manager.poll(job_id))
+
+
+def stream_job_status(job_id, interval=1.0):
+    """持续输出任务状态，直到任务结束；关闭页面不会影响后台任务"""
+    job_id = (job_id or "").strip()
+    if not job_id:
+        yield "❌ 请先提交任务或输入任务ID"
+        return
+    
+    manager = get_job_manager()
+    while True:
+        snapshot = manager.poll(job_id)
+        yield format_job_status(snapshot)
+        if snapshot is None or snapshot["status"] in (DONE, FAILED, CANCELLED):
+            return
+        time.sleep(interval)
+
+
+def follow_submitted_job(job_id, interval=1.0):
+    """
+    提交任务后持续输出任务状态
+    提交被拒绝时任务ID为空，不输出任何内容，保留提交时返回的错误信息
+    """
+    if not (job_id or "").strip():
+        return
+    yield from stream_job_status(job_id, interval)
+
+
+def cancel_pdf_job(job_id):
+    """取消后台任务"""
+    job_id = (job_id or "").strip()
+    manager = get_job_manager()
+    if manager.cancel(job_id):
+        return "⏹️ 已请求取消，当前批次完成后停止\n\n" + format_job_status(manager.poll(job_id))
+    return format_job_status(manager.poll(job_id)) if job_id else "❌ 没有可取消的任务"
+
+
 def update_fields_dropdown(json_file):
     """更新字段下拉菜单"""
     import gradio as gr
-    fields = get_json_fields(json_file)
+    fields = get_json_field_choices(json_file)
     return gr.CheckboxGroup(
         choices=fields,
         label="选择要提取的字段",
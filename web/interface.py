@@ -5,17 +5,27 @@ Gradio界面创建模块
 
 import gradio as gr
 from .handlers import (
-    process_json_to_pdf,
+    submit_pdf_job,
+    stream_job_status,
+    follow_submitted_job,
+    cancel_pdf_job,
     update_fields_dropdown, 
     toggle_fix_json_output,
     toggle_usage_guide
 )
+from .jobs import get_job_manager
 from .content import get_usage_guide, get_app_title, get_app_description
 from .styles import get_header_html, get_help_button_js, get_custom_css
 
 
-def create_interface():
-    """创建Gradio界面"""
+def create_interface(max_concurrent_jobs=None):
+    """
+    创建Gradio界面
+    Args:
+        max_concurrent_jobs: 同时运行的后台任务数上限，默认读取环境变量 JSON_PROCESSOR_MAX_JOBS
+    """
+    job_manager = get_job_manager(max_concurrent_jobs)
+    
     with gr.Blocks(title="JSON数据处理工具", theme=gr.themes.Soft()) as app:
         # 标题和帮助按钮在同一行
         with gr.Row():
@@ -104,6 +114,28 @@ def create_interface():
                 )
             
             with gr.Column(scale=1):
+                # 任务ID，关闭页面后可以输入任务ID重新查看进度
+                job_id = gr.Textbox(
+                    label="🆔 任务ID",
+                    placeholder="提交后自动填写，也可以粘贴之前的任务ID查看进度",
+                    info=f"任务在后台运行，关闭页面不会中断；最多同时运行 {job_manager.max_concurrent_jobs} 个任务"
+                )
+                
+                with gr.Row():
+                    # 查询进度按钮
+                    refresh_btn = gr.Button(
+                        "🔄 查询进度",
+                        variant="secondary",
+                        size="sm"
+                    )
+                    
+                    # 取消任务按钮
+                    cancel_btn = gr.Button(
+                        "⏹️ 取消任务",
+                        variant="stop",
+                        size="sm"
+                    )
+                
                 # 状态显示
                 status_output = gr.Textbox(
                     label="📋 处理状态",
@@ -139,15 +171,35 @@ def create_interface():
             outputs=[fix_json_output]
         )
         
+        # 提交后台任务后持续刷新进度；状态轮询不占用渲染资源，不限制并发；
+        # 提交被拒绝时没有任务ID，保留提交返回的错误信息
         process_btn.click(
-            fn=process_json_to_pdf,
+            fn=submit_pdf_job,
             inputs=[json_file, fields_dropdown, output_dir, batch_size, custom_tag, fix_json_checkbox, fix_json_output],
+            outputs=[job_id, status_output]
+        ).then(
+            fn=follow_submitted_job,
+            inputs=[job_id],
+            outputs=[status_output],
+            concurrency_limit=None
+        )
+        
+        refresh_btn.click(
+            fn=stream_job_status,
+            inputs=[job_id],
+            outputs=[status_output],
+            concurrency_limit=None
+        )
+        
+        cancel_btn.click(
+            fn=cancel_pdf_job,
+            inputs=[job_id],
             outputs=[status_output]
         )
         
         clear_btn.click(
-            fn=lambda: (None, [], "", 1500, "----", False, "", ""),
-            outputs=[json_file, fields_dropdown, output_dir, batch_size, custom_tag, fix_json_checkbox, fix_json_output, status_output]
+            fn=lambda: (None, [], "", 1500, "----", False, "", "", ""),
+            outputs=[json_file, fields_dropdown, output_dir, batch_size, custom_tag, fix_json_checkbox, fix_json_output, job_id, status_output]
         )
         
         # 帮助按钮点击事件 - 切换使用说明的显示/隐藏
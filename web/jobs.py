@@ -0,0 +1,226 @@
+"""
+后台任务模块
+在后台线程中执行PDF转换，提供提交/查询/取消接口，页面关闭后任务仍会继续运行
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# 同时运行的任务数上限的环境变量
+MAX_JOBS_ENV = "JSON_PROCESSOR_MAX_JOBS"
+DEFAULT_MAX_JOBS = 2
+# 每个任务的渲染进程数的环境变量
+JOB_WORKERS_ENV = "JSON_PROCESSOR_JOB_WORKERS"
+DEFAULT_JOB_WORKERS = 1
+# 保留的已结束任务数量，超过后删除最早结束的任务
+MAX_FINISHED_JOBS = 100
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_STATUS_LABELS = {
+    QUEUED: "⏳ 排队中",
+    RUNNING: "🚀 处理中",
+    DONE: "✅ 已完成",
+    FAILED: "❌ 失败",
+    CANCELLED: "⏹️ 已取消",
+}
+
+
+class Job:
+    """单个转换任务的状态"""
+
+    def __init__(self, job_id, total_batches=None):
+        self.id = job_id
+        self.status = QUEUED
+        self.total_batches = total_batches
+        self.done_batches = 0
+        self.failed_batches = 0
+        self.records = 0
+        self.message = ""
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def update_progress(self, info):
+        """process_in_batches 的进度回调"""
+        self.done_batches = info["done"]
+        self.records = info["records"]
+        if info["total"]:
+            self.total_batches = info["total"]
+        if info["status"] == "failed":
+            self.failed_batches += 1
+
+    def snapshot(self):
+        """返回任务状态的字典副本，包含吞吐量和预计剩余时间"""
+        now = self.finished_at or time.time()
+        elapsed = now - self.started_at if self.started_at else 0
+        batch_rate = self.done_batches / elapsed if elapsed > 0 else 0
+        eta = None
+        if (self.status == RUNNING and batch_rate > 0 and self.total_batches
+                and self.total_batches > self.done_batches):
+            eta = (self.total_batches - self.done_batches) / batch_rate
+        return {
+            "id": self.id,
+            "status": self.status,
+            "done": self.done_batches,
+            "failed": self.failed_batches,
+            "total": self.total_batches,
+            "records": self.records,
+            "elapsed": elapsed,
+            "records_per_sec": self.records / elapsed if elapsed > 0 else 0,
+            "batches_per_sec": batch_rate,
+            "eta": eta,
+            "message": self.message,
+        }
+
+
+class JobManager:
+    """
+    后台任务管理器
+    任务在线程池中排队执行，线程池大小即同时运行的任务数上限；
+    任务线程只负责读取数据和调度，PDF渲染在每个任务自己的渲染进程中进行（workers_per_job 个），
+    WeasyPrint 不在服务进程中运行，不与界面争用GIL，各任务也不共享渲染器
+    """
+
+    def __init__(self, max_concurrent_jobs=None, workers_per_job=None):
+        """
+        Args:
+            max_concurrent_jobs: 同时运行的任务数上限，默认读取环境变量 JSON_PROCESSOR_MAX_JOBS
+            workers_per_job: 每个任务的渲染进程数，默认读取环境变量 JSON_PROCESSOR_JOB_WORKERS
+        """
+        if max_concurrent_jobs is None:
+            max_concurrent_jobs = int(os.environ.get(MAX_JOBS_ENV, DEFAULT_MAX_JOBS))
+        if workers_per_job is None:
+            workers_per_job = int(os.environ.get(JOB_WORKERS_ENV, DEFAULT_JOB_WORKERS))
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.workers_per_job = max(1, workers_per_job)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_jobs,
+            thread_name_prefix="pdf-job"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, total_batches=None):
+        """
+        提交任务
+        Args:
+            func: 任务函数，调用方式为 func(job)，返回最终状态信息；
+                应把 job.update_progress 和 job.cancel_event 传给 process_in_batches
+            total_batches: 预估的总批次数，用于计算预计剩余时间
+        Returns:
+            str: 任务ID
+        """
+        job = Job(uuid.uuid4().hex[:12], total_batches)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func)
+        return job.id
+
+    def _run(self, job, func):
+        if job.cancel_event.is_set():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.message = func(job)
+            job.status = CANCELLED if job.cancel_event.is_set() else DONE
+        except Exception as e:
+            job.message = f"❌ 处理失败: {e}"
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def poll(self, job_id):
+        """
+        查询任务状态
+        Returns:
+            dict: 任务状态，任务不存在时返回None
+        """
+        job = self._jobs.get(job_id)
+        return job.snapshot() if job else None
+
+    def cancel(self, job_id):
+        """
+        取消任务：排队中的任务不再执行，运行中的任务在当前批次完成后停止
+        Returns:
+            bool: 任务是否存在且尚未结束
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def _prune(self):
+        """删除最早结束的任务，避免任务记录无限增长"""
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.finished_at
+        )
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+
+def format_job_status(snapshot):
+    """把任务状态格式化为状态框中显示的文本"""
+    if snapshot is None:
+        return "❌ 任务不存在或已过期"
+
+    lines = [f"任务ID: {snapshot['id']}", f"状态: {_STATUS_LABELS[snapshot['status']]}"]
+    if snapshot["status"] != QUEUED:
+        total = snapshot["total"] or "?"
+        lines.append(f"进度: {snapshot['done']}/{total} 批次，已渲染 {snapshot['records']} 条记录")
+        if snapshot["failed"]:
+            lines.append(f"失败批次: {snapshot['failed']}")
+        lines.append(
+            f"吞吐量: {snapshot['records_per_sec']:.1f} 条/秒，"
+            f"{snapshot['batches_per_sec'] * 60:.1f} 批/分钟"
+        )
+        lines.append(f"已用时间: {_format_seconds(snapshot['elapsed'])}")
+        if snapshot["eta"] is not None:
+            lines.append(f"预计剩余: {_format_seconds(snapshot['eta'])}")
+    if snapshot["message"]:
+        lines.append("")
+        lines.append(snapshot["message"])
+    return "\n".join(lines)
+
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}小时{minutes}分{seconds}秒"
+    if minutes:
+        return f"{minutes}分{seconds}秒"
+    return f"{seconds}秒"
+
+
+_manager = None
+
+
+def get_job_manager(max_concurrent_jobs=None):
+    """
+    获取全局任务管理器，首次调用时创建
+    Args:
+        max_concurrent_jobs: 同时运行的任务数上限，只在首次创建时生效
+    """
+    global _manager
+    if _manager is None:
+        _manager = JobManager(max_concurrent_jobs)
+    return _manager